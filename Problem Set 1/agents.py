@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Generic, List
+from typing import Callable, Dict, Generic, List, MutableMapping
 from problem import HeuristicFunction, Problem, S, A, Solution
+import time
 
 # This is an abstract class for all goal based agents
 class GoalBasedAgent(ABC, Generic[S, A]):
@@ -22,12 +23,13 @@ class HumanAgent(GoalBasedAgent[S, A]):
         return self.user_input_fn(problem, state)
 
 # This agent applies an uninformed search algorithm to find the solution to goal for the given state
+# A policy can be given to warm start the agent (for example a PolicyStore loaded from a file by policy_cache.py)
 class UninformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution]) -> None:
+    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution], policy: MutableMapping[S, A] = None) -> None:
         super().__init__()
         self.search_fn = search_fn
         # The policy will store the action to do for each state so as not to search again after each observation
-        self.policy: Dict[S, A] = {}
+        self.policy: MutableMapping[S, A] = {} if policy is None else policy
     
     def act(self, problem: Problem[S, A], state: S) -> A:
         # This state is not stored in the policy, we need to search for a solution 
@@ -45,18 +47,28 @@ class UninformedSearchAgent(GoalBasedAgent[S, A]):
         return self.policy.get(state)
 
 # This agent applies an informed search algorithm to find the solution to goal for the given state
+# If a deadline (in seconds) is given, the search function must be an anytime search (such as AnytimeRepairingAStar)
+# which takes a 'deadline' argument and yields (solution, bound) pairs, and the agent uses the best solution found before the deadline
+# A policy can be given to warm start the agent (for example a PolicyStore loaded from a file by policy_cache.py)
 class InformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction) -> None:
+    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction, deadline: float = None, policy: MutableMapping[S, A] = None) -> None:
         super().__init__()
         self.search_fn = search_fn
         self.heuristic = heuristic
+        self.deadline = deadline
         # The policy will store the action to do for each state so as not to search again after each observation
-        self.policy: Dict[S, A] = {}
+        self.policy: MutableMapping[S, A] = {} if policy is None else policy
     
     def act(self, problem: Problem[S, A], state: S) -> A:
         # This state is not stored in the policy, we need to search for a solution 
         if state not in self.policy:
-            solution = self.search_fn(problem, state, self.heuristic)
+            if self.deadline is None:
+                solution = self.search_fn(problem, state, self.heuristic)
+            else:
+                # Every solution is better than the previous one so we keep the last one
+                solution = None
+                for solution, _ in self.search_fn(problem, state, self.heuristic, deadline=time.time() + self.deadline):
+                    pass
             # if no solution was found, we return None
             if solution is None:
                 self.policy[state] = None
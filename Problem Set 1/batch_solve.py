@@ -0,0 +1,227 @@
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from collections import deque
+from multiprocessing.connection import wait
+import argparse, glob, inspect, json, multiprocessing, os, sys, time
+
+from helpers.utils import load_function
+from portfolio import PROBLEM_CLASSES, SearchConfig, run_config
+
+# This file contains a headless batch solver which solves many problem files in parallel with the same search
+# and streams one JSON line per problem file:
+#   {"file", "problem", "search", "heuristic", "status", "path", "cost", "explored", "time", "message"}
+# status is one of: "solved", "no solution", "timeout" or "failed"
+# Every problem file is solved in its own process so it can be stopped when it exceeds the timeout
+# If the results are written to a file, the files that already have a final result ("solved" or "no solution")
+# with the same search and heuristic are skipped, so a run that was killed continues where it stopped when it is
+# started again with the same output file. The files that timed out or failed are tried again.
+
+# The heuristic used by the informed searches for every type of problem (unless the user chooses one)
+DEFAULT_HEURISTICS = {
+    "dungeon": "dungeon_heuristic.strong_heuristic",
+    "graph": "graph.graphrouting_heuristic",
+    "parking": "parking_heuristic.parking_heuristic",
+}
+
+# Find the problem files from a list of directories, glob patterns or file paths
+# The json files are graphs and the text files are of the type 'text_problem' (dungeons by default)
+# The graph figure files (ending with "_fig.txt") are not problems so they are skipped
+def find_instances(inputs: List[str], text_problem: str = "dungeon") -> List[Tuple[str, str]]:
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "*.txt")) + glob.glob(os.path.join(item, "*.json"))))
+        else:
+            paths.extend(sorted(glob.glob(item)))
+    instances, seen = [], set()
+    for path in paths:
+        if path in seen or path.endswith("_fig.txt"):
+            continue
+        seen.add(path)
+        if path.endswith(".json"):
+            instances.append(("graph", path))
+        elif path.endswith(".txt"):
+            instances.append((text_problem, path))
+    return instances
+
+# Read the heuristics chosen by the user: every item is either 'TYPE=module.function' or 'module.function'
+# An item without a type is used for the problem type whose default heuristic is in the same module
+# (for example, 'dungeon_heuristic.weak_heuristic' is only used for the dungeons)
+def parse_heuristics(items: List[str]) -> Dict[str, str]:
+    modules = {default.rsplit(".", 1)[0]: problem for problem, default in DEFAULT_HEURISTICS.items()}
+    heuristics = {}
+    for item in items:
+        problem, _, heuristic = item.rpartition("=")
+        if not problem:
+            problem = modules.get(heuristic.rsplit(".", 1)[0])
+            if problem is None:
+                raise ValueError(f"can not tell the problem type of the heuristic '{heuristic}', use TYPE={heuristic}")
+        if problem not in DEFAULT_HEURISTICS:
+            raise ValueError(f"unknown problem type '{problem}' (expected one of: {', '.join(DEFAULT_HEURISTICS)})")
+        heuristics[problem] = heuristic
+    return heuristics
+
+# Create the search configuration of every problem type
+# 'heuristics' maps a problem type to its heuristic and the other types use their default heuristics
+# The heuristic is only used if the search function takes one
+def create_configs(search: str, heuristics: Optional[Dict[str, str]] = None) -> Dict[str, SearchConfig]:
+    informed = "heuristic" in inspect.signature(load_function(search, use_local=True)).parameters
+    heuristics = heuristics or {}
+    return {
+        problem: SearchConfig(search, search, heuristics.get(problem, default) if informed else None)
+        for problem, default in DEFAULT_HEURISTICS.items()
+    }
+
+# Solve a single problem file and send the result through the connection (this runs inside a worker process)
+def solve_instance(connection, problem: str, path: str, config: SearchConfig):
+    try:
+        solution, cost, explored, elapsed = run_config(PROBLEM_CLASSES[problem], path, config)
+        result = {
+            "status": "no solution" if solution is None else "solved",
+            "path": None if solution is None else [str(action) for action in solution],
+            "cost": cost,
+            "explored": explored,
+            "time": elapsed,
+        }
+    except Exception as err:
+        result = {"status": "failed", "message": repr(err)}
+    connection.send(result)
+    connection.close()
+
+# Solve the problem files in parallel and yield the result of every file as soon as it is ready
+# (so the results are not in the same order as the instances)
+# If 'timeout' is given, a file that takes more than 'timeout' seconds is stopped and reported as "timeout"
+def solve_batch(instances: List[Tuple[str, str]], configs: Dict[str, SearchConfig],
+                workers: int = None, timeout: float = None) -> Iterator[dict]:
+    workers = workers or os.cpu_count() or 1
+    pending = deque(instances)
+    # The running workers: the connection to read the result -> (process, problem, path, start time)
+    running = {}
+    def report(problem: str, file: str, result: dict) -> dict:
+        config = configs[problem]
+        line = {"file": file, "problem": problem, "search": config.search, "heuristic": config.heuristic,
+                "status": None, "path": None, "cost": None, "explored": None, "time": None, "message": ""}
+        line.update(result)
+        return line
+    try:
+        while pending or running:
+            # Start new workers until all the workers are busy
+            while pending and len(running) < workers:
+                problem, path = pending.popleft()
+                reader, writer = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=solve_instance, args=(writer, problem, path, configs[problem]), daemon=True)
+                process.start()
+                writer.close() # The worker has its own copy, so closing ours lets us detect if it dies
+                running[reader] = (process, problem, path, time.time())
+            # Wait until a worker finishes or the oldest worker reaches the timeout
+            remaining = None
+            if timeout is not None:
+                oldest = min(started for _, _, _, started in running.values())
+                remaining = max(0, oldest + timeout - time.time())
+            for reader in wait(list(running), timeout=remaining):
+                process, problem, path, _ = running.pop(reader)
+                try:
+                    result = reader.recv()
+                except EOFError:
+                    result = {"status": "failed", "message": f"the worker exited with code {process.exitcode}"}
+                reader.close()
+                process.join()
+                yield report(problem, path, result)
+            # Stop the workers that exceeded the timeout
+            if timeout is not None:
+                now = time.time()
+                for reader, (process, problem, path, started) in list(running.items()):
+                    if now - started >= timeout:
+                        process.terminate()
+                        process.join()
+                        reader.close()
+                        del running[reader]
+                        yield report(problem, path, {"status": "timeout", "time": now - started})
+    finally:
+        for reader, (process, *_) in running.items():
+            process.terminate()
+            process.join()
+            reader.close()
+
+# The statuses of the results that are final, so the file is not solved again when a run is resumed
+FINAL_STATUSES = ("solved", "no solution")
+
+# Read the (file, search, heuristic) of the results in the output file (the checkpoint) that have a final status
+# If the last line was cut while it was being written (the run was killed), it is removed so the file is solved again
+def read_checkpoint(path: str) -> Set[Tuple[str, str, Optional[str]]]:
+    if not os.path.isfile(path):
+        return set()
+    with open(path, 'r') as f:
+        content = f.read()
+    if content and not content.endswith("\n"):
+        content = content[:content.rfind("\n") + 1]
+        with open(path, 'w') as f:
+            f.write(content)
+    done = set()
+    for line in content.splitlines():
+        try:
+            result = json.loads(line)
+            if result["status"] in FINAL_STATUSES:
+                done.add((result["file"], result["search"], result["heuristic"]))
+        except (ValueError, KeyError, TypeError):
+            continue
+    return done
+
+def main(args: argparse.Namespace):
+    start = time.time() # Track run time
+    instances = find_instances(args.inputs, args.text_problem)
+    configs = create_configs(args.search, args.heuristic)
+    output = sys.stdout
+    if args.output:
+        if args.restart and os.path.isfile(args.output):
+            os.remove(args.output)
+        done = read_checkpoint(args.output)
+        instances = [
+            (problem, path) for problem, path in instances
+            if (path, configs[problem].search, configs[problem].heuristic) not in done
+        ]
+        output = open(args.output, 'a')
+    counts: Dict[str, int] = {}
+    try:
+        for line in solve_batch(instances, configs, args.workers, args.timeout):
+            counts[line["status"]] = counts.get(line["status"], 0) + 1
+            # Every line is flushed right away so the checkpoint is always up to date
+            output.write(json.dumps(line) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    # The summary is printed to stderr so the standard output only contains the results
+    summary = ", ".join(f"{status}: {count}" for status, count in counts.items())
+    print(f"Processed {sum(counts.values())} of {len(instances)} files ({summary}) in {time.time() - start} seconds", file=sys.stderr)
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Solve many problem files in parallel and write the results as JSON lines")
+    parser.add_argument("inputs", nargs="+",
+                        help="the problem files as directories, glob patterns or paths (json files are graphs, text files are dungeons)")
+    parser.add_argument("--search", "-a", default="search.AStarSearch",
+                        help="the search function as 'module.function'")
+    parser.add_argument("--heuristic", "-hf", action="append", default=None,
+                        help="the heuristic of a problem type as 'TYPE=module.function' or 'module.function' "
+                             "(for the type whose default heuristic is in that module); it can be repeated "
+                             "and the other types keep their default heuristics")
+    parser.add_argument("--text-problem", "-p", default="dungeon", choices=["dungeon", "parking"],
+                        help="the type of the problems in the text files")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="the number of worker processes (the number of CPUs by default)")
+    parser.add_argument("--timeout", "-t", type=float, default=None,
+                        help="the maximum time in seconds for every problem file")
+    parser.add_argument("--output", "-o", default=None,
+                        help="the JSON lines file to append the results to (it is also the checkpoint to resume from)")
+    parser.add_argument("--restart", action="store_true", default=False,
+                        help="ignore the results already in the output file and solve all the problem files again")
+
+    args = parser.parse_args()
+    try:
+        args.heuristic = parse_heuristics(args.heuristic or [])
+    except ValueError as err:
+        parser.error(str(err))
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!", file=sys.stderr)
@@ -0,0 +1,105 @@
+from typing import Optional
+import argparse, json, os, random, tempfile, time, tracemalloc
+
+from graph import GraphRoutingProblem, graphrouting_heuristic
+from loaders import load_dungeon, load_graph
+from dungeon import DungeonProblem
+from search import AStarSearch, BidirectionalBreadthFirstSearch
+
+# This benchmark times the streaming loaders of loaders.py on large generated files
+# The graph is a size x size road grid (a million nodes by default) where some roads are missing
+# and the dungeon is a size x size open map with random walls
+# After loading, it runs A* and a bidirectional BFS (which reverses the graph) on the compact problem
+# The standard loaders can be timed on the same files with --baseline (they need a lot more memory)
+
+# Write a road grid graph file: node "x,y" is connected to its 4 neighbors unless the road between them is missing
+# Every node is written as soon as it is generated so the file is never held in memory
+def write_road_graph(path: str, size: int, seed: int):
+    rng = random.Random(seed)
+    # missing[y][x] tells which of the roads going right (bit 0) and down (bit 1) from (x, y) are missing
+    missing = [bytearray((rng.random() < 0.1) | (rng.random() < 0.1) << 1 for _ in range(size)) for _ in range(size)]
+    with open(path, 'w') as f:
+        f.write('{"graph": {')
+        for y in range(size):
+            for x in range(size):
+                adjacent = []
+                if x + 1 < size and not missing[y][x] & 1:
+                    adjacent.append(f"{x + 1},{y}")
+                if y + 1 < size and not missing[y][x] & 2:
+                    adjacent.append(f"{x},{y + 1}")
+                if x > 0 and not missing[y][x - 1] & 1:
+                    adjacent.append(f"{x - 1},{y}")
+                if y > 0 and not missing[y - 1][x] & 2:
+                    adjacent.append(f"{x},{y - 1}")
+                separator = "" if x == 0 and y == 0 else ", "
+                f.write(f'{separator}"{x},{y}": {json.dumps({"position": [10 * x, 10 * y], "adjacent": adjacent})}')
+        f.write(f'}}, "start": "{size // 4},{size // 2}", "goal": "{size // 2},{size // 2}"}}')
+
+# Write an open dungeon file where every cell is a wall with probability 'density' (the border is always a wall)
+def write_dungeon(path: str, size: int, density: float, seed: int):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for y in range(size):
+            row = ['#' if x in (0, size - 1) or y in (0, size - 1) or rng.random() < density else '.' for x in range(size)]
+            if y == 1:
+                row[1] = '@'
+            if y == size - 2:
+                row[size - 2] = 'E'
+            f.write(''.join(row) + '\n')
+
+# Call the function and print how long it took (and the peak memory if it is tracked)
+def timed(label: str, function, track_memory: bool):
+    if track_memory:
+        tracemalloc.reset_peak()
+    start = time.time()
+    result = function()
+    elapsed = time.time() - start
+    memory = f", peak memory {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MB" if track_memory else ""
+    print(f"{label}: {elapsed} seconds{memory}")
+    return result
+
+def path_length(path: Optional[list]) -> str:
+    return "no solution" if path is None else f"{len(path)} steps"
+
+def main(args: argparse.Namespace):
+    if args.track_memory:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as directory:
+        graph_path = os.path.join(directory, "graph.json")
+        timed("Generate graph", lambda: write_road_graph(graph_path, args.graph_size, args.seed), False)
+        print(f"Graph: {args.graph_size ** 2} nodes, {os.path.getsize(graph_path) / 2**20:.1f} MB")
+        graph = timed("load_graph", lambda: load_graph(graph_path), args.track_memory)
+        problem = graph.to_problem()
+        path = timed("A* on the compact problem", lambda: AStarSearch(problem, problem.get_initial_state(), graphrouting_heuristic), args.track_memory)
+        print(f"A*: {path_length(path)}, {sum(node is not None for node in graph.nodes)} nodes created")
+        path = timed("Bidirectional BFS on the compact problem", lambda: BidirectionalBreadthFirstSearch(problem, problem.get_initial_state()), args.track_memory)
+        print(f"Bidirectional BFS: {path_length(path)}")
+        if args.baseline:
+            timed("GraphRoutingProblem.from_file", lambda: GraphRoutingProblem.from_file(graph_path), args.track_memory)
+        os.remove(graph_path)
+
+        dungeon_path = os.path.join(directory, "dungeon.txt")
+        write_dungeon(dungeon_path, args.dungeon_size, args.density, args.seed)
+        print(f"Dungeon: {args.dungeon_size}x{args.dungeon_size}")
+        timed("load_dungeon", lambda: load_dungeon(dungeon_path).to_problem(), args.track_memory)
+        if args.baseline:
+            timed("DungeonProblem.from_file", lambda: DungeonProblem.from_file(dungeon_path), args.track_memory)
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Benchmark the streaming loaders on large generated graph and dungeon files")
+    parser.add_argument("--graph-size", "-g", type=int, default=1000,
+                        help="the width and height of the road grid (the graph has size^2 nodes)")
+    parser.add_argument("--dungeon-size", "-n", type=int, default=2000,
+                        help="the width and height of the generated dungeon")
+    parser.add_argument("--density", "-d", type=float, default=0.1,
+                        help="the probability of a dungeon cell being a wall")
+    parser.add_argument("--baseline", "-b", action="store_true", default=False,
+                        help="also time the standard loaders on the same files")
+    parser.add_argument("--track-memory", "-m", action="store_true", default=False,
+                        help="measure the peak memory of every step using tracemalloc (this slows them down)")
+    parser.add_argument("--seed", "-s", type=int, default=0,
+                        help="the seed of the random generators")
+
+    args = parser.parse_args()
+    main(args)
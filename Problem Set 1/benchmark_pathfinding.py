@@ -0,0 +1,83 @@
+from typing import List, Tuple
+from collections import deque
+import argparse, random, time
+
+from dungeon import DungeonLayout
+from dungeon_heuristic import bfs_distance
+from jump_point_search import JumpPointSearch
+from mathutils import Direction, Point
+
+# This benchmark compares the jump point search with a plain BFS on large open dungeon maps
+# Every map is a size x size grid where every cell is a wall with the given probability
+
+# Generate an open map where every cell is a wall with probability 'density'
+def generate_layout(size: int, density: float, seed: int) -> DungeonLayout:
+    rng = random.Random(seed)
+    walkable = frozenset(Point(x, y) for y in range(size) for x in range(size) if rng.random() >= density)
+    return DungeonLayout(size, size, walkable, Point(0, 0))
+
+# A point to point BFS that stops as soon as it reaches the goal
+def bfs_point_to_point(layout: DungeonLayout, start: Point, goal: Point) -> float:
+    distances = {start: 0}
+    queue = deque([start])
+    vectors = [direction.to_vector() for direction in Direction]
+    while queue:
+        current = queue.popleft()
+        if current == goal:
+            return distances[current]
+        for vector in vectors:
+            neighbor = current + vector
+            if neighbor in layout.walkable and neighbor not in distances:
+                distances[neighbor] = distances[current] + 1
+                queue.append(neighbor)
+    return float('inf')
+
+# Pick random pairs of walkable points
+def generate_queries(layout: DungeonLayout, count: int, seed: int) -> List[Tuple[Point, Point]]:
+    rng = random.Random(seed)
+    cells = sorted(layout.walkable, key=lambda point: (point.y, point.x))
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(count)]
+
+def main(args: argparse.Namespace):
+    for density in args.densities:
+        layout = generate_layout(args.size, density, args.seed)
+        queries = generate_queries(layout, args.queries, args.seed)
+        print(f"Map {args.size}x{args.size} with wall density {density} ({len(queries)} queries)")
+        start = time.time()
+        search = JumpPointSearch(layout)
+        build_elapsed = time.time() - start
+        start = time.time()
+        jps_distances = [search.distance(p1, p2) for p1, p2 in queries]
+        jps_elapsed = time.time() - start
+        start = time.time()
+        bfs_distances = [bfs_point_to_point(layout, p1, p2) for p1, p2 in queries]
+        bfs_elapsed = time.time() - start
+        # The BFS in the dungeon heuristics computes the distances to all the cells so it is only timed on the first few queries
+        full_queries = queries[:args.full_queries]
+        start = time.time()
+        full_distances = [bfs_distance(p1, layout).get(p2, float('inf')) for p1, p2 in full_queries]
+        full_elapsed = time.time() - start
+        same = "same" if jps_distances == bfs_distances and full_distances == bfs_distances[:len(full_queries)] else "DIFFERENT"
+        print(f"JPS: {jps_elapsed} seconds (+{build_elapsed} seconds to build the grid)")
+        print(f"BFS (point to point): {bfs_elapsed} seconds, speedup x{bfs_elapsed / max(jps_elapsed, 1e-9):.1f}")
+        if full_queries:
+            per_query = full_elapsed / len(full_queries)
+            print(f"BFS (all distances): {per_query} seconds per query, speedup x{per_query * len(queries) / max(jps_elapsed, 1e-9):.1f}")
+        print(f"Distances: {same}")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Benchmark the jump point search against BFS on open dungeon maps")
+    parser.add_argument("--size", "-n", type=int, default=200,
+                        help="the width and height of the generated maps")
+    parser.add_argument("--densities", "-d", type=float, nargs="+", default=[0.0, 0.1, 0.3],
+                        help="the probability of a cell being a wall in every generated map")
+    parser.add_argument("--queries", "-q", type=int, default=50,
+                        help="the number of random point to point queries on every map")
+    parser.add_argument("--full-queries", "-f", type=int, default=5,
+                        help="the number of queries used to time the BFS that computes all the distances (0 to skip)")
+    parser.add_argument("--seed", "-s", type=int, default=0,
+                        help="the seed of the random map generator")
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,171 @@
+from typing import Dict, List
+from graph import GraphRoutingProblem, GraphNode
+from mathutils import Point
+from problem import Problem, S, A, Solution
+from helpers.utils import fetch_recorded_calls
+import argparse, random, time
+
+# This benchmark generates large graph routing problems and times the searches on them
+# In the random graph, the goal is an isolated node so every search has to traverse the whole reachable graph
+# In the road graph, the start and the goal are inside a large grid with some missing roads
+
+# Generate a random graph where every node is connected to 'degree' random nodes
+def generate_graph(nodes: int, degree: int, seed: int) -> GraphRoutingProblem:
+    rng = random.Random(seed)
+    node_list = [GraphNode(str(index), Point(rng.randint(0, nodes), rng.randint(0, nodes))) for index in range(nodes)]
+    adjacency: Dict[GraphNode, List[GraphNode]] = {node: [] for node in node_list}
+    for node in node_list:
+        for neighbor in rng.sample(node_list, degree):
+            if neighbor != node:
+                adjacency[node].append(neighbor)
+    goal = GraphNode("goal", Point(-1, -1))
+    adjacency[goal] = []
+    return GraphRoutingProblem(node_list[0], goal, adjacency)
+
+# Generate a road-like graph: a size x size grid with jittered positions where some roads are missing
+# every road can be used in both directions
+def generate_road_graph(size: int, seed: int) -> GraphRoutingProblem:
+    rng = random.Random(seed)
+    nodes = [[GraphNode(f"{x},{y}", Point(10 * x + rng.randint(0, 3), 10 * y + rng.randint(0, 3))) for x in range(size)] for y in range(size)]
+    adjacency: Dict[GraphNode, List[GraphNode]] = {node: [] for row in nodes for node in row}
+    for y in range(size):
+        for x in range(size):
+            for nx, ny in [(x + 1, y), (x, y + 1)]:
+                if nx < size and ny < size and rng.random() < 0.9:
+                    adjacency[nodes[y][x]].append(nodes[ny][nx])
+                    adjacency[nodes[ny][nx]].append(nodes[y][x])
+    return GraphRoutingProblem(nodes[size // 2][size // 4], nodes[size // 2][3 * size // 4], adjacency)
+
+# The list based frontier that the searches used before (pop(0) and a linear 'in' check)
+# It is only kept here as a baseline to compare against
+def list_breadth_first_search(problem: Problem[S, A], initial_state: S) -> Solution:
+    frontier: list = [initial_state]
+    path: dict = {initial_state: []}
+    explored: set = set()
+    while len(frontier) > 0:
+        node = frontier.pop(0)
+        if problem.is_goal(node):
+            return path[node]
+        explored.add(node)
+        for action in problem.get_actions(node):
+            child = problem.get_successor(node, action)
+            if child not in explored and child not in frontier:
+                path[child] = path[node] + [action]
+                frontier.append(child)
+    return None
+
+def list_depth_first_search(problem: Problem[S, A], initial_state: S) -> Solution:
+    frontier: list = [initial_state]
+    path: dict = {initial_state: []}
+    explored: set = set()
+    while len(frontier) > 0:
+        node = frontier.pop()
+        if problem.is_goal(node):
+            return path[node]
+        explored.add(node)
+        for action in problem.get_actions(node):
+            child = problem.get_successor(node, action)
+            if child not in explored and child not in frontier:
+                path[child] = path[node] + [action]
+                frontier.append(child)
+    return None
+
+# Run a search function and return the elapsed time and the traversal order
+def run(search_fn, problem: GraphRoutingProblem):
+    elapsed, traversal, _ = run_with_path(search_fn, problem)
+    return elapsed, traversal
+
+# Run a search function and return the elapsed time, the traversal order and the path
+def run_with_path(search_fn, problem: GraphRoutingProblem):
+    fetch_recorded_calls(GraphRoutingProblem.is_goal) # Clear the recorded calls
+    start = time.time()
+    path = search_fn(problem, problem.get_initial_state())
+    elapsed = time.time() - start
+    traversal = [call["args"][1] for call in fetch_recorded_calls(GraphRoutingProblem.is_goal)]
+    return elapsed, traversal, path
+
+# Compute the cost of a path in a graph routing problem
+def path_cost(problem: GraphRoutingProblem, path: List[GraphNode]) -> float:
+    state, cost = problem.get_initial_state(), 0
+    for action in path or []:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost
+
+def main(args: argparse.Namespace):
+    from search import BreadthFirstSearch, DepthFirstSearch
+    problem = generate_graph(args.nodes, args.degree, args.seed)
+    print(f"Graph with {args.nodes} nodes and degree {args.degree}")
+    for name, search_fn in [("BFS", BreadthFirstSearch), ("DFS", DepthFirstSearch)]:
+        elapsed, traversal = run(search_fn, problem)
+        print(f"{name}: explored {len(traversal)} nodes in {elapsed} seconds")
+    # The list based searches are quadratic so they are compared on a smaller graph
+    if args.baseline_nodes > 0:
+        problem = generate_graph(args.baseline_nodes, args.degree, args.seed)
+        print(f"Baseline graph with {args.baseline_nodes} nodes and degree {args.degree}")
+        for name, search_fn, baseline_fn in [
+            ("BFS", BreadthFirstSearch, list_breadth_first_search),
+            ("DFS", DepthFirstSearch, list_depth_first_search)
+        ]:
+            elapsed, traversal = run(search_fn, problem)
+            baseline_elapsed, baseline_traversal = run(baseline_fn, problem)
+            same = "same" if traversal == baseline_traversal else "DIFFERENT"
+            print(f"{name}: deque {elapsed} seconds, list {baseline_elapsed} seconds, speedup x{baseline_elapsed / max(elapsed, 1e-9):.1f} ({same} traversal order)")
+    # Compare the bidirectional searches with the one directional searches on a road graph
+    if args.road_size > 0:
+        from search import UniformCostSearch, AStarSearch, BidirectionalBreadthFirstSearch, BidirectionalUniformCostSearch, BidirectionalAStarSearch
+        from graph import graphrouting_heuristic
+        problem = generate_road_graph(args.road_size, args.seed)
+        print(f"Road graph with {args.road_size}x{args.road_size} nodes")
+        for name, search_fn in [
+            ("BFS", BreadthFirstSearch),
+            ("Bidirectional BFS", BidirectionalBreadthFirstSearch),
+            ("UCS", UniformCostSearch),
+            ("Bidirectional UCS", BidirectionalUniformCostSearch),
+            ("A*", lambda problem, state: AStarSearch(problem, state, graphrouting_heuristic)),
+            ("Bidirectional A*", lambda problem, state: BidirectionalAStarSearch(problem, state, graphrouting_heuristic)),
+        ]:
+            elapsed, traversal, path = run_with_path(search_fn, problem)
+            print(f"{name}: explored {len(traversal)} nodes in {elapsed} seconds (path length = {len(path or [])}, path cost = {path_cost(problem, path)})")
+    # Compare the searches on the road graph with the same searches on its compiled form (see compiled.py)
+    if args.road_size > 0 and args.compiled:
+        from search import BreadthFirstSearch, UniformCostSearch, AStarSearch, BidirectionalUniformCostSearch
+        from graph import graphrouting_heuristic
+        from compiled import compile_heuristic
+        problem = generate_road_graph(args.road_size, args.seed)
+        start = time.time()
+        compiled = problem.compile()
+        print(f"Compiled road graph with {len(compiled.states)} states in {time.time() - start} seconds")
+        compiled_heuristic = compile_heuristic(graphrouting_heuristic)
+        for name, search_fn, compiled_search_fn in [
+            ("BFS", BreadthFirstSearch, BreadthFirstSearch),
+            ("UCS", UniformCostSearch, UniformCostSearch),
+            ("A*", lambda problem, state: AStarSearch(problem, state, graphrouting_heuristic),
+                   lambda problem, state: AStarSearch(problem, state, compiled_heuristic)),
+            ("Bidirectional UCS", BidirectionalUniformCostSearch, BidirectionalUniformCostSearch),
+        ]:
+            elapsed, _, path = run_with_path(search_fn, problem)
+            start = time.time()
+            compiled_path = compiled.decode_solution(compiled_search_fn(compiled, compiled.get_initial_state()))
+            compiled_elapsed = time.time() - start
+            same = "same" if path == compiled_path else "DIFFERENT"
+            print(f"{name}: original {elapsed} seconds, compiled {compiled_elapsed} seconds, speedup x{elapsed / max(compiled_elapsed, 1e-9):.1f} ({same} path)")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Benchmark the searches on generated graphs")
+    parser.add_argument("--nodes", "-n", type=int, default=100000,
+                        help="the number of nodes in the generated graph")
+    parser.add_argument("--degree", "-d", type=int, default=3,
+                        help="the number of outgoing edges per node")
+    parser.add_argument("--baseline-nodes", "-b", type=int, default=10000,
+                        help="the number of nodes in the graph used to compare with the list based searches (0 to skip)")
+    parser.add_argument("--road-size", "-r", type=int, default=100,
+                        help="the width and height of the road graph used to compare with the bidirectional searches (0 to skip)")
+    parser.add_argument("--compiled", "-c", action="store_true", default=False,
+                        help="also compare the searches on the road graph with the same searches on its compiled form")
+    parser.add_argument("--seed", "-s", type=int, default=0,
+                        help="the seed of the random graph generator")
+
+    args = parser.parse_args()
+    main(args)
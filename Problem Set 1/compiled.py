@@ -0,0 +1,203 @@
+from typing import Any, Dict, List, Optional
+from array import array
+from dataclasses import dataclass, field
+
+from problem import HeuristicFunction, Problem, S, A, Solution, heuristic_batch
+
+# This file contains the compiled form of finite problems
+# Compiling a problem enumerates all the states reachable from its initial state once, gives every state an integer id
+# and stores the transitions in flat arrays (a CSR layout: the transitions of state i are offsets[i] to offsets[i + 1] - 1)
+# The compiled problem is a normal Problem where the states are the ids and the action is the id of the next state
+# (as in GraphRoutingProblem), so every search in search.py runs on it without allocating any state
+# and 'decode_solution' converts its solutions back to the actions of the original problem.
+# We use the built-in 'array' module instead of numpy since only the built-in modules are allowed
+
+# The reachable part of the state space
+# The transitions are stored in flat arrays: transition i goes from sources[i] to targets[i] with cost costs[i]
+# They are sorted by source, and the transitions of a state are in the order of its actions
+@dataclass
+class StateSpace:
+    states: List[Any]                                   # state id -> state (the initial state has the id 0)
+    goals: List[int]                                    # the ids of the goal states
+    sources: array = field(default_factory=lambda: array('l'))
+    targets: array = field(default_factory=lambda: array('l'))
+    costs: array = field(default_factory=lambda: array('d'))
+    actions: List[Any] = field(default_factory=list)    # transition i -> the action that causes it
+
+# Enumerate the states reachable from the initial state (up to 'max_states' states)
+# Raises a ValueError if the state space has more than 'max_states' states
+def enumerate_states(problem: Problem, max_states: int = None) -> StateSpace:
+    initial_state = problem.get_initial_state()
+    ids: Dict[Any, int] = {initial_state: 0}
+    space = StateSpace([initial_state], [])
+    sources, targets, costs, actions = space.sources, space.targets, space.costs, space.actions
+    # The states are expanded in the order they were discovered, so the list of states is also the queue
+    index = 0
+    while index < len(space.states):
+        state = space.states[index]
+        if problem.is_goal(state):
+            space.goals.append(index)
+        for action in problem.get_actions(state):
+            next_state = problem.get_successor(state, action)
+            next_id = ids.get(next_state)
+            if next_id is None:
+                if max_states is not None and len(space.states) >= max_states:
+                    raise ValueError(f"The problem has more than {max_states} reachable states")
+                next_id = ids[next_state] = len(space.states)
+                space.states.append(next_state)
+            sources.append(index)
+            targets.append(next_id)
+            costs.append(problem.get_cost(state, action))
+            actions.append(action)
+        index += 1
+    return space
+
+class CompiledProblem(Problem[int, int]):
+    source: Problem             # the original problem
+    states: List[Any]           # state id -> state of the original problem
+    ids: Dict[Any, int]         # state of the original problem -> state id
+    initial_state: int
+    goals: bytearray            # state id -> 1 if it is a goal, 0 otherwise
+    goal: Optional[int]         # the goal id if there is exactly one goal (needed by the bidirectional searches)
+    offsets: array              # state id -> the index of its first transition (offsets[-1] is the number of transitions)
+    targets: array              # transition -> the next state id
+    costs: array                # transition -> the action cost
+    actions: List[Any]          # transition -> the action of the original problem
+    unit_cost: Optional[float]  # the cost of every action if all the actions have the same cost (None otherwise)
+
+    def get_initial_state(self) -> int:
+        return self.initial_state
+
+    def is_goal(self, state: int) -> bool:
+        return self.goals[state] == 1
+
+    def get_actions(self, state: int) -> array:
+        return self.targets[self.offsets[state]:self.offsets[state + 1]]
+
+    def get_successor(self, state: int, action: int) -> int:
+        return action
+
+    def get_cost(self, state: int, action: int) -> float:
+        if self.unit_cost is not None:
+            return self.unit_cost
+        return self.costs[self.transition(state, action)]
+
+    # Returns the index of the transition from 'state' to 'next_state'
+    def transition(self, state: int, next_state: int) -> int:
+        return self.targets.index(next_state, self.offsets[state], self.offsets[state + 1])
+
+    # Convert a solution of the compiled problem (a list of state ids) to the actions of the original problem
+    def decode_solution(self, solution: Solution, initial_state: int = None) -> Solution:
+        if solution is None:
+            return None
+        state = self.initial_state if initial_state is None else initial_state
+        actions = []
+        for next_state in solution:
+            actions.append(self.actions[self.transition(state, next_state)])
+            state = next_state
+        return actions
+
+    # This returns the same problem with every transition reversed, going from the goal to 'start' (the initial state if None)
+    # It is used by the bidirectional searches. The reversed transitions are built once and stored in the problem cache
+    def reverse(self, start: int = None) -> 'CompiledProblem':
+        start = self.initial_state if start is None else start
+        cache = self.cache()
+        if "reverse_transitions" not in cache:
+            count = len(self.states)
+            offsets = array('l', [0]) * (count + 1)
+            for target in self.targets:
+                offsets[target + 1] += 1
+            for index in range(count):
+                offsets[index + 1] += offsets[index]
+            targets, costs = array('l', [0]) * len(self.targets), array('d', [0]) * len(self.targets)
+            actions = [None] * len(self.targets)
+            position = offsets[:-1]
+            for source in range(count):
+                for transition in range(self.offsets[source], self.offsets[source + 1]):
+                    target = self.targets[transition]
+                    slot = position[target]
+                    targets[slot], costs[slot], actions[slot] = source, self.costs[transition], self.actions[transition]
+                    position[target] += 1
+            cache["reverse_transitions"] = (offsets, targets, costs, actions)
+        reverse = CompiledProblem()
+        reverse.offsets, reverse.targets, reverse.costs, reverse.actions = cache["reverse_transitions"]
+        reverse.states, reverse.ids, reverse.unit_cost = self.states, self.ids, self.unit_cost
+        reverse.initial_state = self.goal
+        reverse.goal = start
+        reverse.goals = bytearray(len(self.states))
+        reverse.goals[start] = 1
+        # The heuristics of the reversed problem are the ones of the reversed original problem (if it can be reversed)
+        reverse.source = self.source.reverse(self.states[start]) if hasattr(self.source, "reverse") else None
+        return reverse
+
+# Compile a finite problem (see the top of this file)
+# If two actions of a state lead to the same next state, only the cheapest one is kept (the first one in case of a tie)
+# Raises a ValueError if the problem has more than 'max_states' reachable states
+def compile_problem(problem: Problem[S, A], max_states: int = None) -> CompiledProblem:
+    space = enumerate_states(problem, max_states)
+    # If the problem has a single goal (as needed by the bidirectional searches) that can not be reached,
+    # it is added as a state without transitions so the bidirectional searches can still start from it
+    goal = getattr(problem, "goal", None)
+    if goal is not None and not space.goals and problem.is_goal(goal):
+        space.goals.append(len(space.states))
+        space.states.append(goal)
+    compiled = CompiledProblem()
+    compiled.source = problem
+    compiled.states = space.states
+    compiled.ids = {state: index for index, state in enumerate(space.states)}
+    compiled.initial_state = 0
+    compiled.goals = bytearray(len(space.states))
+    for goal in space.goals:
+        compiled.goals[goal] = 1
+    compiled.goal = space.goals[0] if len(space.goals) == 1 else None
+    compiled.offsets = array('l', [0]) * (len(space.states) + 1)
+    compiled.targets, compiled.costs, compiled.actions = array('l'), array('d'), []
+    # The transitions are already sorted by source so we only need to drop the duplicates of every state
+    slots: Dict[int, int] = {}  # next state id -> its transition (for the current state)
+    current = 0
+    for source, target, cost, action in zip(space.sources, space.targets, space.costs, space.actions):
+        if source != current:
+            for state in range(current, source):
+                compiled.offsets[state + 1] = len(compiled.targets)
+            current, slots = source, {}
+        slot = slots.get(target)
+        if slot is None:
+            slots[target] = len(compiled.targets)
+            compiled.targets.append(target)
+            compiled.costs.append(cost)
+            compiled.actions.append(action)
+        elif cost < compiled.costs[slot]:
+            compiled.costs[slot], compiled.actions[slot] = cost, action
+    for state in range(current, len(space.states)):
+        compiled.offsets[state + 1] = len(compiled.targets)
+    unique_costs = set(compiled.costs)
+    compiled.unit_cost = unique_costs.pop() if len(unique_costs) == 1 else None
+    return compiled
+
+# Convert a heuristic of the original problem to a heuristic of the compiled problem
+# The heuristic of every state is only computed the first time it is requested and then stored in an array
+# The returned heuristic also has a batched version that computes all the missing values together
+def compile_heuristic(heuristic: HeuristicFunction) -> HeuristicFunction:
+    batch = heuristic_batch(heuristic)
+    # The values are stored in the cache of every compiled problem (NaN means not computed yet)
+    def get_values(problem: CompiledProblem) -> array:
+        cache = problem.cache()
+        values = cache.get(("heuristic", heuristic))
+        if values is None:
+            values = cache[("heuristic", heuristic)] = array('d', [float('nan')]) * len(problem.states)
+        return values
+    def compiled(problem: CompiledProblem, state: int) -> float:
+        values = get_values(problem)
+        value = values[state]
+        if value != value:
+            value = values[state] = heuristic(problem.source, problem.states[state])
+        return value
+    def compiled_batch(problem: CompiledProblem, states) -> array:
+        values = get_values(problem)
+        missing = [state for state in states if values[state] != values[state]]
+        if missing:
+            for state, value in zip(missing, batch(problem.source, [problem.states[state] for state in missing])):
+                values[state] = value
+        return array('d', (values[state] for state in states))
+    compiled.batch = compiled_batch
+    return compiled
@@ -0,0 +1,179 @@
+from typing import Dict, List, Optional
+from array import array
+from collections import OrderedDict, deque
+import hashlib, os
+
+from dungeon import DungeonLayout, DungeonProblem
+from mathutils import Direction, Point
+
+# This file contains the distance oracle for the dungeon layouts
+# It computes the BFS (maze) distances from a cell to every walkable cell the first time that cell is used as a source
+# and keeps them as a row indexed by cell id, so the heuristics can look up the distances from the coins and the exit
+# (and any other queried cell) in O(1) instead of running a BFS for every state.
+# Only the rows of the queried sources are computed, so a large open map does not need a BFS from every cell.
+
+# We use the built-in 'array' module instead of numpy since only the built-in modules are allowed
+# Unreachable pairs are stored as -1 and returned as infinity
+# If a cache directory is set, every row is appended to the file of the layout as soon as it is computed,
+# as a record of the source cell id followed by the row (all 32-bit ints), so the file holds a partial table
+# that the next process loads instead of running those BFS again.
+
+# The directory where the oracles are saved and loaded (None disables the disk cache)
+cache_directory: str = None
+
+def set_cache_directory(path: str):
+    global cache_directory
+    cache_directory = path
+
+# The oracles used recently in this process, keyed by the layout hash (the least recently used ones are dropped)
+MAX_ORACLES = 8
+_oracles: 'OrderedDict[str, DistanceOracle]' = OrderedDict()
+
+# This returns a hash of the walkable area of the layout which identifies its distance table
+# (the exit and the coins do not change the distances so they are not part of the hash)
+def layout_hash(layout: DungeonLayout) -> str:
+    cells = sorted((point.y, point.x) for point in layout.walkable)
+    text = f"{layout.width}x{layout.height}:" + ";".join(f"{x},{y}" for y, x in cells)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+class DistanceOracle:
+    # Every walkable cell gets an integer id (in row-major order)
+    # and the distance from cell i to cell j is stored at rows[i][j] once the row of i is computed
+    cells: List[Point]          # cell id -> position
+    ids: Dict[Point, int]       # position -> cell id
+    size: int                   # the number of walkable cells
+    rows: Dict[int, array]      # source cell id -> the distances from it to every cell
+    path: Optional[str]         # the file where every computed row is appended (None to keep the rows in memory only)
+
+    def __init__(self, layout: DungeonLayout, path: str = None) -> None:
+        self.cells = sorted(layout.walkable, key=lambda point: (point.y, point.x))
+        self.ids = {point: index for index, point in enumerate(self.cells)}
+        self.size = len(self.cells)
+        self.rows = {}
+        self.path = path
+        self._neighbors = None
+
+    # Returns the distances from a source cell to every cell (running a BFS from it the first time)
+    def row(self, source: int) -> array:
+        row = self.rows.get(source)
+        if row is None:
+            row = self.rows[source] = self._compute(source)
+            if self.path:
+                self._append(source, row)
+        return row
+
+    # Append the record of a row to the cache file
+    def _append(self, source: int, row: array):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            array('i', [source]).tofile(f)
+            row.tofile(f)
+
+    # Run a BFS from the source cell
+    def _compute(self, source: int) -> array:
+        if self._neighbors is None:
+            # The neighbors of every cell as a list of cell ids
+            ids = self.ids
+            self._neighbors = [
+                [ids[neighbor] for neighbor in (cell + direction.to_vector() for direction in Direction) if neighbor in ids]
+                for cell in self.cells
+            ]
+        neighbors = self._neighbors
+        distances = array('i', [-1]) * self.size
+        distances[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            next_distance = distances[current] + 1
+            for neighbor in neighbors[current]:
+                if distances[neighbor] == -1:
+                    distances[neighbor] = next_distance
+                    queue.append(neighbor)
+        return distances
+
+    # Returns the maze distance between two walkable points (or infinity if one can not reach the other)
+    def distance(self, p1: Point, p2: Point) -> float:
+        return self.distance_by_id(self.ids[p1], self.ids[p2])
+
+    # Returns the maze distance between two cell ids (or infinity if one can not reach the other)
+    # The distances are symmetric, so an existing row of either cell is used. Otherwise, the row of the second cell
+    # is computed, since the callers pass the fixed cell (a coin or the exit) second and the player cell first.
+    def distance_by_id(self, i: int, j: int) -> float:
+        rows = self.rows
+        row = rows.get(j)
+        if row is not None:
+            distance = row[i]
+        else:
+            row = rows.get(i)
+            distance = row[j] if row is not None else self.row(j)[i]
+        return float('inf') if distance < 0 else distance
+
+    # Save the computed rows to a binary file (one record per row)
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            for source, row in self.rows.items():
+                array('i', [source]).tofile(f)
+                row.tofile(f)
+
+    # Load the rows saved for the given layout from a binary file
+    # The new rows of the loaded oracle are appended to the same file
+    # A record that was cut while it was being written (the process was killed) is dropped
+    # Raises a ValueError if a record does not belong to a cell of the layout
+    @staticmethod
+    def load(layout: DungeonLayout, path: str) -> 'DistanceOracle':
+        oracle = DistanceOracle(layout, path)
+        record = 4 * (oracle.size + 1)
+        with open(path, 'rb') as f:
+            data = f.read()
+        for start in range(0, len(data) - record + 1, record):
+            values = array('i', data[start:start + record])
+            source = values[0]
+            if not 0 <= source < oracle.size:
+                raise ValueError(f"'{path}' is not the distance table of this layout")
+            oracle.rows[source] = values[1:]
+        if len(data) % record:
+            # Drop the cut record so the next rows are appended after the complete ones
+            with open(path, 'r+b') as f:
+                f.truncate(len(data) - len(data) % record)
+        return oracle
+
+    # Returns the oracle of the given layout
+    # The recently used oracles are kept in this process, and if a cache directory is set, the rows computed before
+    # are loaded from a file named after the layout hash (and the new rows are appended to it)
+    @staticmethod
+    def for_layout(layout: DungeonLayout) -> 'DistanceOracle':
+        key = layout_hash(layout)
+        oracle = _oracles.get(key)
+        if oracle is not None:
+            _oracles.move_to_end(key)
+            return oracle
+        path = None
+        if cache_directory:
+            path = os.path.join(cache_directory, key + ".oracle")
+            if os.path.isfile(path):
+                try:
+                    oracle = DistanceOracle.load(layout, path)
+                except ValueError:
+                    # The file is broken so we start it again
+                    os.remove(path)
+                    oracle = None
+        if oracle is None:
+            oracle = DistanceOracle(layout, path)
+        _oracles[key] = oracle
+        if len(_oracles) > MAX_ORACLES:
+            _oracles.popitem(last=False)
+        return oracle
+
+# Returns the distance oracle of the problem layout
+# It is stored in the problem cache so the heuristics can share it without hashing the layout on every call
+def get_distance_oracle(problem: DungeonProblem) -> DistanceOracle:
+    cache = problem.cache()
+    oracle = cache.get("distance_oracle")
+    if oracle is None:
+        oracle = cache["distance_oracle"] = DistanceOracle.for_layout(problem.layout)
+    return oracle
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import FrozenSet, Iterable
+from typing import FrozenSet, Iterable, List, Tuple
 from enum import Enum
 
 from mathutils import Direction, Point
@@ -131,4 +131,108 @@ class DungeonProblem(Problem[DungeonState, Direction]):
     @staticmethod
     def from_file(path: str) -> 'DungeonProblem':
         with open(path, 'r') as f:
-            return DungeonProblem.from_text(f.read())
\ No newline at end of file
+            return DungeonProblem.from_text(f.read())
+
+# This is a faster version of the dungeon problem where every state is a single int
+# Every walkable cell gets an integer index (in row-major order) and every coin gets a bit (in row-major order)
+# and the state packs them as: (remaining coins bitmask << cell_bits) | player cell index
+# so creating, hashing and comparing states is cheap compared to DungeonState (which allocates Points and frozensets)
+# The actions, successors and goal test follow the exact same order as DungeonProblem so every search explores the same nodes
+# Use 'decode' to convert a state back to a DungeonState for display
+class FastDungeonProblem(Problem[int, Direction]):
+    layout: DungeonLayout
+    initial_state: int
+    cells: List[Point]                          # cell index -> position
+    cell_indices: dict                          # position -> cell index
+    coins: List[Point]                          # coin bit -> position
+    coin_cells: List[int]                       # coin bit -> cell index
+    cell_bits: int                              # the number of bits used for the player cell index
+    cell_mask: int                              # (1 << cell_bits) - 1
+    exit: int                                   # the cell index of the exit
+    cell_coin: List[int]                        # cell index -> the bit of the coin at this cell (0 if there is no coin)
+    cell_actions: List[Tuple[Direction, ...]]   # cell index -> the possible actions from this cell
+    neighbors: List[List[int]]                  # cell index -> direction -> neighbor cell index (-1 if it is a wall)
+
+    def get_initial_state(self) -> int:
+        return self.initial_state
+
+    # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
+    @track_call_count
+    def is_goal(self, state: int) -> bool:
+        return state == self.exit
+
+    def get_actions(self, state: int) -> Iterable[Direction]:
+        return self.cell_actions[state & self.cell_mask]
+
+    def get_successor(self, state: int, action: Direction) -> int:
+        player = self.neighbors[state & self.cell_mask][action]
+        if player == -1:
+            # If we try to walk into a wall, the state does not change
+            return state
+        # If we walk over a coin, we take it
+        remaining_coins = (state >> self.cell_bits) & ~self.cell_coin[player]
+        return (remaining_coins << self.cell_bits) | player
+
+    def get_cost(self, state: int, action: Direction) -> float:
+        # All actions have the same cost
+        return 1
+
+    # Returns the cell index of the player in the given state
+    def player(self, state: int) -> int:
+        return state & self.cell_mask
+
+    # Returns the bitmask of the remaining coins in the given state
+    def remaining_coins(self, state: int) -> int:
+        return state >> self.cell_bits
+
+    # Convert a DungeonState to the int encoding
+    def encode(self, state: DungeonState) -> int:
+        remaining_coins = 0
+        for bit, coin in enumerate(self.coins):
+            if coin in state.remaining_coins:
+                remaining_coins |= 1 << bit
+        return (remaining_coins << self.cell_bits) | self.cell_indices[state.player]
+
+    # Convert an int state back to a DungeonState (for display)
+    def decode(self, state: int) -> DungeonState:
+        remaining_coins = state >> self.cell_bits
+        coins = frozenset(coin for bit, coin in enumerate(self.coins) if remaining_coins >> bit & 1)
+        return DungeonState(self.layout, self.cells[state & self.cell_mask], coins)
+
+    # Build the fast version of a dungeon problem
+    @staticmethod
+    def from_problem(problem: DungeonProblem) -> 'FastDungeonProblem':
+        layout = problem.layout
+        fast = FastDungeonProblem()
+        fast.layout = layout
+        fast.cells = sorted(layout.walkable, key=lambda point: (point.y, point.x))
+        fast.cell_indices = {point: index for index, point in enumerate(fast.cells)}
+        fast.coins = sorted(problem.initial_state.remaining_coins, key=lambda point: (point.y, point.x))
+        fast.coin_cells = [fast.cell_indices[coin] for coin in fast.coins]
+        fast.cell_bits = max(1, (len(fast.cells) - 1).bit_length())
+        fast.cell_mask = (1 << fast.cell_bits) - 1
+        # The goal is the only state with no remaining coins and the player at the exit
+        fast.exit = fast.cell_indices[layout.exit] if layout.exit in fast.cell_indices else -1
+        fast.cell_coin = [0] * len(fast.cells)
+        for bit, cell in enumerate(fast.coin_cells):
+            fast.cell_coin[cell] = 1 << bit
+        fast.neighbors = [
+            [fast.cell_indices.get(cell + direction.to_vector(), -1) for direction in Direction]
+            for cell in fast.cells
+        ]
+        fast.cell_actions = [
+            tuple(direction for direction in Direction if neighbors[direction] != -1)
+            for neighbors in fast.neighbors
+        ]
+        fast.initial_state = fast.encode(problem.initial_state)
+        return fast
+
+    # Read a dungeon problem from text containing a grid of tiles
+    @staticmethod
+    def from_text(text: str) -> 'FastDungeonProblem':
+        return FastDungeonProblem.from_problem(DungeonProblem.from_text(text))
+
+    # Read a dungeon problem from file containing a grid of tiles
+    @staticmethod
+    def from_file(path: str) -> 'FastDungeonProblem':
+        return FastDungeonProblem.from_problem(DungeonProblem.from_file(path))
@@ -1,8 +1,12 @@
-from dungeon import DungeonProblem, DungeonState,DungeonLayout
+from typing import List
+from dungeon import DungeonProblem, DungeonState,DungeonLayout, FastDungeonProblem
+from distance_oracle import DistanceOracle, get_distance_oracle
+from jump_point_search import maze_distance
 from mathutils import Direction, Point, euclidean_distance, manhattan_distance
 from helpers import utils
 from collections import deque
-from itertools import combinations
+from array import array
+from functools import lru_cache
 
 
 
@@ -33,43 +37,45 @@ def bfs_distance(start: Point, layout: DungeonLayout) -> float:
     # Return the distances
     return distances
 
-# Minimum Spanning Tree function for calculating cost of visiting remaining coins
-def mst_cost(points: list, distances: dict) -> float:
-    if len(points) <= 1:
+# Minimum Spanning Tree function for calculating cost of visiting the coins in the mask
+# It runs Prim's algorithm on the coin distance matrix (distances[i][j] is the distance between coin i and coin j)
+# If some coins can not reach each other, it returns the cost of the minimum spanning forest
+def mst_cost(mask: int, distances: list) -> float:
+    # Get the indices of the coins in the mask
+    coins = [i for i in range(len(distances)) if mask >> i & 1]
+    if len(coins) <= 1:
         return 0
-
-    # Map each point to an index for easy reference
-    point_indices = {point: i for i, point in enumerate(points)}
-
-    # Build a graph of distances between each pair of points using indices
-    edges = [
-        (distances[p1][p2], point_indices[p1], point_indices[p2])
-        for p1, p2 in combinations(points, 2)
-        if p2 in distances[p1]
-    ]
-
-    # Apply Kruskal's algorithm for MST
-    edges.sort()  # Sort edges by distance
+    # The distance from the tree to every coin that is not in the tree yet
+    best = {coin: distances[coins[0]][coin] for coin in coins[1:]}
     mst_cost = 0
-    sets = {i: i for i in range(len(points))}
-
-    def find(x):
-        if sets[x] != x:
-            sets[x] = find(sets[x])
-        return sets[x]
-
-    def union(x, y):
-        root_x, root_y = find(x), find(y)
-        if root_x != root_y:
-            sets[root_y] = root_x
-
-    for dist, i1, i2 in edges:
-        if find(i1) != find(i2):
-            union(i1, i2)
+    while best:
+        coin = min(best, key=best.get)
+        dist = best.pop(coin)
+        # an infinite distance means the coin is in another component so it starts a new tree
+        if dist != float('inf'):
             mst_cost += dist
-
+        row = distances[coin]
+        for other in best:
+            if row[other] < best[other]:
+                best[other] = row[other]
     return mst_cost
 
+# This returns the coin indices (coin -> bit in the mask) and a function that returns the MST cost of a coin mask
+# The coins are the ones in the initial state since every state can only contain a subset of them
+# The MST costs are memoized in a bounded LRU cache since the same coin subsets are reached from many states
+def get_coin_mst(problem: DungeonProblem):
+    cache = problem.cache()
+    if "coin_mst" not in cache:
+        oracle = get_distance_oracle(problem)
+        if isinstance(problem, FastDungeonProblem):
+            coins = problem.coins
+        else:
+            coins = sorted(problem.initial_state.remaining_coins, key=lambda point: (point.y, point.x))
+        coin_indices = {coin: i for i, coin in enumerate(coins)}
+        distances = [[oracle.distance(c1, c2) for c2 in coins] for c1 in coins]
+        cache["coin_mst"] = (coin_indices, lru_cache(2**16)(lambda mask: mst_cost(mask, distances)))
+    return cache["coin_mst"]
+
 
 # Strong heuristic function
 def strong_heuristic(problem: DungeonProblem, state: DungeonState) -> float:
@@ -79,32 +85,160 @@ def strong_heuristic(problem: DungeonProblem, state: DungeonState) -> float:
     if state_key in cache:
         return cache[state_key]
 
-   
-    if 0 not in cache:
-     # calculate distances between all coins and exit and save it in cache 
-     ##this step is done only once 
-        all_points = [*state.remaining_coins,state.layout.exit]
-        distances = {point: bfs_distance(point, state.layout) for point in all_points}
-        cache[0]=distances
-    else:
-        distances=cache[0]
-    ##calculate distances between players and everything else
-    distance_from_player=bfs_distance(state.player,state.layout)
+    # the maze distances from the coins and the exit are computed once per layout by the distance oracle
+    oracle = get_distance_oracle(problem)
+    exit = state.layout.exit
     # If no coins are remaining, return the distance from player to exit
     if not state.remaining_coins:
-        return distance_from_player.get(state.layout.exit, float('inf'))
+        return oracle.distance(state.player, exit)
 
-    # Compute MST cost on remaining coins
-    mst_coins_cost = mst_cost(list(state.remaining_coins), distances)
+    # Compute MST cost on remaining coins (represented as a bitmask of coin indices)
+    coin_indices, coin_mst = get_coin_mst(problem)
+    mask = 0
+    for coin in state.remaining_coins:
+        mask |= 1 << coin_indices[coin]
+    mst_coins_cost = coin_mst(mask)
 
     # Combine heuristic: Player-to-nearest coin + MST of coins + nearest coin to exit
-    player_to_coin = min(distance_from_player[coin] for coin in state.remaining_coins)
-    coin_to_exit = min(distances[state.layout.exit][coin] for coin in state.remaining_coins)
+    player_to_coin = min(oracle.distance(state.player, coin) for coin in state.remaining_coins)
+    coin_to_exit = min(oracle.distance(exit, coin) for coin in state.remaining_coins)
 
     heuristic_value = player_to_coin + mst_coins_cost + coin_to_exit
     cache[state_key] = heuristic_value
     return heuristic_value
 
+# The versions of the heuristics above for FastDungeonProblem (where every state is an int)
+# They return the exact same values as the original heuristics for the decoded states
+def fast_weak_heuristic(problem: FastDungeonProblem, state: int):
+    return euclidean_distance(problem.cells[problem.player(state)], problem.layout.exit)
+
+def fast_strong_heuristic(problem: FastDungeonProblem, state: int) -> float:
+    cache = problem.cache()
+    if state in cache:
+        return cache[state]
+    oracle = get_distance_oracle(problem)
+    player, mask = problem.player(state), problem.remaining_coins(state)
+    # the oracle and the problem number the cells in the same (row-major) order
+    if mask == 0:
+        return oracle.distance_by_id(player, problem.exit)
+    _, coin_mst = get_coin_mst(problem)
+    coin_cells = [cell for bit, cell in enumerate(problem.coin_cells) if mask >> bit & 1]
+    player_to_coin = min(oracle.distance_by_id(player, cell) for cell in coin_cells)
+    coin_to_exit = min(oracle.distance_by_id(problem.exit, cell) for cell in coin_cells)
+    heuristic_value = player_to_coin + coin_mst(mask) + coin_to_exit
+    cache[state] = heuristic_value
+    return heuristic_value
+
+# This heuristic does not use the distance oracle, so it builds no distance table for the layout
+# Every remaining coin has to be collected before reaching the exit, so the cost is at least
+# the maze distance from the player to any coin plus the maze distance from that coin to the exit
+# The maze distances are found with jump point search, which is fast on large open maps with few coins
+def maze_heuristic(problem: DungeonProblem, state: DungeonState) -> float:
+    cache = problem.cache()
+    state_key = ("maze", state.player, frozenset(state.remaining_coins))
+    if state_key in cache:
+        return cache[state_key]
+    exit = problem.layout.exit
+    if not state.remaining_coins:
+        heuristic_value = maze_distance(problem, state.player, exit)
+    else:
+        # The distances from the coins to the exit are the same for every state
+        coin_to_exit = cache.setdefault("maze_coin_to_exit", {})
+        for coin in state.remaining_coins:
+            if coin not in coin_to_exit:
+                coin_to_exit[coin] = maze_distance(problem, coin, exit)
+        heuristic_value = max(maze_distance(problem, state.player, coin) + coin_to_exit[coin] for coin in state.remaining_coins)
+    cache[state_key] = heuristic_value
+    return heuristic_value
+
+def fast_maze_heuristic(problem: FastDungeonProblem, state: int) -> float:
+    return maze_heuristic(problem, problem.decode(state))
+
+# The batched versions of the heuristics above (see 'heuristic_batch' in problem.py)
+# They look the distances up in tables that are built once per problem, so every state only costs a few lookups
+# They return the exact same values as the heuristics they are attached to
+
+# The euclidean distance from every walkable cell to the exit
+# (an array indexed by cell index for the fast problem and a dictionary indexed by position otherwise)
+def get_exit_distances(problem: DungeonProblem):
+    cache = problem.cache()
+    if "exit_distances" not in cache:
+        exit = problem.layout.exit
+        if isinstance(problem, FastDungeonProblem):
+            cache["exit_distances"] = array('d', (euclidean_distance(cell, exit) for cell in problem.cells))
+        else:
+            cache["exit_distances"] = {cell: euclidean_distance(cell, exit) for cell in problem.layout.walkable}
+    return cache["exit_distances"]
+
+# This returns the maze distance from every coin to every cell (rows[coin bit][cell id]) and from every coin to the exit
+def get_coin_distances(problem: DungeonProblem):
+    cache = problem.cache()
+    if "coin_distances" not in cache:
+        oracle = get_distance_oracle(problem)
+        coin_indices, _ = get_coin_mst(problem)
+        coins = sorted(coin_indices, key=coin_indices.get)
+        rows = [array('d', (float('inf') if distance < 0 else distance for distance in oracle.row(oracle.ids[coin]))) for coin in coins]
+        exit = oracle.ids[problem.layout.exit]
+        cache["coin_distances"] = (rows, array('d', (row[exit] for row in rows)))
+    return cache["coin_distances"]
+
+def weak_heuristic_batch(problem: DungeonProblem, states: List[DungeonState]) -> array:
+    distances = get_exit_distances(problem)
+    return array('d', (distances[state.player] for state in states))
+
+def fast_weak_heuristic_batch(problem: FastDungeonProblem, states: List[int]) -> array:
+    distances, cell_mask = get_exit_distances(problem), problem.cell_mask
+    return array('d', (distances[state & cell_mask] for state in states))
+
+def strong_heuristic_batch(problem: DungeonProblem, states: List[DungeonState]) -> array:
+    cache = problem.cache()
+    oracle = get_distance_oracle(problem)
+    coin_indices, coin_mst = get_coin_mst(problem)
+    rows, coin_to_exit = get_coin_distances(problem)
+    exit = oracle.ids[problem.layout.exit]
+    values = array('d')
+    for state in states:
+        state_key = (state.player, frozenset(state.remaining_coins))
+        value = cache.get(state_key)
+        if value is None:
+            player = oracle.ids[state.player]
+            if not state.remaining_coins:
+                value = oracle.distance_by_id(player, exit)
+            else:
+                bits = [coin_indices[coin] for coin in state.remaining_coins]
+                mask = 0
+                for bit in bits:
+                    mask |= 1 << bit
+                value = min(rows[bit][player] for bit in bits) + coin_mst(mask) + min(coin_to_exit[bit] for bit in bits)
+                cache[state_key] = value
+        values.append(value)
+    return values
+
+def fast_strong_heuristic_batch(problem: FastDungeonProblem, states: List[int]) -> array:
+    cache = problem.cache()
+    oracle = get_distance_oracle(problem)
+    _, coin_mst = get_coin_mst(problem)
+    rows, coin_to_exit = get_coin_distances(problem)
+    coin_bits = range(len(rows))
+    values = array('d')
+    for state in states:
+        value = cache.get(state)
+        if value is None:
+            player, mask = problem.player(state), problem.remaining_coins(state)
+            if mask == 0:
+                value = oracle.distance_by_id(player, problem.exit)
+            else:
+                bits = [bit for bit in coin_bits if mask >> bit & 1]
+                value = min(rows[bit][player] for bit in bits) + coin_mst(mask) + min(coin_to_exit[bit] for bit in bits)
+                cache[state] = value
+        values.append(value)
+    return values
+
+weak_heuristic.batch = weak_heuristic_batch
+strong_heuristic.batch = strong_heuristic_batch
+fast_weak_heuristic.batch = fast_weak_heuristic_batch
+fast_strong_heuristic.batch = fast_strong_heuristic_batch
+
 
 
 
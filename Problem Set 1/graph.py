@@ -1,5 +1,6 @@
 from typing import Dict, Iterable, List
 from dataclasses import dataclass
+from array import array
 import json
 
 from problem import Problem
@@ -47,6 +48,23 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
     def get_cost(self, state: GraphNode, action: GraphNode) -> float:
         return euclidean_distance(state.position, action.position)
     
+    # This returns the same graph with every edge reversed as a routing problem from the goal to 'start'
+    # (the current initial state if 'start' is None). It is used by the bidirectional searches to search backward from the goal.
+    # The reverse adjacency index is built once and stored in the problem cache
+    # (an adjacency that can reverse itself, like the compact adjacency of loaders.py, is asked to do it)
+    def reverse(self, start: GraphNode = None) -> 'GraphRoutingProblem':
+        cache = self.cache()
+        reverse_adjacency = cache.get("reverse_adjacency")
+        if reverse_adjacency is None and hasattr(self.adjacency, "reversed"):
+            reverse_adjacency = cache["reverse_adjacency"] = self.adjacency.reversed()
+        if reverse_adjacency is None:
+            reverse_adjacency: Dict[GraphNode, List[GraphNode]] = {node: [] for node in self.adjacency}
+            for node, adjacent in self.adjacency.items():
+                for neighbor in adjacent:
+                    reverse_adjacency.setdefault(neighbor, []).append(node)
+            cache["reverse_adjacency"] = reverse_adjacency
+        return GraphRoutingProblem(self.goal, self.start if start is None else start, reverse_adjacency)
+
     # Read a graph routing problem from file
     @staticmethod
     def from_file(path: str) -> 'GraphRoutingProblem':
@@ -63,4 +81,19 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
         return GraphRoutingProblem(start, goal, adjacency)
 
 def graphrouting_heuristic(problem: GraphRoutingProblem, state: GraphNode) -> float:
-    return euclidean_distance(state.position, problem.goal.position)
\ No newline at end of file
+    return euclidean_distance(state.position, problem.goal.position)
+
+# The batched version of the heuristic (see 'heuristic_batch' in problem.py)
+# The distance from a node to the goal is computed the first time the node is seen and then only looked up
+def graphrouting_heuristic_batch(problem: GraphRoutingProblem, states: List[GraphNode]) -> array:
+    distances = problem.cache().setdefault("goal_distances", {})
+    goal = problem.goal.position
+    values = array('d')
+    for state in states:
+        distance = distances.get(state)
+        if distance is None:
+            distance = distances[state] = euclidean_distance(state.position, goal)
+        values.append(distance)
+    return values
+
+graphrouting_heuristic.batch = graphrouting_heuristic_batch
\ No newline at end of file
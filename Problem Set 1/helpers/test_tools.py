@@ -6,7 +6,7 @@ from problem import A, S, Problem
 from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function
 from .heuristic_checks import InconsistentHeuristicException, test_heuristic_consistency
 from functools import lru_cache
-import time
+import os, tempfile, time
 
 def run_parking_trajectory(
     problem: Problem[S, A],
@@ -80,6 +80,60 @@ def compare_search_results_for_graph_routing(
     message = f"Graph:{nl}{fig}{nl}Expected:{nl}{expected}{nl}Got:{nl}{out_to_str(output)}"
     return Result(False, 0, message)
 
+# Run a bidirectional search and a baseline search (UCS or BFS) on the same graph routing problem
+# If 'start' is given, the searches start from the node with this name instead of the initial state
+def run_bidirectional_search_for_graph_routing(
+    function_path: str,
+    baseline_path: str,
+    problem: GraphRoutingProblem,
+    informed: bool = False,
+    start: Optional[str] = None) -> Tuple[Optional[List[str]], Optional[float], Optional[List[str]], Optional[float], bool]:
+    initial_state = problem.get_initial_state()
+    if start is not None:
+        initial_state = next(node for node in problem.adjacency if node.name == start)
+    search_fn = load_function(function_path)
+    if informed:
+        path = search_fn(problem, initial_state, graphrouting_heuristic)
+    else:
+        path = search_fn(problem, initial_state)
+    baseline = load_function(baseline_path)(problem, initial_state)
+    def path_cost(path):
+        if path is None:
+            return None
+        cost, state = 0, initial_state
+        for action in path:
+            cost += problem.get_cost(state, action)
+            state = problem.get_successor(state, action)
+        return cost
+    # The path is valid if every step follows an edge and it ends at the goal
+    valid, state = True, initial_state
+    for action in path or []:
+        valid = valid and action in problem.get_actions(state)
+        state = problem.get_successor(state, action)
+    valid = valid and (path is None or problem.is_goal(state))
+    names = lambda path: None if path is None else [node.name for node in path]
+    return names(path), path_cost(path), names(baseline), path_cost(baseline), valid
+
+# Compare the path of a bidirectional search with the path of the baseline search
+# 'measure' is "cost" (compared with UCS) or "steps" (compared with BFS) and 'expected' is its expected value (None if there is no solution)
+def compare_bidirectional_search_for_graph_routing(
+    output: Tuple[Optional[List[str]], Optional[float], Optional[List[str]], Optional[float], bool],
+    measure: str,
+    expected: Optional[float],
+    fig_path: str) -> Result:
+    path, cost, baseline, baseline_cost, valid = output
+    value = None if path is None else (cost if measure == "cost" else len(path))
+    baseline_value = None if baseline is None else (baseline_cost if measure == "cost" else len(baseline))
+    nl = '\n'
+    fig = open(fig_path, 'r').read()
+    message = f"Graph:{nl}{fig}{nl}Path: {path} ({measure}={value}){nl}Baseline path: {baseline} ({measure}={baseline_value})"
+    if not valid:
+        return Result(False, 0, message + f"{nl}The path does not follow the edges of the graph to the goal")
+    same = lambda a, b: (a is None) == (b is None) and (a is None or abs(a - b) < 1e-9)
+    if not same(value, expected) or not same(baseline_value, expected):
+        return Result(False, 0, message + f"{nl}Expected {measure}: {'No solution' if expected is None else expected}")
+    return Result(True, 1, "")
+
 def run_uninformed_search_for_dungeon(
     function_path: str, 
     problem: DungeonProblem) -> Tuple[str, int]:
@@ -164,4 +218,180 @@ def compare_heuristic_for_dungeon(
         for i, (u, l) in enumerate(zip(thresholds[:-1], thresholds[1:])):
             message += '\n' + f'grade = {i+1} if {u} >= nodes > {l}'
         message += '\n' + f'grade = {len(thresholds)} if {thresholds[-1]} >= nodes'
-    return Result(grade != 0, grade, message)
\ No newline at end of file
+    return Result(grade != 0, grade, message)
+
+def run_policy_round_trip(
+    function_path: str,
+    problem: DungeonProblem) -> Tuple[Optional[int], int, int]:
+    from policy_cache import PolicyStore
+    search_fn = load_function(function_path)
+    state = problem.get_initial_state()
+    path = search_fn(problem, state)
+    if path is None:
+        return None, 0, 0
+    # Store the action of every state on the path, save the policy and load it back from the file
+    states, policy = [], PolicyStore(problem)
+    for action in path:
+        states.append(state)
+        policy[state] = action
+        state = problem.get_successor(state, action)
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, "level.policy")
+        policy.save(file)
+        loaded = PolicyStore.load(problem, file)
+        try:
+            matching = sum(loaded.get(state) == action for state, action in zip(states, path))
+            size = len(loaded)
+        finally:
+            loaded.close()
+    return len(path), matching, size
+
+def check_policy_round_trip(
+    output: Tuple[Optional[int], int, int],
+    expected_length: int,
+    level_path: str) -> Result:
+    length, matching, size = output
+    level = open(level_path, 'r').read()
+    if length != expected_length:
+        return Result(False, 0, f"Level:\n{level}\nExpected a path of {expected_length} steps, got {length}")
+    if matching != length or size != length:
+        return Result(False, 0, f"Level:\n{level}\nThe loaded policy has {size} entries and {matching} of the {length} stored actions")
+    return Result(True, 1, f"The policy of the {length} states on the path was saved and loaded")
+
+
+# Run A* with the strong heuristic twice on the same level with a distance oracle cache directory:
+# the first run computes and saves the rows it needs and the second run (in a fresh oracle) loads them from the disk
+def run_distance_oracle_cache(level_path: str) -> Tuple[int, int, bool, int, Optional[int], Optional[int]]:
+    import distance_oracle
+    search_fn = load_function("search.AStarSearch")
+    heuristic = load_function("dungeon_heuristic.strong_heuristic")
+    with tempfile.TemporaryDirectory() as directory:
+        distance_oracle.set_cache_directory(directory)
+        distance_oracle._oracles.clear()
+        try:
+            problem = DungeonProblem.from_file(level_path)
+            first = search_fn(problem, problem.get_initial_state(), heuristic)
+            computed = dict(distance_oracle.get_distance_oracle(problem).rows)
+            # Forget the oracle so the second problem has to read it from the cache directory
+            distance_oracle._oracles.clear()
+            problem = DungeonProblem.from_file(level_path)
+            oracle = distance_oracle.get_distance_oracle(problem)
+            loaded = dict(oracle.rows)
+            second = search_fn(problem, problem.get_initial_state(), heuristic)
+            new_rows = len(oracle.rows) - len(loaded)
+        finally:
+            distance_oracle.set_cache_directory(None)
+            distance_oracle._oracles.clear()
+    length = lambda path: None if path is None else len(path)
+    return len(computed), len(loaded), loaded == computed, new_rows, length(first), length(second)
+
+def check_distance_oracle_cache(
+    output: Tuple[int, int, bool, int, Optional[int], Optional[int]],
+    expected_length: int,
+    level_path: str) -> Result:
+    computed, loaded, same, new_rows, first, second = output
+    level = open(level_path, 'r').read()
+    message = f"Level:\n{level}\n"
+    if first != expected_length or second != expected_length:
+        return Result(False, 0, message + f"Expected paths of {expected_length} steps, got {first} and {second}")
+    if computed == 0 or loaded != computed or not same:
+        return Result(False, 0, message + f"The first search computed {computed} rows but {loaded} rows were loaded from the cache" + ("" if same else " (with different distances)"))
+    if new_rows != 0:
+        return Result(False, 0, message + f"The second search computed {new_rows} rows that should have been loaded from the cache")
+    return Result(True, 1, f"{computed} rows were saved and loaded")
+
+
+# Run a memory bounded search (IDA* or SMA*) and return its path (the actions as a string) and its cost
+# The keyword arguments (such as 'memory_limit') are passed to the search function
+def run_memory_bounded_search(
+    function_path: str,
+    problem: Problem[S, A],
+    heuristic_path: str,
+    **kwargs) -> Tuple[Optional[str], Optional[float]]:
+    search_fn = load_function(function_path)
+    heuristic = load_function(heuristic_path)
+    state = problem.get_initial_state()
+    path = search_fn(problem, state, heuristic, **kwargs)
+    if path is None:
+        return None, None
+    cost = 0
+    for action in path:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    if not problem.is_goal(state):
+        return ''.join(str(action) for action in path), None
+    return ''.join(str(action) for action in path), cost
+
+def compare_memory_bounded_search(
+    output: Tuple[Optional[str], Optional[float]],
+    expected_cost: Optional[float],
+    possible_paths: List[Optional[str]],
+    level_path: str) -> Result:
+    path, cost = output
+    nl = '\n'
+    level = open(level_path, 'r').read()
+    message = f"Level:{nl}{level}{nl}Got: {'No solution' if path is None else path} (cost={cost}){nl}"
+    if (cost is None) != (expected_cost is None) or (cost is not None and abs(cost - expected_cost) > 1e-9):
+        return Result(False, 0, message + f"Expected cost: {'No solution' if expected_cost is None else expected_cost}")
+    if path not in possible_paths:
+        return Result(False, 0, message + f"Expected one of the paths: {possible_paths}")
+    return Result(True, 1, "")
+
+
+# Multiply a heuristic (and its batched version) by 'scale'
+# A scale above 1 turns the consistent heuristics into known inconsistent and inadmissible heuristics for the audit tests
+# The calls are counted in 'calls' (by kind: "single" or "batch") to check that the audit evaluates the states in batches
+def scaled_heuristic(heuristic: HeuristicFunction, scale: float, calls: dict) -> HeuristicFunction:
+    from problem import heuristic_batch
+    batch = heuristic_batch(heuristic)
+    def scaled(problem, state):
+        calls["single"] = calls.get("single", 0) + 1
+        return scale * heuristic(problem, state)
+    def scaled_batch(problem, states):
+        calls["batch"] = calls.get("batch", 0) + 1
+        return [scale * value for value in batch(problem, states)]
+    scaled.batch = scaled_batch
+    return scaled
+
+# Audit the heuristic (multiplied by 'scale') on all the reachable states of the problem
+# and return the violation counts, the worst violation (kind, excess and state) and how the heuristic was called
+def run_heuristic_audit(
+    problem: Problem[S, A],
+    heuristic_path: str,
+    scale: float = 1) -> Tuple[Tuple[int, int, int, int, int], Optional[Tuple[str, float, str]], dict]:
+    from heuristic_audit import audit_heuristic
+    calls = {}
+    heuristic = scaled_heuristic(load_function(heuristic_path), scale, calls)
+    report = audit_heuristic(problem, heuristic, top=1)
+    counts = (report.states, report.transitions, report.consistency_violations,
+              report.admissibility_violations, report.goal_violations)
+    worst = None
+    if report.worst:
+        violation = report.worst[0]
+        worst = (violation.kind, violation.excess, str(violation.state))
+    return counts, worst, calls
+
+def check_heuristic_audit(
+    output: Tuple[Tuple[int, int, int, int, int], Optional[Tuple[str, float, str]], dict],
+    expected_counts: List[int],
+    expected_worst: Optional[List],
+    level_path: str) -> Result:
+    counts, worst, calls = output
+    nl = '\n'
+    level = open(level_path, 'r').read()
+    message = f"Level:{nl}{level}{nl}"
+    names = ["states", "transitions", "consistency violations", "admissibility violations", "goal violations"]
+    for name, count, expected in zip(names, counts, expected_counts):
+        if count != expected:
+            return Result(False, 0, message + f"Expected {expected} {name}, got {count}")
+    if (worst is None) != (expected_worst is None):
+        return Result(False, 0, message + f"Expected the worst violation to be {expected_worst}, got {worst}")
+    if worst is not None:
+        kind, excess, state = worst
+        expected_kind, expected_excess, expected_state = expected_worst
+        if kind != expected_kind or abs(excess - expected_excess) > 1e-6 or state != expected_state:
+            return Result(False, 0, message + f"Expected the worst violation to be a {expected_kind} violation "
+                                    f"of {expected_excess} at state {expected_state}, got a {kind} violation of {excess} at state {state}")
+    if calls.get("single", 0) != 0 or calls.get("batch", 0) == 0:
+        return Result(False, 0, message + f"Expected the heuristic to be evaluated in batches, got {calls.get('batch', 0)} batched calls and {calls.get('single', 0)} single calls")
+    return Result(True, 1, "")
@@ -0,0 +1,182 @@
+from typing import Any, Callable, List, Optional
+from array import array
+from dataclasses import dataclass
+import argparse, heapq, time
+
+from compiled import StateSpace, enumerate_states
+from helpers.utils import load_function
+from problem import HeuristicFunction, Problem, heuristic_batch
+from portfolio import PROBLEM_CLASSES
+
+# This file contains an offline auditor for heuristics
+# Instead of checking every transition inside the search loop (as 'test_heuristic_consistency' does),
+# it enumerates all the states reachable from the initial state once, computes the exact cost to the goal
+# of every state with a Dijkstra search on the reversed transitions, evaluates the heuristic once per state
+# and then checks all the transitions (consistency) and all the states (admissibility) in bulk.
+# We use the built-in 'array' module instead of numpy since only the built-in modules are allowed
+
+# A violation of the consistency (on a transition) or of the admissibility (on a state)
+# excess is by how much the heuristic exceeds the allowed value
+@dataclass
+class Violation:
+    kind: str               # "consistency", "admissibility" or "goal"
+    excess: float
+    state: Any
+    heuristic: float
+    bound: float            # the action cost for consistency, the exact cost to the goal for admissibility and 0 at the goal
+    action: Any = None
+    next_state: Any = None
+    next_heuristic: Optional[float] = None
+
+    def __str__(self) -> str:
+        if self.kind == "consistency":
+            message = f"State (heuristic = {self.heuristic}):\n{self.state}\n"
+            message += f"Action: {self.action} (cost = {self.bound})\n"
+            message += f"Next State (heuristic = {self.next_heuristic}):\n{self.next_state}\n"
+            message += f"h(state) - h(next state) = {self.heuristic - self.next_heuristic} > {self.bound} (action cost)"
+        elif self.kind == "admissibility":
+            message = f"State (heuristic = {self.heuristic}):\n{self.state}\n"
+            message += f"h(state) = {self.heuristic} > {self.bound} (exact cost to the goal)"
+        else:
+            message = f"Goal State (heuristic = {self.heuristic}):\n{self.state}\n"
+            message += f"h(goal) = {self.heuristic} != 0"
+        return message
+
+@dataclass
+class AuditReport:
+    states: int
+    transitions: int
+    consistency_violations: int
+    admissibility_violations: int
+    goal_violations: int
+    worst: List[Violation]          # the worst violations (largest excess first)
+    enumeration_time: float         # the time (in seconds) spent to enumerate the states and compute the exact costs
+    heuristic_time: float           # the time (in seconds) spent in the heuristic
+
+    @property
+    def consistent(self) -> bool:
+        return self.consistency_violations == 0 and self.goal_violations == 0
+
+    @property
+    def admissible(self) -> bool:
+        return self.admissibility_violations == 0 and self.goal_violations == 0
+
+# Compute the exact cost from every state to the nearest goal (inf if no goal is reachable)
+# using a Dijkstra search from all the goals on the reversed transitions
+def cost_to_go(space: StateSpace) -> array:
+    count = len(space.states)
+    # Group the transitions by target state (a CSR layout of the reversed graph)
+    offsets = array('l', [0]) * (count + 1)
+    for target in space.targets:
+        offsets[target + 1] += 1
+    for index in range(count):
+        offsets[index + 1] += offsets[index]
+    order = array('l', [0]) * len(space.targets)
+    position = offsets[:-1]
+    for transition, target in enumerate(space.targets):
+        order[position[target]] = transition
+        position[target] += 1
+    distances = array('d', [float('inf')]) * count
+    heap = []
+    for goal in space.goals:
+        distances[goal] = 0
+        heap.append((0, goal))
+    heapq.heapify(heap)
+    sources, costs = space.sources, space.costs
+    while heap:
+        distance, state = heapq.heappop(heap)
+        if distance > distances[state]:
+            continue
+        for transition in order[offsets[state]:offsets[state + 1]]:
+            source = sources[transition]
+            new_distance = distance + costs[transition]
+            if new_distance < distances[source]:
+                distances[source] = new_distance
+                heapq.heappush(heap, (new_distance, source))
+    return distances
+
+# The number of states given to the batched heuristic at once
+# The chunks keep the temporary lists small when the state space is large
+AUDIT_CHUNK_SIZE = 4096
+
+# Evaluate the heuristic once for every state
+# The states are given in chunks to the batched version of the heuristic (see 'heuristic_batch' in problem.py)
+# which falls back to one call per state if the heuristic has no batched version
+def evaluate_heuristic(problem: Problem, heuristic: HeuristicFunction, space: StateSpace,
+                       chunk_size: int = AUDIT_CHUNK_SIZE) -> array:
+    batch = heuristic_batch(heuristic)
+    states = space.states
+    values = array('d')
+    for begin in range(0, len(states), chunk_size):
+        values.extend(batch(problem, states[begin:begin + chunk_size]))
+    return values
+
+# Check the heuristic on every reachable state and transition and return the report with the 'top' worst violations
+# 'tolerance' is used to ignore floating point errors
+def audit_heuristic(problem: Problem, heuristic: HeuristicFunction, max_states: int = None,
+                    top: int = 10, tolerance: float = 1e-9) -> AuditReport:
+    start = time.perf_counter()
+    space = enumerate_states(problem, max_states)
+    exact = cost_to_go(space)
+    enumeration_time = time.perf_counter() - start
+    start = time.perf_counter()
+    values = evaluate_heuristic(problem, heuristic, space)
+    heuristic_time = time.perf_counter() - start
+    # The violations are kept as (excess, kind, index) and only the worst ones are turned into a Violation
+    consistency = [
+        (values[source] - values[target] - cost, "consistency", transition)
+        for transition, (source, target, cost) in enumerate(zip(space.sources, space.targets, space.costs))
+        if values[source] - values[target] > cost + tolerance
+    ]
+    admissibility = [
+        (value - bound, "admissibility", state)
+        for state, (value, bound) in enumerate(zip(values, exact))
+        if value > bound + tolerance
+    ]
+    goal = [(abs(values[state]), "goal", state) for state in space.goals if abs(values[state]) > tolerance]
+    worst = []
+    for excess, kind, index in heapq.nlargest(top, consistency + admissibility + goal, key=lambda item: item[0]):
+        if kind == "consistency":
+            source, target = space.sources[index], space.targets[index]
+            worst.append(Violation(kind, excess, space.states[source], values[source], space.costs[index],
+                                   space.actions[index], space.states[target], values[target]))
+        else:
+            worst.append(Violation(kind, excess, space.states[index], values[index], exact[index] if kind == "admissibility" else 0))
+    return AuditReport(len(space.states), len(space.targets), len(consistency), len(admissibility), len(goal),
+                       worst, enumeration_time, heuristic_time)
+
+def main(args: argparse.Namespace):
+    problem = load_function(PROBLEM_CLASSES[args.problem], use_local=True).from_file(args.path)
+    heuristic: Callable = load_function(args.heuristic, use_local=True)
+    try:
+        report = audit_heuristic(problem, heuristic, args.max_states, args.top)
+    except ValueError as err:
+        print(f"ERROR: {err}")
+        exit(-1)
+    print(f"States: {report.states}, Transitions: {report.transitions}")
+    print(f"Enumeration time: {report.enumeration_time} seconds, Heuristic time: {report.heuristic_time} seconds")
+    print(f"Consistency violations: {report.consistency_violations}")
+    print(f"Admissibility violations: {report.admissibility_violations}")
+    print(f"Goal violations: {report.goal_violations}")
+    for rank, violation in enumerate(report.worst, 1):
+        print(f"#{rank} {violation.kind} (excess = {violation.excess})")
+        print(violation)
+    print(f"The heuristic is {'' if report.admissible else 'NOT '}admissible and {'' if report.consistent else 'NOT '}consistent")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Check the consistency and admissibility of a heuristic on all the reachable states of a problem")
+    parser.add_argument("path", help="the path of the problem file")
+    parser.add_argument("heuristic", help="the heuristic as 'module.function'")
+    parser.add_argument("--problem", "-p", default="dungeon", choices=list(PROBLEM_CLASSES),
+                        help="the type of the problem")
+    parser.add_argument("--max-states", "-m", type=int, default=1000000,
+                        help="stop with an error if the problem has more reachable states than this")
+    parser.add_argument("--top", "-t", type=int, default=10,
+                        help="the number of worst violations to print")
+
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
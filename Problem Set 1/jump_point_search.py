@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional
+import heapq
+
+from dungeon import DungeonLayout, DungeonProblem
+from mathutils import Direction, Point
+
+# This file contains a jump point search (JPS) pathfinder for the 4-connected dungeon grids
+# On a grid where all the moves cost 1, many shortest paths have the same length (they only differ in the order of the moves)
+# so a plain BFS expands every open cell. JPS only follows one "canonical" ordering of the moves:
+#   move horizontally first and only turn vertically, then turn horizontally only where a wall forces it
+# It scans along straight lines without expanding the cells on them and only puts the "jump points"
+# (the cells where the canonical path may turn) in the A* frontier.
+#
+# The grid is stored as a flat bytearray with a border of walls around it, so a cell has the index (y + 1) * stride + x + 1
+# where stride = width + 2. Moving horizontally adds +1/-1 to the index and moving vertically adds +stride/-stride.
+
+class JumpPointSearch:
+    width: int
+    height: int
+    stride: int         # the number of cells in a row of the padded grid
+    walkable: bytearray # padded cell index -> 1 if the cell is walkable, 0 otherwise
+
+    def __init__(self, layout: DungeonLayout) -> None:
+        self.width, self.height = layout.width, layout.height
+        self.stride = self.width + 2
+        self.walkable = bytearray(self.stride * (self.height + 2))
+        for point in layout.walkable:
+            if 0 <= point.x < self.width and 0 <= point.y < self.height:
+                self.walkable[self.index(point)] = 1
+
+    def index(self, point: Point) -> int:
+        return (point.y + 1) * self.stride + point.x + 1
+
+    def point(self, index: int) -> Point:
+        y, x = divmod(index, self.stride)
+        return Point(x - 1, y - 1)
+
+    # Scan vertically (step = +stride or -stride) and return the first jump point, or -1 if a wall is reached first
+    # A cell is a jump point if it is the goal or if it has a forced horizontal neighbor:
+    # a walkable neighbor whose cell behind it (against the move) is a wall, so it can not be reached by moving horizontally first
+    def _jump_vertical(self, index: int, step: int, goal: int) -> int:
+        walkable = self.walkable
+        while True:
+            index += step
+            if not walkable[index]:
+                return -1
+            if index == goal:
+                return index
+            if (walkable[index - 1] and not walkable[index - 1 - step]) or (walkable[index + 1] and not walkable[index + 1 - step]):
+                return index
+
+    # Scan horizontally (step = +1 or -1) and return the first jump point, or -1 if a wall is reached first
+    # Turning vertically is always allowed after a horizontal move, so a cell is a jump point if it is the goal
+    # or if a vertical scan from it finds a jump point
+    def _jump_horizontal(self, index: int, step: int, goal: int) -> int:
+        walkable, stride = self.walkable, self.stride
+        while True:
+            index += step
+            if not walkable[index]:
+                return -1
+            if index == goal:
+                return index
+            if self._jump_vertical(index, stride, goal) != -1 or self._jump_vertical(index, -stride, goal) != -1:
+                return index
+
+    # Returns the directions (index steps) to scan from a jump point given the step that reached it (0 for the start)
+    def _directions(self, index: int, step: int) -> List[int]:
+        stride = self.stride
+        if step == 0:
+            return [1, -1, stride, -stride]
+        if step == 1 or step == -1:
+            return [step, stride, -stride]
+        walkable = self.walkable
+        directions = [step]
+        for side in (1, -1):
+            if walkable[index + side] and not walkable[index + side - step]:
+                directions.append(side)
+        return directions
+
+    # Run A* over the jump points and return the jump points from start to goal (as padded indices)
+    # Consecutive jump points are on the same row or column. Returns None if the goal can not be reached.
+    def jump_points(self, start: Point, goal: Point) -> Optional[List[int]]:
+        walkable, stride = self.walkable, self.stride
+        start_index, goal_index = self.index(start), self.index(goal)
+        if not (self._inside(start) and self._inside(goal)) or not walkable[start_index] or not walkable[goal_index]:
+            return None
+        goal_row, goal_column = divmod(goal_index, stride)
+        def heuristic(index: int) -> int:
+            row, column = divmod(index, stride)
+            return abs(row - goal_row) + abs(column - goal_column)
+        # Every jump point stores its cost, its parent jump point and the step that reached it
+        costs: Dict[int, int] = {start_index: 0}
+        parents: Dict[int, int] = {start_index: -1}
+        steps: Dict[int, int] = {start_index: 0}
+        explored = set()
+        frontier = [(heuristic(start_index), 0, start_index)]
+        while frontier:
+            _, cost, index = heapq.heappop(frontier)
+            if index in explored:
+                continue
+            if index == goal_index:
+                jump_points = []
+                while index != -1:
+                    jump_points.append(index)
+                    index = parents[index]
+                jump_points.reverse()
+                return jump_points
+            explored.add(index)
+            for step in self._directions(index, steps[index]):
+                if step == 1 or step == -1:
+                    jump_point = self._jump_horizontal(index, step, goal_index)
+                else:
+                    jump_point = self._jump_vertical(index, step, goal_index)
+                if jump_point == -1 or jump_point in explored:
+                    continue
+                # The distance along a row is the difference of the indices, and along a column it is divided by the stride
+                jump_cost = cost + (abs(jump_point - index) if step == 1 or step == -1 else abs(jump_point - index) // stride)
+                if jump_cost < costs.get(jump_point, float('inf')):
+                    costs[jump_point] = jump_cost
+                    parents[jump_point] = index
+                    steps[jump_point] = step
+                    heapq.heappush(frontier, (jump_cost + heuristic(jump_point), jump_cost, jump_point))
+        return None
+
+    def _inside(self, point: Point) -> bool:
+        return 0 <= point.x < self.width and 0 <= point.y < self.height
+
+    # Returns the length of the shortest path between two points (or infinity if one can not reach the other)
+    def distance(self, start: Point, goal: Point) -> float:
+        jump_points = self.jump_points(start, goal)
+        if jump_points is None:
+            return float('inf')
+        stride = self.stride
+        return sum(
+            abs(current - previous) if abs(current - previous) < stride else abs(current - previous) // stride
+            for previous, current in zip(jump_points, jump_points[1:])
+        )
+
+    # Returns the shortest path from start to goal as a list of points (including both) or None if there is no path
+    def path(self, start: Point, goal: Point) -> Optional[List[Point]]:
+        jump_points = self.jump_points(start, goal)
+        if jump_points is None:
+            return None
+        stride = self.stride
+        indices = [jump_points[0]]
+        for previous, current in zip(jump_points, jump_points[1:]):
+            step = 1 if abs(current - previous) < stride else stride
+            if current < previous:
+                step = -step
+            indices.extend(range(previous + step, current + step, step))
+        return [self.point(index) for index in indices]
+
+    # Returns the actions that move the player along the shortest path from start to goal (or None if there is no path)
+    def actions(self, start: Point, goal: Point) -> Optional[List[Direction]]:
+        path = self.path(start, goal)
+        if path is None:
+            return None
+        directions = {direction.to_vector(): direction for direction in Direction}
+        return [directions[current - previous] for previous, current in zip(path, path[1:])]
+
+# Returns the jump point search of the problem layout
+# It is stored in the problem cache so the heuristics and the agents can share it
+def get_jump_point_search(problem: DungeonProblem) -> JumpPointSearch:
+    cache = problem.cache()
+    search = cache.get("jump_point_search")
+    if search is None:
+        search = cache["jump_point_search"] = JumpPointSearch(problem.layout)
+    return search
+
+# Returns the maze distance between two points of the problem layout
+def maze_distance(problem: DungeonProblem, p1: Point, p2: Point) -> float:
+    return get_jump_point_search(problem).distance(p1, p2)
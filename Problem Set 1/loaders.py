@@ -0,0 +1,306 @@
+from typing import Dict, Iterator, List, Optional, TextIO
+from array import array
+from collections.abc import Mapping, Set
+import json, re
+
+from dungeon import DungeonLayout, DungeonProblem, DungeonState, DungeonTile
+from graph import GraphNode, GraphRoutingProblem
+from mathutils import Point
+
+# This file contains memory-lean loaders for large graph and dungeon files
+# Instead of building GraphNode/Point objects for the whole file, they read it piece by piece into integer-indexed arrays:
+#   a graph becomes a CSR adjacency (the neighbors of node i are targets[offsets[i]:offsets[i + 1]])
+#   a dungeon becomes a walkable bitmap (one byte per cell in row-major order)
+# The usual problem classes can then be built from them with 'to_problem', and their nodes and points are only
+# created when a search reaches them.
+# We use the built-in 'array' module instead of numpy since only the built-in modules are allowed
+
+# The size of the chunks read from the files (in characters)
+CHUNK_SIZE = 1 << 16
+
+# The white spaces between the JSON values
+WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+# The translation table that maps every character of a dungeon line to 1 (walkable) or 0 (wall)
+WALKABLE_TABLE = bytes(0 if character == ord(DungeonTile.WALL) else 1 for character in range(256))
+
+# A minimal streaming JSON reader: it only keeps a chunk of the file in memory and decodes one value at a time
+# It is used to walk through the outer objects of a file while decoding their (small) values with the standard json module
+class JsonStream:
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE) -> None:
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    # Read the next chunk of the file (dropping the part of the buffer that was already consumed)
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    # Skip the white spaces and return the next character without consuming it ("" at the end of the file)
+    def peek(self) -> str:
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    # Consume the next character and raise a ValueError if it is not one of the expected ones
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} but found {character or 'the end of the file'!r}")
+        self.position += 1
+        return character
+
+    # Decode the next JSON value
+    # If it reaches the end of the buffer, more of the file is read since the value may continue in the next chunk
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    # Iterate over the keys of an object without decoding its values
+    # The caller must consume every value (using 'value' or 'keys') before asking for the next key
+    def keys(self) -> Iterator[str]:
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+# A graph with integer node ids where the adjacency is stored in CSR form
+# The node ids follow the order of the nodes in the file (as the keys of 'GraphRoutingProblem.adjacency')
+# and the neighbors of every node are sorted by name (as in 'GraphRoutingProblem.from_file')
+class CompactGraph:
+    names: List[str]        # node id -> name
+    ids: Dict[str, int]     # name -> node id
+    xs: array               # node id -> x position
+    ys: array               # node id -> y position
+    offsets: array          # node id -> the index of its first neighbor in 'targets' (offsets[-1] is the number of edges)
+    targets: array          # the neighbor ids of all the nodes
+    start: int
+    goal: int
+    nodes: List[Optional[GraphNode]] # node id -> its GraphNode (None until it is requested)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # Returns the neighbor ids of a node
+    def neighbors(self, node: int) -> array:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    # Returns the GraphNode of a node id
+    # It is created the first time it is requested and the same object is returned after that
+    def node(self, node: int) -> GraphNode:
+        graph_node = self.nodes[node]
+        if graph_node is None:
+            x, y = self.xs[node], self.ys[node]
+            # The positions are stored as floats but the points of the problem files are integers
+            graph_node = self.nodes[node] = GraphNode(self.names[node], Point(int(x) if x.is_integer() else x, int(y) if y.is_integer() else y))
+        return graph_node
+
+    # Returns the same graph with every edge reversed (it shares the names, the positions and the created nodes)
+    # The reversed CSR arrays are built with a counting pass over the targets, so no node is created
+    def reversed(self) -> 'CompactGraph':
+        size = len(self)
+        offsets = array('l', [0]) * (size + 1)
+        for target in self.targets:
+            offsets[target + 1] += 1
+        for node in range(size):
+            offsets[node + 1] += offsets[node]
+        # The sources are visited in order, so the reversed neighbors of every node stay in the order of the node ids
+        targets, positions = array('l', [0]) * len(self.targets), offsets[:-1]
+        for source in range(size):
+            for target in self.targets[self.offsets[source]:self.offsets[source + 1]]:
+                targets[positions[target]] = source
+                positions[target] += 1
+        graph = CompactGraph()
+        graph.names, graph.ids, graph.xs, graph.ys, graph.nodes = self.names, self.ids, self.xs, self.ys, self.nodes
+        graph.offsets, graph.targets = offsets, targets
+        graph.start, graph.goal = self.goal, self.start
+        return graph
+
+    # Build a GraphRoutingProblem that reads its adjacency from this graph
+    def to_problem(self) -> GraphRoutingProblem:
+        return GraphRoutingProblem(self.node(self.start), self.node(self.goal), CompactAdjacency(self))
+
+# A read-only dictionary (GraphNode -> list of neighbor GraphNodes) over a compact graph
+# The nodes are created when they are requested and reused by the later requests
+class CompactAdjacency(Mapping):
+    def __init__(self, graph: CompactGraph) -> None:
+        self.graph = graph
+
+    def __getitem__(self, node: GraphNode) -> List[GraphNode]:
+        graph = self.graph
+        return [graph.node(neighbor) for neighbor in graph.neighbors(graph.ids[node.name])]
+
+    def __iter__(self) -> Iterator[GraphNode]:
+        return (self.graph.node(index) for index in range(len(self.graph)))
+
+    def __len__(self) -> int:
+        return len(self.graph)
+
+    def __contains__(self, node) -> bool:
+        return isinstance(node, GraphNode) and node.name in self.graph.ids
+
+    # The adjacency of the reversed graph (used by 'GraphRoutingProblem.reverse' instead of walking every node)
+    def reversed(self) -> 'CompactAdjacency':
+        return CompactAdjacency(self.graph.reversed())
+
+# Read a graph routing file into a compact graph without loading the whole file
+# The adjacent names that are not nodes of the graph are dropped (as in 'GraphRoutingProblem.from_file')
+def load_graph(path: str, chunk_size: int = CHUNK_SIZE) -> CompactGraph:
+    # Every name gets a temporary id the first time it is seen (as a node or as a neighbor)
+    # since a node can be a neighbor before it is defined
+    temporary: Dict[str, int] = {}
+    defined = array('l')            # temporary id -> the node id (-1 if it is not defined yet)
+    names: List[str] = []
+    xs, ys = array('d'), array('d')
+    # The edges are grouped by node (in the order of the nodes): the neighbors of node i end at ends[i]
+    ends, targets = array('l'), array('l')
+    start = goal = None
+    with open(path, 'r') as f:
+        stream = JsonStream(f, chunk_size)
+        for key in stream.keys():
+            if key == "graph":
+                for name in stream.keys():
+                    item = stream.value()
+                    index = temporary.setdefault(name, len(defined))
+                    if index == len(defined):
+                        defined.append(len(names))
+                    else:
+                        defined[index] = len(names)
+                    names.append(name)
+                    x, y = item.get("position", [0, 0])
+                    xs.append(x)
+                    ys.append(y)
+                    for adjacent in sorted(item.get("adjacent", [])):
+                        index = temporary.setdefault(adjacent, len(defined))
+                        if index == len(defined):
+                            defined.append(-1)
+                        targets.append(index)
+                    ends.append(len(targets))
+            elif key == "start":
+                start = stream.value()
+            elif key == "goal":
+                goal = stream.value()
+            else:
+                stream.value()
+    del temporary
+    graph = CompactGraph()
+    graph.names = names
+    graph.xs, graph.ys = xs, ys
+    # Replace the temporary ids by the node ids and drop the neighbors that are not defined
+    graph.targets = array('l', (defined[target] for target in targets))
+    graph.offsets = array('l', [0]) + ends
+    if -1 in graph.targets:
+        kept, graph.targets = graph.targets, array('l')
+        for node in range(len(names)):
+            graph.targets.extend(target for target in kept[ends[node - 1] if node else 0:ends[node]] if target != -1)
+            graph.offsets[node + 1] = len(graph.targets)
+    graph.ids = {name: index for index, name in enumerate(names)}
+    graph.start, graph.goal = graph.ids[start], graph.ids[goal]
+    graph.nodes = [None] * len(names)
+    return graph
+
+# A read-only set of the walkable points of a dungeon stored as a bitmap (one byte per cell in row-major order)
+# It can be used as 'DungeonLayout.walkable' and only creates the points when it is iterated
+class WalkableBitmap(Set):
+    def __init__(self, width: int, height: int, bitmap: bytearray) -> None:
+        self.width = width
+        self.height = height
+        self.bitmap = bitmap
+        self.count = bitmap.count(1)
+
+    def __contains__(self, point) -> bool:
+        x, y = point.x, point.y
+        return 0 <= x < self.width and 0 <= y < self.height and self.bitmap[y * self.width + x] == 1
+
+    def __iter__(self) -> Iterator[Point]:
+        width, bitmap = self.width, self.bitmap
+        index = bitmap.find(1)
+        while index != -1:
+            yield Point(index % width, index // width)
+            index = bitmap.find(1, index + 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+# A dungeon level where every cell is an int (y * width + x)
+class CompactDungeon:
+    width: int
+    height: int
+    walkable: bytearray     # cell -> 1 if the cell is walkable, 0 otherwise
+    player: int
+    exit: Optional[int]
+    coins: array            # the cells of the coins (in row-major order)
+
+    def point(self, cell: int) -> Point:
+        return Point(cell % self.width, cell // self.width)
+
+    # Build a DungeonProblem whose walkable area is read from the bitmap
+    def to_problem(self) -> DungeonProblem:
+        problem = DungeonProblem()
+        exit = None if self.exit is None else self.point(self.exit)
+        problem.layout = DungeonLayout(self.width, self.height, WalkableBitmap(self.width, self.height, self.walkable), exit)
+        problem.initial_state = DungeonState(problem.layout, self.point(self.player), frozenset(self.point(cell) for cell in self.coins))
+        return problem
+
+# Read a dungeon file into a compact dungeon line by line
+def load_dungeon(path: str) -> CompactDungeon:
+    rows: List[bytes] = []
+    width = 0
+    player = exit = None
+    coins: List[tuple] = []
+    # The rows are stored as bitmaps until the width is known since the lines can have different lengths
+    # If a tile appears more than once, the last one is used (as in 'DungeonProblem.from_text')
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            y = len(rows)
+            rows.append(line.encode('ascii', 'replace').translate(WALKABLE_TABLE))
+            width = max(width, len(line))
+            player_x = line.rfind(DungeonTile.PLAYER)
+            if player_x != -1:
+                player = (player_x, y)
+            exit_x = line.rfind(DungeonTile.EXIT)
+            if exit_x != -1:
+                exit = (exit_x, y)
+            x = line.find(DungeonTile.COIN)
+            while x != -1:
+                coins.append((x, y))
+                x = line.find(DungeonTile.COIN, x + 1)
+    dungeon = CompactDungeon()
+    dungeon.width, dungeon.height = width, len(rows)
+    dungeon.walkable = bytearray(b"".join(row.ljust(width, b"\0") for row in rows))
+    dungeon.player = player[1] * width + player[0]
+    dungeon.exit = None if exit is None else exit[1] * width + exit[0]
+    dungeon.coins = array('l', (y * width + x for x, y in coins))
+    return dungeon
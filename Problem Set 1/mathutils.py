@@ -32,6 +32,11 @@ class Point:
     def __iter__(self) -> Iterator[int]:
         return iter((self.x, self.y))
 
+    # frozen dataclasses with __slots__ can not be unpickled by assigning the fields,
+    # so we rebuild the point from its components (needed to send points between processes)
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
+
 # This is a helper function to compute the manhattan distance between 2 points
 def manhattan_distance(p1: Point, p2: Point) -> int:
     return abs(p1.x - p2.x) + abs(p1.y - p2.y)
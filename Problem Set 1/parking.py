@@ -3,9 +3,12 @@ from problem import Problem
 from mathutils import Direction, Point
 from helpers import utils
 
-#TODO: (Optional) Instead of Any, you can define a type for the parking state
-#2D list of the parking  
-ParkingState = list[list[str]]
+# The parking state is a tuple of 2 items:
+#   1. A tuple where the i-th item is the cell index of car 'i' (every passage has an index in row-major order)
+#   2. The occupancy bitmask: bit 'c' is set if there is a car at cell 'c'
+# The occupancy is fully defined by the car positions, it is only kept in the state so that checking
+# if a cell is free and moving a car are O(1) (and the state is hashable so it can be added to sets)
+ParkingState = Tuple[Tuple[int, ...], int]
 # An action of the parking problem is a tuple containing an index 'i' and a direction 'd' where car 'i' should move in the direction 'd'.
 ParkingAction = Tuple[int, Direction]
 
@@ -17,92 +20,85 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
                             # if a position does not contain a parking slot, it will not be in this dictionary.
     width: int              # The width of the parking lot.
     height: int             # The height of the parking lot.
+    # The following tables are precomputed once from the passages and the slots (see 'build_tables')
+    cells: List[Point]              # cell index -> position
+    cell_indices: Dict[Point, int]  # position -> cell index
+    neighbors: List[List[int]]      # cell index -> direction -> neighbor cell index (-1 if it is a wall)
+    slot_owner: List[int]           # cell index -> the car whose slot is at this cell (-1 if it is not a slot)
+    goal_cars: Tuple[int, ...]      # the cell index of the slot of every car (-1 if the car has no slot)
+    goal_slots: Tuple[Tuple[int, int], ...] # (car, slot cell index) for every car that has a slot
+
+    # Precompute the cell indices, the neighbor table and the slot table
+    def build_tables(self):
+        self.cells = sorted(self.passages, key=lambda point: (point.y, point.x))
+        self.cell_indices = {point: index for index, point in enumerate(self.cells)}
+        self.neighbors = [
+            [self.cell_indices.get(cell + direction.to_vector(), -1) for direction in Direction]
+            for cell in self.cells
+        ]
+        self.slot_owner = [self.slots.get(cell, -1) for cell in self.cells]
+        slot_cells = {car: self.cell_indices[position] for position, car in self.slots.items()}
+        self.goal_cars = tuple(slot_cells.get(car, -1) for car in range(len(self.cars)))
+        self.goal_slots = tuple(sorted(slot_cells.items()))
 
     # This function should return the initial state
     def get_initial_state(self) -> ParkingState:
-        #initilize all slots with walls
-        initial_State= [["#" for i in range(self.width)] for j in range(self.height)]
-
-        for passage in self.passages:
-            #check if passage is slot and update the state
-            if passage  in self.slots.keys():
-                initial_State[passage.y][passage.x]=str(self.slots[passage])
-            #check if passage is car and update the state
-            elif passage in self.cars:
-                initial_State[passage.y][passage.x]= chr(ord('A') + self.cars.index(passage))
-            #the passage is empty slot
-            else:
-                initial_State[passage.y][passage.x]="."
-        return initial_State
-
+        cars = tuple(self.cell_indices[car] for car in self.cars)
+        occupied = 0
+        for cell in cars:
+            occupied |= 1 << cell
+        return cars, occupied
 
-    
     # This function should return True if the given state is a goal. Otherwise, it should return False.
     def is_goal(self, state: ParkingState) -> bool:
-        #check if all cars are in their slots
-        for slot in self.slots.keys():
-            #if solt of the car dosn't contain the index of the car return false
-            if  state[slot.y][slot.x]!=chr(self.slots[slot] + ord('A')) :
-                return False
-        return True
+        #check if all cars are in their slots (the cars without a slot can be anywhere)
+        cars = state[0]
+        return all(cars[car] == cell for car, cell in self.goal_slots)
     
     # This function returns a list of all the possible actions that can be applied to the given state
     def get_actions(self, state: ParkingState) -> List[ParkingAction]:
-         actions:list=[]
-         #loop on every position in state
-         for i in range (self.height):
-             for j in range(self.width):
-                 #for every position check if it contain a car
-                 if("A"<=state[i][j]<="Z"):
-                     #for every direction check if the car can move in this direction
-                     for dirc in Direction:
-                        new_x = j + dirc.to_vector().x
-                        new_y = i + dirc.to_vector().y
-                        if 0 <= new_x < self.width and 0 <= new_y < self.height:  # Check bounds
-                         newPosition=state[new_y][new_x]
-                         #check if newposition is empty
-                         if newPosition=="." or newPosition.isdigit():
-                             actions.append((ord(state[i][j])-ord('A'),dirc))
-         return actions
+        cars, occupied = state
+        actions: list = []
+        neighbors = self.neighbors
+        #for every car check if it can move in each direction (the next cell is a passage without a car)
+        for car, cell in enumerate(cars):
+            for direction, neighbor in zip(Direction, neighbors[cell]):
+                if neighbor != -1 and not occupied >> neighbor & 1:
+                    actions.append((car, direction))
+        return actions
     
     # This function returns a new state which is the result of applying the given action to the given state
     def get_successor(self, state: ParkingState, action: ParkingAction) -> ParkingState:
-        new_state = [row[:] for row in state]   
-        initial_state=self.get_initial_state()
-         #loop on every position in state
-        for i in range (self.height):
-             for j in range(self.width):
-                 #for every position check if it contain the car in the action(the car that should move)
-                 if(ord(state[i][j])-ord('A')==action[0]):
-                   
-                    new_x = j + action[1].to_vector().x
-                    new_y = i + action[1].to_vector().y
-                    if 0 <= new_x < self.width and 0 <= new_y < self.height:  # Check bounds
-                    #put the car in the new position 
-                     new_state[new_y][new_x]=chr(action[0]+ord('A'))
-                     #reset the empty passage
-                     new_state[i][j]=initial_state[i][j] if initial_state[i][j].isdigit() else "."
-                     
-        return new_state
+        cars, occupied = state
+        car, direction = action
+        cell = cars[car]
+        neighbor = self.neighbors[cell][direction]
+        # If the car can not move in this direction, the state does not change
+        if neighbor == -1 or occupied >> neighbor & 1:
+            return state
+        #move the car and update its old and new cells in the occupancy
+        return cars[:car] + (neighbor,) + cars[car+1:], occupied ^ (1 << cell) ^ (1 << neighbor)
     
     # This function returns the cost of applying the given action to the given state
     def get_cost(self, state: ParkingState, action: ParkingAction) -> float:
-        #loop on every position in state
-        for i in range (self.height):
-             for j in range(self.width):
-                 #for every position check if it contain the car in the action(the car that should move)
-                 if "z">=state[i][j]>="A" and (ord(state[i][j])-ord('A')==action[0]):
-                     #check if new position contain slot or not
-                     new_x=j+action[1].to_vector().x
-                     new_y=i+action[1].to_vector().y
-                     newPosition=state[new_y][new_x]
-                     #if new position is empty or if it the slot of the car itself
-                     if(newPosition=="." or( Point(new_x,new_y)in self.slots.keys() and self.slots[Point(new_x,new_y)]==ord(state[i][j])-ord('A')) ):
-                         return 1
-                     #if it contain a slot
-                     else :
-                       return 101
-                      
+        car, direction = action
+        neighbor = self.neighbors[state[0][car]][direction]
+        owner = self.slot_owner[neighbor] if neighbor != -1 else -1
+        #if new position is not a slot or if it the slot of the car itself
+        if owner == -1 or owner == car:
+            return 1
+        #if it is the slot of another car
+        return 101
+
+    # This function converts a state to a string containing the grid representation of the parking lot
+    def format_state(self, state: ParkingState) -> str:
+        grid = [["#"] * self.width for _ in range(self.height)]
+        for cell in self.cells:
+            grid[cell.y][cell.x] = str(self.slots[cell]) if cell in self.slots else "."
+        for car, cell in enumerate(state[0]):
+            position = self.cells[cell]
+            grid[position.y][position.x] = chr(ord('A') + car)
+        return '\n'.join(''.join(row) for row in grid)
       
     
      # Read a parking problem from text containing a grid of tiles
@@ -128,6 +124,7 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
         problem.slots = {position:index for index, position in slots.items()}
         problem.width = width
         problem.height = height
+        problem.build_tables()
         return problem
 
     # Read a parking problem from file containing a grid of tiles
@@ -0,0 +1,122 @@
+from typing import List, Tuple
+from array import array
+import heapq
+
+from parking import ParkingProblem, ParkingState
+
+# This file contains admissible heuristics for the parking problem
+# Each action moves one car, so the cost of a solution is the sum of the costs of the moves of every car
+# This lets us estimate the cost of every car (or small group of cars) alone and add the estimates together
+
+# We use the built-in 'array' module instead of numpy since only the built-in modules are allowed
+
+# The number of cars in each group of the pattern database
+PATTERN_GROUP_SIZE = 2
+# The maximum number of entries in the table of a single group (larger groups are split into single cars)
+PATTERN_MAX_ENTRIES = 2**22
+
+# The cost for a car to move into a cell: 1 if the cell is not a slot or if it is the slot of the car itself, 101 otherwise
+def move_cost(problem: ParkingProblem, car: int, cell: int) -> int:
+    owner = problem.slot_owner[cell]
+    return 1 if owner == -1 or owner == car else 101
+
+# Compute the cost for a car to reach its slot from every cell, ignoring all the other cars
+# It runs a backward Dijkstra from the slot (a plain BFS when there are no other slots on the way)
+# Unreachable cells get -1 and a car without a slot gets 0 everywhere (it is never out of place)
+def car_distances(problem: ParkingProblem, car: int) -> array:
+    slot = problem.goal_cars[car]
+    if slot == -1:
+        return array('i', [0]) * len(problem.cells)
+    distances = array('i', [-1]) * len(problem.cells)
+    queue = [(0, slot)]
+    while queue:
+        distance, cell = heapq.heappop(queue)
+        if distances[cell] != -1:
+            continue
+        distances[cell] = distance
+        # Moving from the neighbor into this cell costs the cost of entering this cell
+        cost = move_cost(problem, car, cell)
+        for neighbor in problem.neighbors[cell]:
+            if neighbor != -1 and distances[neighbor] == -1:
+                heapq.heappush(queue, (distance + cost, neighbor))
+    return distances
+
+# Returns the distance table of every car (computed once and stored in the problem cache)
+def get_car_distances(problem: ParkingProblem) -> List[array]:
+    cache = problem.cache()
+    if "car_distances" not in cache:
+        cache["car_distances"] = [car_distances(problem, car) for car in range(len(problem.cars))]
+    return cache["car_distances"]
+
+# This heuristic returns the sum of the costs for every car to reach its slot if it was alone in the parking lot
+def parking_heuristic(problem: ParkingProblem, state: ParkingState) -> float:
+    total = 0
+    for distances, cell in zip(get_car_distances(problem), state[0]):
+        distance = distances[cell]
+        if distance == -1:
+            return float('inf')
+        total += distance
+    return total
+
+# Compute the pattern database of a group of cars:
+# the exact cost for the cars of the group to reach their slots if they were the only cars in the parking lot
+# Only the moves of the cars in the group are counted so the tables of disjoint groups can be added together
+# The cost of the positions (c_0, c_1, ...) of the group cars is stored at index c_0 + c_1 * size + c_2 * size^2 ...
+# Unreachable positions get -1
+def build_pattern_database(problem: ParkingProblem, group: Tuple[int, ...]) -> array:
+    size = len(problem.cells)
+    strides = [size ** index for index in range(len(group))]
+    table = array('i', [-1]) * (size ** len(group))
+    goal = tuple(problem.goal_cars[car] for car in group)
+    # Backward Dijkstra from the goal positions
+    queue = [(0, goal)]
+    while queue:
+        cost, cells = heapq.heappop(queue)
+        index = sum(cell * stride for cell, stride in zip(cells, strides))
+        if table[index] != -1:
+            continue
+        table[index] = cost
+        # The last move was one of the group cars moving into its current cell from a free neighbor cell
+        for position, (car, cell) in enumerate(zip(group, cells)):
+            move = cost + move_cost(problem, car, cell)
+            for neighbor in problem.neighbors[cell]:
+                if neighbor == -1 or neighbor in cells:
+                    continue
+                previous = cells[:position] + (neighbor,) + cells[position+1:]
+                if table[index + (neighbor - cell) * strides[position]] == -1:
+                    heapq.heappush(queue, (move, previous))
+    return table
+
+# Returns the groups and their pattern databases (computed once and stored in the problem cache)
+def get_pattern_databases(problem: ParkingProblem) -> List[Tuple[Tuple[int, ...], array]]:
+    cache = problem.cache()
+    if "pattern_databases" not in cache:
+        # The cars without a slot never add to the cost, so they are left out of the groups
+        cars = [car for car, _ in problem.goal_slots]
+        groups = [tuple(cars[start:start+PATTERN_GROUP_SIZE]) for start in range(0, len(cars), PATTERN_GROUP_SIZE)]
+        databases = []
+        for group in groups:
+            if len(problem.cells) ** len(group) > PATTERN_MAX_ENTRIES:
+                # the group table is too large, so every car of the group gets its own table
+                databases.extend(((car,), build_pattern_database(problem, (car,))) for car in group)
+            else:
+                databases.append((group, build_pattern_database(problem, group)))
+        cache["pattern_databases"] = databases
+    return cache["pattern_databases"]
+
+# This heuristic adds the pattern database costs of disjoint groups of cars
+# It is at least as large as 'parking_heuristic' since it accounts for the cars of the same group blocking each other
+def pattern_database_heuristic(problem: ParkingProblem, state: ParkingState) -> float:
+    size = len(problem.cells)
+    cars = state[0]
+    total = 0
+    for group, table in get_pattern_databases(problem):
+        index, stride = 0, 1
+        for car in group:
+            index += cars[car] * stride
+            stride *= size
+        cost = table[index]
+        if cost == -1:
+            return float('inf')
+        total += cost
+    return total
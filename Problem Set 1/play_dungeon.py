@@ -1,9 +1,10 @@
 from typing import List
-from dungeon import DungeonProblem, Direction, DungeonState, DungeonTile
+from dungeon import DungeonProblem, FastDungeonProblem, Direction, DungeonState, DungeonTile
 from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
 from helpers.utils import fetch_tracked_call_count
 from helpers.heuristic_checks import test_heuristic_consistency
-from functools import lru_cache
+from search_stats import SearchStats
+from functools import lru_cache, partial
 import argparse, time
 
 def colored_dungeon(level: str):
@@ -15,22 +16,30 @@ def colored_dungeon(level: str):
     level = level.replace(DungeonTile.EXIT, f'{bcolors.BRIGHT_BLUE}{DungeonTile.EXIT}{bcolors.ENDC}')
     return level
 
-# Return the heuristic selected by the user
-def get_heuristic(name: str):
+# Return the heuristic selected by the user (the int state version if fast is True)
+def get_heuristic(name: str, fast: bool = False):
     if name == "zero":
         return lambda *_: 0
     if name == "weak":
-        from dungeon_heuristic import weak_heuristic
-        return weak_heuristic
+        from dungeon_heuristic import weak_heuristic, fast_weak_heuristic
+        return fast_weak_heuristic if fast else weak_heuristic
     if name == "strong":
-        from dungeon_heuristic import strong_heuristic
-        return strong_heuristic
+        from dungeon_heuristic import strong_heuristic, fast_strong_heuristic
+        return fast_strong_heuristic if fast else strong_heuristic
+    if name == "maze":
+        from dungeon_heuristic import maze_heuristic, fast_maze_heuristic
+        return fast_maze_heuristic if fast else maze_heuristic
     print(f"Requested Heuristic '{name}' is invalid")
     exit(-1)
 
 # Create an agent based on the user selections
-def create_agent(args: argparse.Namespace):
+# If a stats collector is given, it is passed to the search function to record the search cost
+def create_agent(args: argparse.Namespace, stats: SearchStats = None):
     agent_type: str = args.agent
+    # This adds the stats collector to the arguments of the search function
+    def with_stats(search_fn):
+        return search_fn if stats is None else partial(search_fn, stats=stats)
+    problem_class = FastDungeonProblem if args.fast else DungeonProblem
     if agent_type == "human":
         # This function reads the action from the user (human)
         def dungeon_user_action(problem: DungeonProblem, state: DungeonState) -> Direction:
@@ -50,29 +59,55 @@ def create_agent(args: argparse.Namespace):
         return HumanAgent(dungeon_user_action)
     if agent_type == "bfs":
         from search import BreadthFirstSearch
-        return UninformedSearchAgent(BreadthFirstSearch)
+        return UninformedSearchAgent(with_stats(BreadthFirstSearch))
     if agent_type == "dfs":
         from search import DepthFirstSearch
-        return UninformedSearchAgent(DepthFirstSearch)
+        return UninformedSearchAgent(with_stats(DepthFirstSearch))
     if agent_type == "ucs":
         from search import UniformCostSearch
-        return UninformedSearchAgent(UniformCostSearch)
+        return UninformedSearchAgent(with_stats(UniformCostSearch))
     if agent_type == "astar":
         from search import AStarSearch
         # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.fast))
         # If desired by the user, we track every transition and check for the heuristic consistency for each transition
         if args.checks:
-            DungeonProblem.get_successor = test_heuristic_consistency(heuristic)(DungeonProblem.get_successor)
-        return InformedSearchAgent(AStarSearch, heuristic)
+            problem_class.get_successor = test_heuristic_consistency(heuristic)(problem_class.get_successor)
+        return InformedSearchAgent(with_stats(AStarSearch), heuristic)
+    if agent_type == "idastar":
+        from search import IterativeDeepeningAStar
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.fast))
+        if args.checks:
+            problem_class.get_successor = test_heuristic_consistency(heuristic)(problem_class.get_successor)
+        return InformedSearchAgent(with_stats(IterativeDeepeningAStar), heuristic)
+    if agent_type == "smastar":
+        from search import MemoryBoundedAStarSearch
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.fast))
+        if args.checks:
+            problem_class.get_successor = test_heuristic_consistency(heuristic)(problem_class.get_successor)
+        return InformedSearchAgent(lambda problem, state, heuristic: MemoryBoundedAStarSearch(problem, state, heuristic, args.memory, stats=stats), heuristic)
+    if agent_type == "wastar":
+        from search import WeightedAStarSearch
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.fast))
+        if args.checks:
+            problem_class.get_successor = test_heuristic_consistency(heuristic)(problem_class.get_successor)
+        return InformedSearchAgent(with_stats(partial(WeightedAStarSearch, weight=args.weight)), heuristic)
+    if agent_type == "arastar":
+        from search import AnytimeRepairingAStar
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.fast))
+        if args.checks:
+            problem_class.get_successor = test_heuristic_consistency(heuristic)(problem_class.get_successor)
+        # Without a deadline, the search runs until it finds the optimal solution
+        deadline = float('inf') if args.deadline is None else args.deadline
+        return InformedSearchAgent(with_stats(partial(AnytimeRepairingAStar, weight=args.weight)), heuristic, deadline)
     if agent_type == "gbfs":
         from search import BestFirstSearch
         # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.fast))
         # If desired by the user, we track every transition and check for the heuristic consistency for each transition
         if args.checks:
-            DungeonProblem.get_successor = test_heuristic_consistency(heuristic)(DungeonProblem.get_successor)
-        return InformedSearchAgent(BestFirstSearch, heuristic)
+            problem_class.get_successor = test_heuristic_consistency(heuristic)(problem_class.get_successor)
+        return InformedSearchAgent(with_stats(BestFirstSearch), heuristic)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -80,16 +115,28 @@ def main(args: argparse.Namespace):
     state_printer = lambda state: print(state)
     if args.ansicolors: state_printer = lambda state: print(colored_dungeon(str(state)))
     start = time.time() # Track run time
-    problem = DungeonProblem.from_file(args.level) # create the problem
+    problem_class = FastDungeonProblem if args.fast else DungeonProblem
+    problem = problem_class.from_file(args.level) # create the problem
+    # The fast problem states are ints so they are decoded to a DungeonState before printing
+    if args.fast:
+        printer = state_printer
+        state_printer = lambda state: printer(problem.decode(state))
     state = problem.get_initial_state() # Get the initial state
     print("Initial State:")
     state_printer(state)
-    agent = create_agent(args)
+    stats = SearchStats(track_memory=args.track_memory) if args.stats else None
+    agent = create_agent(args, stats)
+    # If desired by the user, the agent starts from the policy saved for this level (and agent) and it is saved again at the end
+    policy = None
+    if args.policy_dir is not None and not isinstance(agent, HumanAgent):
+        from policy_cache import PolicyStore, policy_path
+        path = policy_path(args.policy_dir, problem, f"{args.agent}-{args.heuristic}")
+        policy = agent.policy = PolicyStore.open(problem, path)
     step = 0 # This will store the current step
     total_explored_nodes = 0 # This will store the number of traversed nodes during search
     unsolvable = False # This will store whether the problem is unsolvable or not
     while not problem.is_goal(state):
-        fetch_tracked_call_count(DungeonProblem.is_goal) # Clear the call counter
+        fetch_tracked_call_count(problem_class.is_goal) # Clear the call counter
         action = agent.act(problem, state) # Request an action from the agent
         # If no solution was found, break
         if action is None:
@@ -97,7 +144,7 @@ def main(args: argparse.Namespace):
             unsolvable = True
             break
         # Get the number of traversed nodes
-        total_explored_nodes += fetch_tracked_call_count(DungeonProblem.is_goal)
+        total_explored_nodes += fetch_tracked_call_count(problem_class.is_goal)
         # Apply the action to the state
         state = problem.get_successor(state, action)
         step += 1
@@ -115,6 +162,15 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the number of traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Search explored {total_explored_nodes} nodes")
+    # Save the policy (with the states added by this run) for the next runs
+    if policy is not None:
+        policy.save(path)
+        policy.close()
+        print(f"Policy saved to {path}")
+    # If desired by the user, we save the search statistics as JSON
+    if stats is not None:
+        stats.save(args.stats)
+        print(f"Search statistics saved to {args.stats}")
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -124,13 +180,27 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Dungeon as Human or AI")
     parser.add_argument("level", help="path to the dungeon to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs', 'idastar', 'smastar', 'wastar', 'arastar'],
                         help="the agent that will play the game")
     parser.add_argument("--heuristic", '-hf', default="zero",
-                        choices=["zero", "weak", "strong"],
+                        choices=["zero", "weak", "strong", "maze"],
                         help="choose the heuristic to use with A* or Greedy Best First Search")
     parser.add_argument("--checks", "-c", action='store_true', default=False,
                         help="Enable consistency checks for the heuristic")
+    parser.add_argument("--memory", "-m", type=int, default=10000,
+                        help="the maximum number of nodes kept in memory by the memory bounded A* (smastar)")
+    parser.add_argument("--weight", "-w", type=float, default=2.0,
+                        help="the heuristic weight of the weighted A* (wastar) and the initial weight of the anytime A* (arastar)")
+    parser.add_argument("--deadline", "-d", type=float, default=None,
+                        help="the time in seconds given to the anytime A* (arastar) to improve its solution")
+    parser.add_argument("--stats", "-s", default=None,
+                        help="save the search statistics (node counts, branching factor, timings) as JSON to this path")
+    parser.add_argument("--track-memory", action="store_true", default=False,
+                        help="also measure the peak memory of the search in the statistics (slower)")
+    parser.add_argument("--policy-dir", "-p", default=None,
+                        help="load the saved policy of the agent for this level from this directory (if any) and save it back after playing")
+    parser.add_argument("--fast", "-f", action="store_true", default=False,
+                        help="Use the fast problem where every state is encoded as a single int")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
                         help="Print the dungeon on the console with ANSI colors (only works on some terminals)")
 
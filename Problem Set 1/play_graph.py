@@ -41,6 +41,15 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "gbfs":
         from search import BestFirstSearch
         return InformedSearchAgent(BestFirstSearch, graphrouting_heuristic)
+    if agent_type == "bibfs":
+        from search import BidirectionalBreadthFirstSearch
+        return UninformedSearchAgent(BidirectionalBreadthFirstSearch)
+    if agent_type == "biucs":
+        from search import BidirectionalUniformCostSearch
+        return UninformedSearchAgent(BidirectionalUniformCostSearch)
+    if agent_type == "biastar":
+        from search import BidirectionalAStarSearch
+        return InformedSearchAgent(BidirectionalAStarSearch, graphrouting_heuristic)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -100,7 +109,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Graph as Human or AI")
     parser.add_argument("graph", help="path to the graph to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs', 'bibfs', 'biucs', 'biastar'],
                         help="the agent that will play the game")
 
     args = parser.parse_args()
@@ -0,0 +1,195 @@
+from typing import Dict, Iterator, Optional, Tuple, Union
+from array import array
+from bisect import bisect_left
+import hashlib, mmap, os, struct
+
+from distance_oracle import layout_hash
+from dungeon import DungeonProblem, DungeonState, FastDungeonProblem
+from mathutils import Direction
+
+# This file contains the persistent policy store for the search agents on dungeon problems
+# A policy maps every state on a solution path to the action to take from it (or None if there is no solution)
+# It is saved in a compact binary file and loaded with mmap, so the agent can act on a precomputed level
+# without searching and without reading the whole file.
+#
+# Every state is encoded as an int using the FastDungeonProblem encoding (remaining coins mask and player cell)
+# and every action as a byte (the direction, or NO_ACTION for None).
+# The file contains:
+#   a header: MAGIC, VERSION, the level hash (20 bytes), the size of a key in bytes (4 bytes) and the number of entries (8 bytes)
+#   the sorted state keys: unsigned 64-bit ints, or fixed width big endian records when a state needs more than 64 bits
+#   (levels with many coins), so the byte order of the records is the order of the keys
+#   the action of every key as a byte
+# The level hash identifies the walkable area, the exit and the coins of the level, since the policy depends on all of them.
+
+MAGIC = b"PLCY"
+VERSION = 2
+HEADER = struct.Struct("<4sI20sIQ")
+NO_ACTION = 255
+
+DungeonPolicyState = Union[DungeonState, int]
+
+# Returns the hash of the level that the policy of this problem depends on (as 20 bytes)
+def level_hash(problem: Union[DungeonProblem, FastDungeonProblem]) -> bytes:
+    layout = problem.layout
+    coins = problem.coins if isinstance(problem, FastDungeonProblem) else sorted(problem.initial_state.remaining_coins, key=lambda point: (point.y, point.x))
+    text = layout_hash(layout) + f":{layout.exit.x},{layout.exit.y}:" + ";".join(f"{coin.x},{coin.y}" for coin in coins)
+    return hashlib.sha1(text.encode()).digest()
+
+# Returns the path of the policy file of the given problem and agent name inside a directory
+def policy_path(directory: str, problem: Union[DungeonProblem, FastDungeonProblem], name: str) -> str:
+    return os.path.join(directory, f"{level_hash(problem).hex()}.{name}.policy")
+
+# The sorted keys of a policy whose states need more than 64 bits
+# They are stored as fixed width big endian records and read as ints by index, so 'bisect' can search them
+class WideKeys:
+    def __init__(self, data: Union[bytes, memoryview], key_size: int) -> None:
+        self.data = data
+        self.key_size = key_size
+
+    def __len__(self) -> int:
+        return len(self.data) // self.key_size
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = index * self.key_size
+        return int.from_bytes(self.data[start:start + self.key_size], 'big')
+
+    def release(self):
+        if isinstance(self.data, memoryview):
+            self.data.release()
+
+# A policy that can be used by the agents in place of their policy dictionary
+# The entries loaded from a file are read from the memory map and the new entries are kept in a dictionary
+class PolicyStore:
+    def __init__(self, problem: Union[DungeonProblem, FastDungeonProblem]) -> None:
+        self.hash = level_hash(problem)
+        # The states of the fast problem are already encoded, otherwise we encode them using a fast version of the problem
+        self.fast = problem if isinstance(problem, FastDungeonProblem) else FastDungeonProblem.from_problem(problem)
+        self.encoded = isinstance(problem, FastDungeonProblem)
+        # The number of bytes of a key: 8 unless the coins mask and the player cell need more than 64 bits
+        self.key_size = max(8, (len(self.fast.coins) + self.fast.cell_bits + 7) // 8)
+        self.keys = self._empty_keys() # the sorted keys loaded from the file (a view over the memory map after 'load')
+        self.actions = b""          # the actions of the loaded keys
+        self.added: Dict[int, int] = {} # the entries added after loading (key -> action byte)
+        self._map: Optional[mmap.mmap] = None
+        self._views = []            # the memory views over the memory map (they must be released before closing it)
+
+    def _empty_keys(self) -> Union[array, WideKeys]:
+        return array('Q') if self.key_size == 8 else WideKeys(b"", self.key_size)
+
+    def encode(self, state: DungeonPolicyState) -> int:
+        return state if self.encoded else self.fast.encode(state)
+
+    # Returns the action byte of the key or -1 if the key is not in the policy
+    def _lookup(self, key: int) -> int:
+        action = self.added.get(key)
+        if action is not None:
+            return action
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.actions[index]
+        return -1
+
+    def __contains__(self, state: DungeonPolicyState) -> bool:
+        return self._lookup(self.encode(state)) != -1
+
+    def __getitem__(self, state: DungeonPolicyState) -> Optional[Direction]:
+        action = self._lookup(self.encode(state))
+        if action == -1:
+            raise KeyError(state)
+        return None if action == NO_ACTION else Direction(action)
+
+    def get(self, state: DungeonPolicyState, default=None) -> Optional[Direction]:
+        action = self._lookup(self.encode(state))
+        if action == -1:
+            return default
+        return None if action == NO_ACTION else Direction(action)
+
+    def __setitem__(self, state: DungeonPolicyState, action: Optional[Direction]):
+        self.added[self.encode(state)] = NO_ACTION if action is None else int(action)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._entries())
+
+    # Iterate over all the (key, action byte) entries in key order (the added entries replace the loaded ones)
+    def _entries(self) -> Iterator[Tuple[int, int]]:
+        added = sorted(self.added.items())
+        index, keys, actions = 0, self.keys, self.actions
+        for key, action in added:
+            while index < len(keys) and keys[index] < key:
+                yield keys[index], actions[index]
+                index += 1
+            if index < len(keys) and keys[index] == key:
+                index += 1
+            yield key, action
+        while index < len(keys):
+            yield keys[index], actions[index]
+            index += 1
+
+    # Save the policy to a binary file
+    # The file is written next to the destination then moved over it, so a memory map of the old file stays valid
+    def save(self, path: str):
+        keys, actions = [], bytearray()
+        for key, action in self._entries():
+            keys.append(key)
+            actions.append(action)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = path + ".tmp"
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.hash, self.key_size, len(keys)))
+            if self.key_size == 8:
+                array('Q', keys).tofile(f)
+            else:
+                f.write(b"".join(key.to_bytes(self.key_size, 'big') for key in keys))
+            f.write(actions)
+        os.replace(temporary, path)
+
+    # Load the policy of the problem from a binary file using a memory map
+    # Raises a ValueError if the file is not a policy file or if it belongs to another level
+    @staticmethod
+    def load(problem: Union[DungeonProblem, FastDungeonProblem], path: str) -> 'PolicyStore':
+        store = PolicyStore(problem)
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"'{path}' is not a policy file")
+            store._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, hash, key_size, count = HEADER.unpack_from(store._map, 0)
+        if magic != MAGIC or version != VERSION or size != HEADER.size + (key_size + 1) * count:
+            store.close()
+            raise ValueError(f"'{path}' is not a policy file")
+        if hash != store.hash:
+            store.close()
+            raise ValueError(f"'{path}' is the policy of another level")
+        if key_size != store.key_size:
+            store.close()
+            raise ValueError(f"'{path}' is the policy of another level")
+        view = memoryview(store._map)
+        keys = view[HEADER.size:HEADER.size + key_size * count]
+        store.keys = keys.cast('Q') if key_size == 8 else WideKeys(keys, key_size)
+        store.actions = view[HEADER.size + key_size * count:]
+        store._views = [store.actions, store.keys, keys, view]
+        return store
+
+    # Load the policy file if it exists and belongs to this level, otherwise return an empty policy
+    @staticmethod
+    def open(problem: Union[DungeonProblem, FastDungeonProblem], path: str) -> 'PolicyStore':
+        if os.path.isfile(path):
+            try:
+                return PolicyStore.load(problem, path)
+            except ValueError:
+                pass
+        return PolicyStore(problem)
+
+    # Release the memory map (the loaded entries are dropped)
+    def close(self):
+        if self._map is not None:
+            for view in self._views:
+                view.release()
+            self._views = []
+            self.keys, self.actions = self._empty_keys(), b""
+            self._map.close()
+            self._map = None
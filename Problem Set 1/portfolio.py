@@ -0,0 +1,216 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+from functools import lru_cache
+from multiprocessing.connection import wait
+import argparse, multiprocessing, time
+
+from helpers.utils import load_function
+
+# This file contains a portfolio runner which runs several search configurations on the same problem
+# in parallel (each in its own process) and returns the solution of the first one to finish
+
+# A search configuration: the search function and the heuristic (for informed searches) as "module.function" names
+# 'optimal' tells whether this configuration is guaranteed to return an optimal solution for the problem
+@dataclass(frozen=True)
+class SearchConfig:
+    name: str
+    search: str
+    heuristic: Optional[str] = None
+    optimal: bool = False
+
+# The report of a single configuration
+# status is one of: "solved", "no solution", "failed" or "cancelled"
+@dataclass
+class ConfigReport:
+    name: str
+    status: str
+    path_cost: Optional[float] = None
+    explored: Optional[int] = None
+    elapsed: Optional[float] = None
+    message: str = ""
+
+# The result of the portfolio: the chosen solution, the configuration that found it and the reports of all the configurations
+@dataclass
+class PortfolioResult:
+    solution: Optional[list]
+    winner: Optional[str]
+    reports: List[ConfigReport] = field(default_factory=list)
+
+# The problem classes that can be loaded by name from the command line
+PROBLEM_CLASSES = {
+    "dungeon": "dungeon.DungeonProblem",
+    "graph": "graph.GraphRoutingProblem",
+    "parking": "parking.ParkingProblem",
+}
+
+# The default portfolio of every problem (BFS is only optimal when all the actions have the same cost)
+DEFAULT_PORTFOLIOS: Dict[str, List[SearchConfig]] = {
+    "dungeon": [
+        SearchConfig("bfs", "search.BreadthFirstSearch", optimal=True),
+        SearchConfig("ucs", "search.UniformCostSearch", optimal=True),
+        SearchConfig("astar-weak", "search.AStarSearch", "dungeon_heuristic.weak_heuristic", optimal=True),
+        SearchConfig("astar-strong", "search.AStarSearch", "dungeon_heuristic.strong_heuristic", optimal=True),
+        SearchConfig("gbfs-strong", "search.BestFirstSearch", "dungeon_heuristic.strong_heuristic"),
+    ],
+    "graph": [
+        SearchConfig("bfs", "search.BreadthFirstSearch"),
+        SearchConfig("ucs", "search.UniformCostSearch", optimal=True),
+        SearchConfig("astar", "search.AStarSearch", "graph.graphrouting_heuristic", optimal=True),
+        SearchConfig("gbfs", "search.BestFirstSearch", "graph.graphrouting_heuristic"),
+    ],
+    "parking": [
+        SearchConfig("bfs", "search.BreadthFirstSearch"),
+        SearchConfig("ucs", "search.UniformCostSearch", optimal=True),
+        SearchConfig("astar", "search.AStarSearch", "parking_heuristic.parking_heuristic", optimal=True),
+        SearchConfig("astar-pdb", "search.AStarSearch", "parking_heuristic.pattern_database_heuristic", optimal=True),
+        SearchConfig("gbfs", "search.BestFirstSearch", "parking_heuristic.parking_heuristic"),
+    ],
+}
+
+# Run a single configuration (this runs inside a worker process)
+# The problem is loaded in the worker from its file using the 'from_file' constructor of the problem class
+# Returns the solution, its cost, the number of explored nodes (calls to 'is_goal') and the search time
+def run_config(problem_class: str, path: str, config: SearchConfig) -> Tuple[Optional[list], Optional[float], int, float]:
+    problem = load_function(problem_class, use_local=True).from_file(path)
+    search_fn = load_function(config.search, use_local=True)
+    # We count the explored nodes by wrapping 'is_goal' on this problem instance
+    is_goal = problem.is_goal
+    explored = 0
+    def counted_is_goal(state):
+        nonlocal explored
+        explored += 1
+        return is_goal(state)
+    problem.is_goal = counted_is_goal
+    initial_state = problem.get_initial_state()
+    start = time.time()
+    if config.heuristic is None:
+        solution = search_fn(problem, initial_state)
+    else:
+        # We cache the heuristic calls to speed up the search process if the heuristic is not fast
+        heuristic = lru_cache(2**16)(load_function(config.heuristic, use_local=True))
+        solution = search_fn(problem, initial_state, heuristic)
+    elapsed = time.time() - start
+    path_cost = None
+    if solution is not None:
+        path_cost, state = 0, initial_state
+        for action in solution:
+            path_cost += problem.get_cost(state, action)
+            state = problem.get_successor(state, action)
+    return solution, path_cost, explored, elapsed
+
+# Run a configuration and send its result (or the error it raised) through the connection (this runs inside a worker process)
+def config_worker(connection, problem_class: str, path: str, config: SearchConfig):
+    try:
+        result = (True, run_config(problem_class, path, config))
+    except Exception as err:
+        result = (False, repr(err))
+    connection.send(result)
+    connection.close()
+
+# Run the configurations in parallel on the problem stored in the file at 'path'
+# If 'first_any' is False, it returns the first solution found by an optimal configuration
+# (the solutions of the other configurations are reported but they do not stop the portfolio,
+# unless all the optimal configurations fail, then the cheapest solution found is returned)
+# If 'first_any' is True, it returns the first solution found by any configuration
+# Every configuration runs in its own process (at most 'workers' at a time), so the remaining configurations
+# are terminated once a solution is chosen, or when 'timeout' seconds pass
+def run_portfolio(problem_class: str, path: str, configs: List[SearchConfig],
+                  first_any: bool = False, workers: int = None, timeout: float = None) -> PortfolioResult:
+    reports = {config.name: ConfigReport(config.name, "cancelled") for config in configs}
+    solutions: Dict[str, list] = {}
+    winner = None
+    deadline = None if timeout is None else time.time() + timeout
+    workers = workers or len(configs)
+    pending = deque(configs)
+    # The running workers: the connection to read the result -> (process, config)
+    running = {}
+    try:
+        while (pending or running) and winner is None:
+            # Start new workers until all the workers are busy
+            while pending and len(running) < workers:
+                config = pending.popleft()
+                reader, writer = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=config_worker, args=(writer, problem_class, path, config), daemon=True)
+                process.start()
+                writer.close() # The worker has its own copy, so closing ours lets us detect if it dies
+                running[reader] = (process, config)
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            ready = wait(list(running), timeout=remaining)
+            if not ready:
+                break # Timeout
+            for reader in ready:
+                process, config = running.pop(reader)
+                report = reports[config.name]
+                try:
+                    succeeded, result = reader.recv()
+                except EOFError:
+                    succeeded, result = False, f"the worker exited with code {process.exitcode}"
+                reader.close()
+                process.join()
+                if not succeeded:
+                    report.status, report.message = "failed", result
+                    continue
+                solution, report.path_cost, report.explored, report.elapsed = result
+                report.status = "no solution" if solution is None else "solved"
+                # An optimal configuration that finds no solution proves that there is none
+                if solution is None and config.optimal and winner is None:
+                    winner = config.name
+                if solution is not None:
+                    solutions[config.name] = solution
+                    if winner is None and (first_any or config.optimal):
+                        winner = config.name
+        if winner is None and solutions:
+            # No optimal configuration finished with a solution, so we pick the cheapest solution found
+            winner = min(solutions, key=lambda name: reports[name].path_cost)
+    finally:
+        # The configurations that are still running lost, so they are stopped
+        for reader, (process, _) in running.items():
+            process.terminate()
+            process.join()
+            reader.close()
+    return PortfolioResult(solutions.get(winner), winner, [reports[config.name] for config in configs])
+
+def main(args: argparse.Namespace):
+    start = time.time() # Track run time
+    configs = DEFAULT_PORTFOLIOS[args.problem]
+    if args.configs:
+        configs = [config for config in configs if config.name in args.configs]
+    result = run_portfolio(PROBLEM_CLASSES[args.problem], args.path, configs, args.any, args.workers, args.timeout)
+    for report in result.reports:
+        line = f"{report.name}: {report.status}"
+        if report.status in ("solved", "no solution"):
+            line += f" - Explored {report.explored} nodes in {report.elapsed} seconds"
+        if report.path_cost is not None:
+            line += f" - Path Cost: {report.path_cost}"
+        if report.message:
+            line += f" - {report.message}"
+        print(line)
+    if result.winner is None:
+        print("No configuration finished")
+    else:
+        print(f"Winner: {result.winner}")
+        print("Solution:", "No solution" if result.solution is None else ' '.join(str(action) for action in result.solution))
+    # Finally print the elapsed time for the whole process
+    print(f"Elapsed time: {time.time() - start} seconds")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Run a portfolio of searches in parallel on a problem")
+    parser.add_argument("path", help="path to the problem file (dungeon, graph or parking)")
+    parser.add_argument("--problem", "-p", default="dungeon", choices=list(PROBLEM_CLASSES),
+                        help="the type of the problem")
+    parser.add_argument("--configs", "-c", nargs="+",
+                        help="the names of the configurations to run (all the configurations of the problem by default)")
+    parser.add_argument("--any", action="store_true", default=False,
+                        help="return the first solution found by any configuration instead of the first optimal one")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="the number of worker processes (one per configuration by default)")
+    parser.add_argument("--timeout", "-t", type=float, default=None,
+                        help="the maximum time in seconds to wait for a solution")
+
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, Iterable, List, TypeVar, Union
+from typing import Callable, Generic, Iterable, List, Sequence, TypeVar, Union
 from helpers.utils import CacheContainer, with_cache
 
 # S and A are used for generic typing where S represents the state type and A represents the action type
@@ -34,8 +34,25 @@ class Problem(ABC, Generic[S, A], CacheContainer):
     def get_cost(self, state: S, action: A) -> float:
         return 1.0
 
+    # This opt-in function compiles a finite problem: every reachable state gets an integer id
+    # and the transitions are stored in flat tables (see compiled.py)
+    def compile(self, max_states: int = None) -> 'Problem[int, int]':
+        from compiled import compile_problem
+        return compile_problem(self, max_states)
+
 # These are type aliases for:
 # A solution which is a list of actions (or None if no solution is found)
 Solution = Union[List[A], None]
 # A heuristic function which estimates the path cost to the goal for a given state with a certain problem
-HeuristicFunction = Callable[[Problem[S, A], S],float]
\ No newline at end of file
+HeuristicFunction = Callable[[Problem[S, A], S],float]
+# A batched heuristic function which estimates the path costs of many states at once (in the same order as the states)
+# It saves the overhead of one call per state, so the searches use it to evaluate all the children of a node together
+BatchHeuristicFunction = Callable[[Problem[S, A], Sequence[S]], Sequence[float]]
+
+# Returns the batched version of a heuristic
+# A heuristic can provide one by storing it in its 'batch' attribute, otherwise the heuristic is called once per state
+def heuristic_batch(heuristic: HeuristicFunction) -> BatchHeuristicFunction:
+    batch = getattr(heuristic, "batch", None)
+    if batch is not None:
+        return batch
+    return lambda problem, states: [heuristic(problem, state) for state in states]
@@ -1,241 +1,919 @@
-from problem import HeuristicFunction, Problem, S, A, Solution
+from typing import Iterator, Tuple
+from problem import HeuristicFunction, Problem, S, A, Solution, heuristic_batch
 from collections import deque
+from array import array
+import heapq, time
 from helpers import utils
+from search_stats import SearchStats, InstrumentedProblem
 
 
 # All search functions take a problem and a state
 # If it is an informed search function, it will also receive a heuristic function
 # S and A are used for generic typing where S represents the state type and A represents the action type
+# All search functions also take an optional 'stats' collector (see search_stats.py) that records the search cost
+# When it is given, the search hands itself to the collector, which calls it once on an instrumented view of the problem
+# (to count and time the problem calls) with the collector as its 'stats' argument. During that run, the search reports
+# its frontier size and the duplicate states it generates to the collector.
 
 # All the search functions should return one of two possible type:
 # 1. A list of actions which represent the path from the initial state to the final state
 
-import heapq
 # from dungeon import DungeonProblem,DungeonState
 # from dungeon_heuristic import strong_heuristic
 #priority queue for uniform search ,A* search and greedy search
+#it is an indexed binary heap: beside the heap array it keeps a position map (item -> heap slot)
+#so membership checks are O(1) and decreasing the cost of an item is O(log n)
 class PriorityQueue(object):
 
+    # Constants to represent the return values of replaceCost
+    NODE_NOT_FOUND = 0
+    COST_UPDATED = 1
+    COST_NOT_UPDATED = 2
+
     def __init__(self):
-        self.queue = []
+        self.queue = []     # heap array, every entry is (cost, counter, item)
+        self.position = {}  # item -> index of its entry in the heap array
         self.counter=0  ##to pop first the elements that are put first if they have the same cost
 
     # for checking if the queue is empty
     def isEmpty(self):
         return len(self.queue) == 0
- 
-    # for inserting an element in the queue
+
+    def __len__(self):
+        return len(self.queue)
+
+    # for checking if an item is inside the queue in O(1)
+    def contains(self, item):
+        return item in self.position
+
+    def __contains__(self, item):
+        return item in self.position
+
+    # returns the current cost of an item inside the queue
+    def cost(self, item):
+        return self.queue[self.position[item]][0]
+
+    # for inserting an element in the queue, data is (item, cost)
     def insert(self, data):
-        heapq.heappush(self.queue, (data[1], self.counter, data[0]))
+        item, cost = data
+        self.queue.append((cost, self.counter, item))
         self.counter+=1
- 
-    # for popping an element based on Priority
+        self.position[item] = len(self.queue) - 1
+        self._sift_up(len(self.queue) - 1)
+
+    # for popping an element based on Priority, returns (cost, counter, item)
+    def pop(self):
+        last = self.queue.pop()
+        if not self.queue:
+            del self.position[last[2]]
+            return last
+        top = self.queue[0]
+        del self.position[top[2]]
+        self.queue[0] = last
+        self.position[last[2]] = 0
+        self._sift_down(0)
+        return top
+
+    # kept for the old name of pop
     def delete(self):
-        return heapq.heappop(self.queue)
-    
+        return self.pop()
+
+    # lower the cost of an item that is already in the queue
+    # the item keeps its counter so equal costs are still popped in insertion order
+    # returns True if the cost was lowered and False if the old cost was already lower or equal
+    def decrease_key(self, item, cost):
+        index = self.position[item]
+        old_cost, counter, _ = self.queue[index]
+        if not cost < old_cost:
+            return False
+        self.queue[index] = (cost, counter, item)
+        self._sift_up(index)
+        return True
+
     #check if node is inside queue with higher cost replace with lower cost
+    #oldcost is not needed anymore since the position map finds the node directly
     def replaceCost(self,data,cost,oldcost=None):
-         # Constants to represent return values
-        NODE_NOT_FOUND = 0
-        COST_UPDATED = 1
-        COST_NOT_UPDATED = 2
-        ind=-1
-        if oldcost==None:
-            for i in range (len(self.queue)):
-                if data==self.queue[i][2]:
-                    ind=i
-                    break
-        else:
-            low, high = 0, len(self.queue) - 1
-            while low <= high:
-                mid = (low + high) // 2
-                if self.queue[mid][0] == oldcost and self.queue[mid][2] == data:
-                    ind = mid
-                    break
-                elif self.queue[mid][0] < oldcost:
-                    low = mid + 1
-                else:
-                    high = mid - 1
+        if data not in self.position:
+            return PriorityQueue.NODE_NOT_FOUND
+        if self.decrease_key(data, cost):
+            # node found with higher cost so path should be changed
+            return PriorityQueue.COST_UPDATED
+        # node found with lower cost so path shouldn't be changed
+        return PriorityQueue.COST_NOT_UPDATED
+
+    # move the entry at index up until its parent is not larger than it
+    def _sift_up(self, index):
+        queue, position = self.queue, self.position
+        entry = queue[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not entry < queue[parent]:
+                break
+            queue[index] = queue[parent]
+            position[queue[index][2]] = index
+            index = parent
+        queue[index] = entry
+        position[entry[2]] = index
+
+    # move the entry at index down until its children are not smaller than it
+    def _sift_down(self, index):
+        queue, position = self.queue, self.position
+        size = len(queue)
+        entry = queue[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and queue[child + 1] < queue[child]:
+                child += 1
+            if not queue[child] < entry:
+                break
+            queue[index] = queue[child]
+            position[queue[index][2]] = index
+            index = child
+        queue[index] = entry
+        position[entry[2]] = index
+
+#parent pointer table used by all the search functions to remember how each state was reached
+#every state only stores (parent, action) and the path is rebuilt once when the goal is reached
+#instead of copying the whole action list for every generated node
+class ParentTable(object):
+
+    def __init__(self, initial_state):
+        self.parents = {initial_state: None} # state -> (parent state, action), None for the initial state
 
-        #node not found
-        if ind==-1:
-            return NODE_NOT_FOUND
+    # remember that child was reached from parent using action (overwrites any older parent)
+    def set(self, child, parent, action):
+        self.parents[child] = (parent, action)
+
+    # follow the parent pointers back to the initial state and return the actions in order
+    def path(self, state) -> list:
+        actions = []
+        entry = self.parents[state]
+        while entry is not None:
+            state, action = entry
+            actions.append(action)
+            entry = self.parents[state]
+        actions.reverse()
+        return actions
+
+#compact version of the parent table (opt-in using compact=True in the search functions)
+#every state is interned to an integer id once and the parent ids and action ids are kept in flat arrays
+#so the table does not hold a tuple and a reference to the parent state for every node
+#it is the fallback for the states that are not ints (see IntParentTable)
+class CompactParentTable(object):
+
+    def __init__(self, initial_state):
+        self.ids = {initial_state: 0}      # state -> integer state id
+        self.parent = array('q', [-1])     # state id -> parent state id (-1 for the initial state)
+        self.action = array('q', [-1])     # state id -> action id
+        self.action_ids = {}               # action -> integer action id
+        self.actions = []                  # action id -> action
+
+    # remember that child was reached from parent using action (overwrites any older parent)
+    def set(self, child, parent, action):
+        action_id = self.action_ids.get(action)
+        if action_id is None:
+            action_id = self.action_ids[action] = len(self.actions)
+            self.actions.append(action)
+        child_id = self.ids.get(child)
+        if child_id is None:
+            self.ids[child] = len(self.parent)
+            self.parent.append(self.ids[parent])
+            self.action.append(action_id)
         else:
-            # Node found, check its cost
-            if cost<self.queue[ind][0]:
-                self.queue[ind]=(cost,self.queue[ind][1],data)
-                # node found with higher cost so path should be changed
-                return COST_UPDATED
-            # node found with lower cost so path shouldn't be changed
-            return COST_NOT_UPDATED
-
-def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    frontier:list=[initial_state]
-    # Dictionary to keep track of the path to each state
-    path:dict[S,list]={initial_state:[]}
+            self.parent[child_id] = self.ids[parent]
+            self.action[child_id] = action_id
+
+    # follow the parent ids back to the initial state and return the actions in order
+    def path(self, state) -> list:
+        actions = []
+        state_id = self.ids[state]
+        while self.parent[state_id] != -1:
+            actions.append(self.actions[self.action[state_id]])
+            state_id = self.parent[state_id]
+        actions.reverse()
+        return actions
+
+#compact parent table for problems whose states are already ints (FastDungeonProblem, compiled problems)
+#the state is its own id, so no state -> id dictionary is needed: every state has one int entry
+#that packs its parent state and its action id as (parent << action_bits) | action id
+class IntParentTable(object):
+
+    def __init__(self, initial_state: int):
+        self.parents = {initial_state: -1}  # state -> packed (parent state, action id), -1 for the initial state
+        self.action_bits = 8                # the number of bits reserved for the action id
+        self.action_ids = {}                # action -> integer action id
+        self.actions = []                   # action id -> action
+
+    # remember that child was reached from parent using action (overwrites any older parent)
+    def set(self, child: int, parent: int, action):
+        action_id = self.action_ids.get(action)
+        if action_id is None:
+            action_id = self.action_ids[action] = len(self.actions)
+            self.actions.append(action)
+            if action_id >> self.action_bits:
+                self._widen()
+        self.parents[child] = (parent << self.action_bits) | action_id
+
+    # double the bits of the action ids (when there are more actions than they can hold) and repack all the entries
+    def _widen(self):
+        old_bits = self.action_bits
+        self.action_bits *= 2
+        mask = (1 << old_bits) - 1
+        self.parents = {
+            state: entry if entry == -1 else ((entry >> old_bits) << self.action_bits) | (entry & mask)
+            for state, entry in self.parents.items()
+        }
+
+    # follow the parent states back to the initial state and return the actions in order
+    def path(self, state: int) -> list:
+        actions = []
+        bits, mask = self.action_bits, (1 << self.action_bits) - 1
+        entry = self.parents[state]
+        while entry != -1:
+            actions.append(self.actions[entry & mask])
+            entry = self.parents[entry >> bits]
+        actions.reverse()
+        return actions
+
+# create the parent table used by a search function
+# the compact table uses the states as ids when they are ints and only interns the other states into ids
+def create_parent_table(initial_state, compact: bool = False):
+    if not compact:
+        return ParentTable(initial_state)
+    if isinstance(initial_state, int) and initial_state >= 0:
+        return IntParentTable(initial_state)
+    return CompactParentTable(initial_state)
+
+def BreadthFirstSearch(problem: Problem[S, A], initial_state: S, compact: bool = False, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(BreadthFirstSearch, problem, initial_state, compact=compact)
+    # The frontier is a deque so removing from the front is O(1)
+    frontier:deque=deque([initial_state])
+    # Set with the same content as the frontier for O(1) membership checks
+    frontier_set:set={initial_state}
+    # Parent pointers to rebuild the path to each state (state -> (parent, action))
+    parents=create_parent_table(initial_state,compact)
     # List to keep track of explored nodes
     explored:set=set()
     while len(frontier)>0:
+        if stats is not None:
+            stats.record_frontier(len(frontier))
         # Remove the first node from the frontier
-        node=frontier.pop(0)
+        node=frontier.popleft()
+        frontier_set.remove(node)
         # Check if the current node is the goal state
         if problem.is_goal(node):
-            return path[node]
+            return parents.path(node)
          # Mark the current node as explored
         explored.add(node)
         actions=problem.get_actions(node)
          # Explore each action to find its resulting child state
         for action in actions:
             child=problem.get_successor(node,action)
+            if stats is not None and (child in explored or child in frontier_set):
+                stats.duplicates+=1
             # Check if the child state has not been explored and is not in the frontier
-            if child not in explored and child not in frontier:
+            if child not in explored and child not in frontier_set:
                 # Update the path to the child state and add child state to the forinter
-                path[child] = path[node] + [action]
+                parents.set(child,node,action)
                 frontier.append(child)
+                frontier_set.add(child)
     return None
 
-def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-   
-    frontier:list=[initial_state]
-    # Dictionary to keep track of the path to each state
-    path:dict[S,list]={initial_state:[]}
+def DepthFirstSearch(problem: Problem[S, A], initial_state: S, compact: bool = False, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(DepthFirstSearch, problem, initial_state, compact=compact)
+    # The frontier is a deque used as a stack
+    frontier:deque=deque([initial_state])
+    # Set with the same content as the frontier for O(1) membership checks
+    frontier_set:set={initial_state}
+    # Parent pointers to rebuild the path to each state (state -> (parent, action))
+    parents=create_parent_table(initial_state,compact)
      # List to keep track of explored nodes
     explored:set=set()
     while len(frontier)>0:
+        if stats is not None:
+            stats.record_frontier(len(frontier))
         # Remove the last node from the frontier
         node=frontier.pop()
+        frontier_set.remove(node)
         # Check if the current node is the goal state
         if problem.is_goal(node):
-            return path[node]
+            return parents.path(node)
          # Mark the current node as explored
         explored.add(node)
          # Explore each action to find its resulting child state
         actions=problem.get_actions(node)
         for action in actions:
             child=problem.get_successor(node,action)
+            if stats is not None and (child in explored or child in frontier_set):
+                stats.duplicates+=1
              # Check if the child state has not been explored and is not in the frontier
-            if child not in explored and child not in frontier:
+            if child not in explored and child not in frontier_set:
                 # Update the path to the child state and add child state to the forinter
-                path[child] = path[node] + [action]
+                parents.set(child,node,action)
                 frontier.append(child)
+                frontier_set.add(child)
     return None  
   
-def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+def UniformCostSearch(problem: Problem[S, A], initial_state: S, compact: bool = False, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(UniformCostSearch, problem, initial_state, compact=compact)
     # Initialize the frontier as a priority queue to explore nodes based on their cost
     frontier:PriorityQueue=PriorityQueue()
     frontier.insert((initial_state,0))
-    # Dictionary to keep track of the path to each state
-    path:dict[S,list]={initial_state:[]}
+    # Parent pointers to rebuild the path to each state (state -> (parent, action))
+    parents=create_parent_table(initial_state,compact)
      # List to keep track of explored nodes
     explored:set=set()
     while not frontier.isEmpty():
+        if stats is not None:
+            stats.record_frontier(len(frontier))
         # Remove the first node from the frontier
-        (parent_cost,_,node)=frontier.delete()
+        (parent_cost,_,node)=frontier.pop()
          # Check if the current node is the goal state
         if problem.is_goal(node):
-            return path[node]
+            return parents.path(node)
          # Mark the current node as explored
         explored.add(node)
         # Explore each action to find its resulting child state
         actions=problem.get_actions(node)
         for action in actions:
             child=problem.get_successor(node,action)
+            if stats is not None and (child in explored or frontier.contains(child)):
+                stats.duplicates+=1
             # Only proceed if the child state has not been explored
             if child not in explored :
                 cost=problem.get_cost(node,action)+parent_cost
-                #Check if the child state is already in the frontier with a higher cost and update cost if it is higher
-                checked=frontier.replaceCost(child,cost)
                 # If the child is not in the frontier, add it with the new cost
-                if  checked==0:
-                    path[child] = path[node] + [action]
+                if not frontier.contains(child):
+                    parents.set(child,node,action)
                     frontier.insert((child,cost))
-                 # If the child is found in the frontier with a higher cost, update the path
-                elif checked==1:
-                     path[child] = path[node] + [action]
+                 # If the child is found in the frontier with a higher cost, lower its cost and update the path
+                elif frontier.decrease_key(child,cost):
+                     parents.set(child,node,action)
     return None
 
-def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, compact: bool = False, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(AStarSearch, problem, initial_state, heuristic=heuristic, compact=compact)
     # Initialize the frontier as a priority queue to explore nodes based on their f(g + h)
     frontier:PriorityQueue=PriorityQueue()
      # Insert the initial state with its heuristic cost
     frontier.insert((initial_state,heuristic(problem,initial_state)))
-    #set for frontier for faster search
-    frontier_set=set()
-    frontier_set.add(initial_state)
-    # Dictionary to keep track of the path to each state
-    path:dict[S,list]={initial_state:[]}
+    # Parent pointers to rebuild the path to each state (state -> (parent, action))
+    parents=create_parent_table(initial_state,compact)
     # Dictionary to track the cost to reach each state (g cost)
     costs:dict={initial_state:0}
-    # Dictionary to track the f to reach each state 
-    f_cost:dict={initial_state:heuristic(problem,initial_state)}
     # List to keep track of explored nodes
     explored:set=set()
+    # The heuristics of all the children of a node are computed together in one batch
+    batch=heuristic_batch(heuristic)
     while not frontier.isEmpty():
+        if stats is not None:
+            stats.record_frontier(len(frontier))
          # Remove the node with the lowest (f = g + h) from the frontier
-        (_,_,node)=frontier.delete()
+        (_,_,node)=frontier.pop()
         #Check if the current node is the goal state
         if problem.is_goal(node):
-            return path[node]
+            return parents.path(node)
         # Mark the current node as explored
         explored.add(node)
         actions=problem.get_actions(node)
         # Explore each action to find its resulting child state
+        children=[]
         for action in actions:
             child=problem.get_successor(node,action)
+            if stats is not None and (child in explored or frontier.contains(child)):
+                stats.duplicates+=1
               # Only proceed if the child state has not been explored
             if child not in explored :
-                 #Calculate the f for the child (f = g + h)
-                f=heuristic(problem,child)+costs[node]+problem.get_cost(node,child)
-                # Check if the child is already in the frontier
-                # If the child is not in the frontier, add it with the new cost ,update its path and cost.
-                if  child not in frontier_set:
-                    path[child] = path[node] + [action]
-                    costs[child]=costs[node]+problem.get_cost(node,child)
+                children.append((action,child))
+        for (action,child),h in zip(children,batch(problem,[child for _,child in children])):
+             #Calculate the f for the child (f = g + h)
+            g=costs[node]+problem.get_cost(node,action)
+            f=h+g
+            # If the child is not in the frontier, add it with the new cost ,update its path and cost.
+            if not frontier.contains(child):
+                parents.set(child,node,action)
+                costs[child]=g
+                frontier.insert((child,f))
+             # If the child is found in the frontier with a higher cost, lower its cost and update the path
+            elif frontier.decrease_key(child,f):
+                parents.set(child,node,action)
+                costs[child]=g
+    return None
+
+# Weighted A*: the same as A* but the heuristic is multiplied by 'weight' (f = g + weight * h)
+# It explores fewer nodes by trusting the heuristic more and, if the heuristic is consistent,
+# the cost of its solution is at most 'weight' times the optimal cost (weight = 1 is A*)
+def WeightedAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, weight: float = 2.0, compact: bool = False, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(WeightedAStarSearch, problem, initial_state, heuristic=heuristic, weight=weight, compact=compact)
+    # Initialize the frontier as a priority queue to explore nodes based on their f(g + weight * h)
+    frontier:PriorityQueue=PriorityQueue()
+    frontier.insert((initial_state,weight*heuristic(problem,initial_state)))
+    # Parent pointers to rebuild the path to each state (state -> (parent, action))
+    parents=create_parent_table(initial_state,compact)
+    # Dictionary to track the cost to reach each state (g cost)
+    costs:dict={initial_state:0}
+    # List to keep track of explored nodes
+    explored:set=set()
+    # The heuristics of all the children of a node are computed together in one batch
+    batch=heuristic_batch(heuristic)
+    while not frontier.isEmpty():
+        if stats is not None:
+            stats.record_frontier(len(frontier))
+        # Remove the node with the lowest f from the frontier
+        (_,_,node)=frontier.pop()
+        # Check if the current node is the goal state
+        if problem.is_goal(node):
+            return parents.path(node)
+        # Mark the current node as explored
+        explored.add(node)
+        children=[]
+        for action in problem.get_actions(node):
+            child=problem.get_successor(node,action)
+            if stats is not None and (child in explored or frontier.contains(child)):
+                stats.duplicates+=1
+            # Only proceed if the child state has not been explored
+            if child not in explored:
+                children.append((action,child))
+        for (action,child),h in zip(children,batch(problem,[child for _,child in children])):
+            g=costs[node]+problem.get_cost(node,action)
+            f=g+weight*h
+            # If the child is not in the frontier, add it. If it is there with a higher f, lower its f and update its path
+            if not frontier.contains(child):
+                parents.set(child,node,action)
+                costs[child]=g
+                frontier.insert((child,f))
+            elif frontier.decrease_key(child,f):
+                parents.set(child,node,action)
+                costs[child]=g
+    return None
+
+# Anytime Repairing A* (ARA*): it runs weighted A* with a decreasing weight (from 'weight' down to 1 by 'step')
+# and every run reuses the work of the previous runs instead of starting over
+# It is a generator which yields (solution, bound) pairs: every solution is at least as cheap as the previous one
+# and its cost is at most 'bound' times the optimal cost (if the heuristic is consistent). The last bound is 1 (optimal).
+# If 'deadline' is given (a time.time() value), the search stops at the deadline, but only after the first solution
+# If there is no solution, it yields nothing
+def AnytimeRepairingAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, weight: float = 3.0, step: float = 0.5, deadline: float = None, stats: SearchStats = None) -> Iterator[Tuple[list, float]]:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run_anytime(AnytimeRepairingAStar, problem, initial_state, heuristic=heuristic, weight=weight, step=step, deadline=deadline)
+    return _anytime_repairing_astar(problem, initial_state, heuristic, weight, step, deadline, stats)
+
+def _anytime_repairing_astar(problem, initial_state, heuristic, weight, step, deadline, stats):
+    # The heuristic of every state is stored since it is needed again whenever the weight changes
+    heuristics:dict={initial_state:heuristic(problem,initial_state)}
+    costs:dict={initial_state:0}
+    parents=ParentTable(initial_state)
+    frontier:PriorityQueue=PriorityQueue()
+    frontier.insert((initial_state,weight*heuristics[initial_state]))
+    # 'explored' contains the states expanded in the current run
+    # 'inconsistent' contains the explored states whose cost was lowered in the current run (they go back to the frontier in the next run)
+    explored:set=set()
+    inconsistent:set=set()
+    # The best goal found so far and its cost
+    goal,goal_cost=None,float('inf')
+    # The cost and bound of the last yielded solution
+    last_cost,last_bound=float('inf'),float('inf')
+    while True:
+        # Expand the nodes until no node in the frontier can lead to a cheaper goal with the current weight
+        while not frontier.isEmpty() and frontier.queue[0][0]<goal_cost:
+            if goal is not None and deadline is not None and time.time()>=deadline:
+                return
+            if stats is not None:
+                stats.record_frontier(len(frontier))
+            (_,_,node)=frontier.pop()
+            if problem.is_goal(node):
+                # Every goal popped from the frontier is cheaper than the previous one (the key of a goal is its cost)
+                goal,goal_cost=node,costs[node]
+                continue
+            explored.add(node)
+            for action in problem.get_actions(node):
+                child=problem.get_successor(node,action)
+                if stats is not None and child in costs:
+                    stats.duplicates+=1
+                g=costs[node]+problem.get_cost(node,action)
+                # Only proceed if this path to the child is cheaper than the one found before
+                if g>=costs.get(child,float('inf')):
+                    continue
+                costs[child]=g
+                parents.set(child,node,action)
+                # The explored states are not expanded again in this run
+                if child in explored:
+                    inconsistent.add(child)
+                    continue
+                if child not in heuristics:
+                    heuristics[child]=heuristic(problem,child)
+                f=g+weight*heuristics[child]
+                if not frontier.contains(child):
                     frontier.insert((child,f))
-                    f_cost[child]=f
-                    frontier_set.add(child)
-                 # If the child is found in the frontier 
                 else:
-                     #check if it has a higher cost, update the path and cost
-                     if f_cost[child]>f:
-                        f_cost[child]=f
-                        frontier.replaceCost(child,f,f_cost[child])
-                        path[child] = path[node] + [action]
-                        costs[child]=costs[node]+problem.get_cost(node,child)
-    return None
+                    frontier.decrease_key(child,f)
+        if goal is None:
+            return
+        # The optimal cost is at least the lowest (g + h) of the states that may still lead to a cheaper goal
+        remaining=[item for _,_,item in frontier.queue]+list(inconsistent)
+        lowest=min((costs[state]+heuristics[state] for state in remaining),default=goal_cost)
+        bound=1 if lowest>=goal_cost else min(weight,goal_cost/lowest) if lowest>0 else weight
+        # Only yield when the solution or its bound improved
+        if goal_cost<last_cost or bound<last_bound:
+            last_cost,last_bound=goal_cost,bound
+            yield parents.path(goal),bound
+        if bound<=1:
+            return
+        # Decrease the weight and start the next run from the frontier and the inconsistent states
+        weight=max(1,weight-step)
+        queue=PriorityQueue()
+        for state in remaining:
+            queue.insert((state,costs[state]+weight*heuristics[state]))
+        frontier=queue
+        explored=set()
+        inconsistent=set()
 
-def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, compact: bool = False, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(BestFirstSearch, problem, initial_state, heuristic=heuristic, compact=compact)
     # Initialize the frontier as a priority queue to explore nodes based on their heuristic cost
     frontier:PriorityQueue=PriorityQueue()
     frontier.insert((initial_state,heuristic(problem,initial_state)))
-    # Dictionary to keep track of the path to each state
-    path:dict[S,list]={initial_state:[]}
+    # Parent pointers to rebuild the path to each state (state -> (parent, action))
+    parents=create_parent_table(initial_state,compact)
     # List to keep track of explored nodes
     explored:set=set()
+    # The heuristics of all the children of a node are computed together in one batch
+    batch=heuristic_batch(heuristic)
     while not frontier.isEmpty():
+        if stats is not None:
+            stats.record_frontier(len(frontier))
         # Remove the node with the lowest heuristic cost from the frontier
-        (_,_,node)=frontier.delete()
+        (_,_,node)=frontier.pop()
          # Check if the current node is the goal state
         if problem.is_goal(node):
-            return path[node]
+            return parents.path(node)
          # Mark the current node as explored
         explored.add(node)
         actions=problem.get_actions(node)
         # Explore each action to find its resulting child state
+        children=[]
         for action in actions:
             child=problem.get_successor(node,action)
+            if stats is not None and (child in explored or frontier.contains(child)):
+                stats.duplicates+=1
              # Only proceed if the child state has not been explored
             if child not in explored :
-                 # Calculate the heuristic cost for the child state
-                h=heuristic(problem,child)
-                # Check if the child is already in the frontier with a higher cost
-                checked=frontier.replaceCost(child,h)
-                # If the child is not in the frontier, add it with the heuristic cost
-                if  checked==0:
-                    path[child] = path[node] + [action]
-                    frontier.insert((child,h))
-                     # If the child is found in the frontier, update the path to the child
-                elif checked==1:
-                     path[child] = path[node] + [action]
+                children.append((action,child))
+        # h is the heuristic cost of the child state
+        for (action,child),h in zip(children,batch(problem,[child for _,child in children])):
+            # If the child is not in the frontier, add it with the heuristic cost
+            if not frontier.contains(child):
+                parents.set(child,node,action)
+                frontier.insert((child,h))
+                 # If the child is found in the frontier with a higher cost, update the path to the child
+            elif frontier.decrease_key(child,h):
+                 parents.set(child,node,action)
+    return None
+
+# The bidirectional searches run one search forward from the initial state and another one backward from the goal
+# and stop when they meet in the middle. They need a problem that:
+# 1. has a single goal state stored in 'problem.goal'
+# 2. implements 'problem.reverse(start)' which returns the same problem with reversed edges going from the goal to 'start'
+# 3. uses the next state as the action (as in GraphRoutingProblem)
+# The nodes expanded in both directions pass through 'is_goal' so the explored nodes are tracked like in the other searches
+
+# build the forward path through the meeting node from the forward and backward parent tables
+def bidirectional_path(forward_parents: ParentTable, backward_parents: ParentTable, meeting) -> list:
+    actions = forward_parents.path(meeting)
+    # in the backward table, every state points to the next state towards the goal
+    entry = backward_parents.parents[meeting]
+    while entry is not None:
+        state, _ = entry
+        actions.append(state)
+        entry = backward_parents.parents[state]
+    return actions
+
+def BidirectionalBreadthFirstSearch(problem: Problem[S, A], initial_state: S, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(BidirectionalBreadthFirstSearch, problem, initial_state)
+    reverse = problem.reverse(initial_state)
+    if problem.is_goal(initial_state):
+        return []
+    # Each direction has its own frontier (one level at a time), parent table and depth of every discovered state
+    frontiers = [deque([initial_state]), deque([problem.goal])]
+    parents = [ParentTable(initial_state), ParentTable(problem.goal)]
+    depths = [{initial_state: 0}, {problem.goal: 0}]
+    problems = [problem, reverse]
+    while frontiers[0] and frontiers[1]:
+        # Expand a full level of the smaller frontier
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other = 1 - side
+        frontier, parent, depth, other_depth = frontiers[side], parents[side], depths[side], depths[other]
+        side_problem = problems[side]
+        # The best meeting state found in this level and the length of the path through it
+        meeting, meeting_length = None, float('inf')
+        for _ in range(len(frontier)):
+            if stats is not None:
+                stats.record_frontier(len(frontiers[0]) + len(frontiers[1]))
+            node = frontier.popleft()
+            side_problem.is_goal(node)
+            for action in side_problem.get_actions(node):
+                child = side_problem.get_successor(node, action)
+                if child in depth:
+                    if stats is not None:
+                        stats.duplicates += 1
+                    continue
+                depth[child] = depth[node] + 1
+                parent.set(child, node, action)
+                frontier.append(child)
+                # The child was already reached from the other side, so we have a path through it
+                if child in other_depth and depth[child] + other_depth[child] < meeting_length:
+                    meeting, meeting_length = child, depth[child] + other_depth[child]
+        # Every meeting in the level is found before returning so the shortest one is used
+        if meeting is not None:
+            return bidirectional_path(parents[0], parents[1], meeting)
     return None
 
+def BidirectionalAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(BidirectionalAStarSearch, problem, initial_state, heuristic=heuristic)
+    reverse = problem.reverse(initial_state)
+    # We use the average of the forward and backward heuristics as the potential of the forward search
+    # and its negation for the backward search, so both searches stay consistent and they can stop
+    # as soon as the sum of the two smallest keys reaches the cost of the best path found
+    # (if the heuristic is zero, this becomes the bidirectional version of uniform cost search)
+    potentials: dict = {}
+    def potential(state):
+        if state not in potentials:
+            potentials[state] = (heuristic(problem, state) - heuristic(reverse, state)) / 2
+        return potentials[state]
+    # Each direction has its own frontier, parent table, g costs and explored set
+    problems = [problem, reverse]
+    signs = [1, -1]
+    frontiers = [PriorityQueue(), PriorityQueue()]
+    frontiers[0].insert((initial_state, potential(initial_state)))
+    frontiers[1].insert((problem.goal, -potential(problem.goal)))
+    parents = [ParentTable(initial_state), ParentTable(problem.goal)]
+    costs = [{initial_state: 0}, {problem.goal: 0}]
+    explored = [set(), set()]
+    # The best meeting state found so far and the cost of the path through it
+    meeting, best_cost = None, float('inf')
+    if initial_state == problem.goal:
+        meeting, best_cost = initial_state, 0
+    while not frontiers[0].isEmpty() and not frontiers[1].isEmpty():
+        # Stop when no path through the frontiers can be cheaper than the best path found
+        if frontiers[0].queue[0][0] + frontiers[1].queue[0][0] >= best_cost:
+            break
+        # Expand the direction with the smaller frontier
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other = 1 - side
+        side_problem, sign = problems[side], signs[side]
+        frontier, parent, cost, other_cost = frontiers[side], parents[side], costs[side], costs[other]
+        if stats is not None:
+            stats.record_frontier(len(frontiers[0]) + len(frontiers[1]))
+        (_,_,node) = frontier.pop()
+        side_problem.is_goal(node)
+        explored[side].add(node)
+        for action in side_problem.get_actions(node):
+            child = side_problem.get_successor(node, action)
+            if stats is not None and (child in explored[side] or frontier.contains(child)):
+                stats.duplicates += 1
+            if child in explored[side]:
+                continue
+            # the backward search walks the edges in reverse so the cost is of the forward edge (child -> node)
+            g = cost[node] + (problem.get_cost(node, action) if side == 0 else problem.get_cost(child, node))
+            f = g + sign * potential(child)
+            if not frontier.contains(child):
+                cost[child] = g
+                parent.set(child, node, action)
+                frontier.insert((child, f))
+            elif frontier.decrease_key(child, f):
+                cost[child] = g
+                parent.set(child, node, action)
+            else:
+                continue
+            # The child was already reached from the other side, so we have a path through it
+            if child in other_cost and g + other_cost[child] < best_cost:
+                meeting, best_cost = child, g + other_cost[child]
+    if meeting is None:
+        return None
+    return bidirectional_path(parents[0], parents[1], meeting)
+
+def BidirectionalUniformCostSearch(problem: Problem[S, A], initial_state: S, stats: SearchStats = None) -> Solution:
+    return BidirectionalAStarSearch(problem, initial_state, lambda *_: 0, stats)
+
+# The following searches use a bounded amount of memory for huge state spaces where the explored set does not fit in memory
+# When they get a 'stats' collector, they also fill in:
+#   "max_frontier": the largest frontier size during the search (for IDA*, it is the depth of the DFS stack)
+#   "peak_nodes": the largest number of nodes kept in memory at the same time
+# They do not count the duplicates since that would need a set of every generated state (the memory they avoid)
+
+# Iterative Deepening A*: a depth first search that cuts every path once its f (g + h) exceeds a threshold
+# and repeats with the smallest f that exceeded the threshold until it finds the goal
+# It only keeps the current path in memory. It is optimal if the heuristic is admissible.
+# If 'max_nodes' is given, the search gives up (returns None) after expanding that many nodes
+def IterativeDeepeningAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, max_nodes: int = None, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(IterativeDeepeningAStar, problem, initial_state, heuristic=heuristic, max_nodes=max_nodes)
+    expanded, peak = 0, 1
+    threshold = heuristic(problem, initial_state)
+    try:
+        while True:
+            # Check if the initial state is the goal state
+            if problem.is_goal(initial_state):
+                return []
+            expanded += 1
+            # The smallest f that exceeded the threshold in this iteration
+            next_threshold = float('inf')
+            # Every stack frame contains a state on the current path, its g cost and an iterator over its actions
+            stack = [(initial_state, 0, iter(problem.get_actions(initial_state)))]
+            on_path = {initial_state}
+            actions = []
+            while stack:
+                node, g, remaining_actions = stack[-1]
+                action = next(remaining_actions, stack)
+                # All the actions of this node are done so we go back to its parent
+                if action is stack:
+                    stack.pop()
+                    on_path.remove(node)
+                    if stack:
+                        actions.pop()
+                    continue
+                child = problem.get_successor(node, action)
+                # Skip the states that are already on the current path (cycles)
+                if child in on_path:
+                    continue
+                child_g = g + problem.get_cost(node, action)
+                f = child_g + heuristic(problem, child)
+                if f > threshold:
+                    next_threshold = min(next_threshold, f)
+                    continue
+                # Check if the child is the goal state
+                if problem.is_goal(child):
+                    actions.append(action)
+                    return actions
+                if max_nodes is not None and expanded >= max_nodes:
+                    return None
+                expanded += 1
+                stack.append((child, child_g, iter(problem.get_actions(child))))
+                on_path.add(child)
+                actions.append(action)
+                peak = max(peak, len(stack))
+            # No path was cut by the threshold so there is no solution
+            if next_threshold == float('inf'):
+                return None
+            threshold = next_threshold
+    finally:
+        if stats is not None:
+            stats.max_frontier, stats.peak_nodes = peak, peak
+
+# A node of the search tree kept by the memory bounded A* search
+class MemoryNode(object):
+    __slots__ = ("state", "parent", "action", "g", "f", "depth", "children", "forgotten", "expanded", "version", "in_frontier")
+
+    def __init__(self, state, parent, action, g, f, depth):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.g = g
+        self.f = f
+        self.depth = depth
+        self.children = []      # the children that are still in memory
+        self.forgotten = {}     # the f of the children that were removed from memory (child state -> f)
+        self.expanded = False   # whether the children of this node were generated before
+        self.version = 0        # increased whenever the node enters or leaves the frontier (to skip old heap entries)
+        self.in_frontier = False
+
+    # follow the parents back to the root and return the actions in order
+    def path(self) -> list:
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+# Simplified Memory-Bounded A* (SMA*): an A* tree search that keeps at most 'memory_limit' nodes in memory
+# (it may go over the limit by the children of one node right after an expansion before forgetting the worst leaves)
+# When the memory is full, it forgets the worst leaf (highest f, shallowest) and remembers its f in the parent.
+# The parent goes back to the frontier with the lowest forgotten f, so the forgotten children are regenerated
+# when the rest of the tree turns out to be worse.
+# It is optimal if the heuristic is admissible and the memory can hold the optimal path and the children of its nodes.
+# If 'max_nodes' is given, the search gives up (returns None) after expanding that many nodes
+def MemoryBoundedAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, memory_limit: int = 10000, max_nodes: int = None, stats: SearchStats = None) -> Solution:
+    if stats is not None and not isinstance(problem, InstrumentedProblem):
+        return stats.run(MemoryBoundedAStarSearch, problem, initial_state, heuristic=heuristic, memory_limit=memory_limit, max_nodes=max_nodes)
+    # The frontier is kept in 2 heaps with lazy deletion:
+    # one to get the best node (lowest f, deepest, first inserted) and one to get the worst node (highest f, shallowest)
+    # It contains the leaves and the nodes that have forgotten children
+    best_heap, worst_heap = [], []
+    counter = 0
+    expanded, frontier_size, peak_frontier, memory, peak_memory = 0, 0, 1, 1, 1
+
+    # add the node to the frontier (or update its f if it is already there)
+    def push(node: MemoryNode):
+        nonlocal counter, frontier_size, peak_frontier, best_heap, worst_heap
+        # Drop the old entries once they outnumber the valid ones so the heaps stay within the memory bound
+        if len(best_heap) > 2 * frontier_size + 64:
+            best_heap = [entry for entry in best_heap if entry[4].in_frontier and entry[4].version == entry[3]]
+            worst_heap = [entry for entry in worst_heap if entry[4].in_frontier and entry[4].version == entry[3]]
+            heapq.heapify(best_heap)
+            heapq.heapify(worst_heap)
+        if not node.in_frontier:
+            frontier_size += 1
+            peak_frontier = max(peak_frontier, frontier_size)
+        node.version += 1
+        node.in_frontier = True
+        heapq.heappush(best_heap, (node.f, -node.depth, counter, node.version, node))
+        heapq.heappush(worst_heap, (-node.f, node.depth, counter, node.version, node))
+        counter += 1
+
+    def pop(heap) -> MemoryNode:
+        nonlocal frontier_size
+        while heap:
+            *_, version, node = heapq.heappop(heap)
+            if node.in_frontier and node.version == version:
+                node.version += 1
+                node.in_frontier = False
+                frontier_size -= 1
+                return node
+        return None
+
+    # remove a leaf from memory, remember its f in its parent and put the parent back in the frontier
+    def forget(node: MemoryNode):
+        nonlocal memory
+        memory -= 1
+        parent = node.parent
+        parent.children.remove(node)
+        parent.forgotten[node.state] = node.f
+        parent.f = min(parent.forgotten.values())
+        push(parent)
+
+    root = MemoryNode(initial_state, None, None, 0, heuristic(problem, initial_state), 0)
+    push(root)
+    try:
+        while True:
+            node = pop(best_heap)
+            if node is None or node.f == float('inf'):
+                return None
+            # Check if the current node is the goal state
+            if problem.is_goal(node.state):
+                return node.path()
+            if max_nodes is not None and expanded >= max_nodes:
+                return None
+            expanded += 1
+            # The states on the path to this node (to skip cycles)
+            on_path = set()
+            ancestor = node
+            while ancestor is not None:
+                on_path.add(ancestor.state)
+                ancestor = ancestor.parent
+            # The first time, all the children are generated. After that, only the forgotten children are regenerated
+            forgotten, regenerate = node.forgotten, node.expanded
+            node.forgotten, node.expanded = {}, True
+            children = []
+            for action in problem.get_actions(node.state):
+                child = problem.get_successor(node.state, action)
+                if child in on_path or (regenerate and child not in forgotten):
+                    continue
+                g = node.g + problem.get_cost(node.state, action)
+                if node.depth + 1 >= memory_limit:
+                    # The path to this child can not fit in memory
+                    f = float('inf')
+                else:
+                    # The f of a child is never less than the f of its parent (pathmax) or the f it had before it was forgotten
+                    f = max(node.f, g + heuristic(problem, child), forgotten.get(child, 0))
+                children.append(MemoryNode(child, node, action, g, f, node.depth + 1))
+            node.children.extend(children)
+            memory += len(children)
+            peak_memory = max(peak_memory, memory)
+            if not node.children:
+                # This is a dead end
+                node.f = float('inf')
+                if node.parent is None:
+                    return None
+                forget(node)
+            for child in children:
+                push(child)
+            # Forget the worst leaves until the tree fits in memory
+            # (the nodes in the frontier that still have children in memory are not leaves so they are kept)
+            kept = []
+            while memory > memory_limit:
+                worst = pop(worst_heap)
+                if worst is None:
+                    break
+                if worst.parent is None or worst.children:
+                    kept.append(worst)
+                    continue
+                forget(worst)
+            # put the kept nodes back (unless they lost all their children and were forgotten in the meantime)
+            for worst in kept:
+                if not worst.in_frontier and (worst.parent is None or worst.children):
+                    push(worst)
+    finally:
+        if stats is not None:
+            stats.max_frontier, stats.peak_nodes = peak_frontier, peak_memory
@@ -0,0 +1,187 @@
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from dataclasses import dataclass, fields
+import json, time, tracemalloc
+
+from problem import Problem, heuristic_batch
+
+# This file contains the statistics collector that every search function accepts through its optional 'stats' argument
+# When 'stats' is None (the default), the search runs exactly as before so the collector costs nothing.
+# When it is given, the search runs on an instrumented view of the problem that counts and times the calls
+# to 'get_actions', 'get_successor' and the heuristic. The search also gets the collector, so it can report
+# the numbers that only it knows: the size of its frontier and the duplicate states it generates.
+
+@dataclass
+class SearchStats:
+    track_memory: bool = False              # if True, the peak memory is measured using tracemalloc (this slows the search down)
+    expanded: int = 0                       # the number of expanded nodes (calls to 'get_actions')
+    generated: int = 0                      # the number of generated nodes (calls to 'get_successor')
+    duplicates: int = 0                     # the number of generated nodes whose state was reached before (not counted by the memory bounded searches)
+    max_frontier: int = 0                   # the largest frontier size, as reported by the search
+    solution_found: bool = False
+    solution_depth: Optional[int] = None    # the number of actions in the solution
+    effective_branching_factor: Optional[float] = None
+    heuristic_calls: int = 0
+    heuristic_time: float = 0               # the time (in seconds) spent in the heuristic
+    successor_time: float = 0               # the time (in seconds) spent in 'get_successor'
+    actions_time: float = 0                 # the time (in seconds) spent in 'get_actions'
+    total_time: float = 0                   # the time (in seconds) spent in the whole search
+    peak_memory: Optional[int] = None       # the peak memory (in bytes) allocated during the search (only if track_memory)
+    peak_nodes: Optional[int] = None        # the largest number of nodes kept at the same time (only for the memory bounded searches)
+
+    # Run the search function on an instrumented view of the problem and collect the statistics
+    # If the keyword arguments contain a heuristic, it is timed as well
+    def run(self, search_fn: Callable, problem: Problem, initial_state: Any, **kwargs):
+        instrumented, kwargs = self.instrument(problem, initial_state, kwargs)
+        started_tracing = self.start_tracing()
+        start = time.perf_counter()
+        try:
+            solution = search_fn(instrumented, initial_state, stats=self, **kwargs)
+        finally:
+            self.total_time += time.perf_counter() - start
+            self.stop_tracing(started_tracing)
+        self.record_solution(solution)
+        return solution
+
+    # Same as 'run' but for anytime searches which yield (solution, bound) pairs
+    # The time spent by the caller between two solutions is not counted in the total time
+    def run_anytime(self, search_fn: Callable, problem: Problem, initial_state: Any, **kwargs) -> Iterator[tuple]:
+        instrumented, kwargs = self.instrument(problem, initial_state, kwargs)
+        started_tracing = self.start_tracing()
+        try:
+            solutions = search_fn(instrumented, initial_state, stats=self, **kwargs)
+            while True:
+                start = time.perf_counter()
+                item = next(solutions, None)
+                self.total_time += time.perf_counter() - start
+                if item is None:
+                    return
+                self.record_solution(item[0])
+                yield item
+        finally:
+            self.stop_tracing(started_tracing)
+
+    def instrument(self, problem: Problem, initial_state: Any, kwargs: Dict[str, Any]) -> Tuple['InstrumentedProblem', Dict[str, Any]]:
+        kwargs = dict(kwargs)
+        if kwargs.get("heuristic") is not None:
+            kwargs["heuristic"] = self.timed_heuristic(kwargs["heuristic"])
+        return InstrumentedProblem(problem, self), kwargs
+
+    # Start measuring the memory (if needed) and return whether tracemalloc was started here
+    def start_tracing(self) -> bool:
+        if not self.track_memory:
+            return False
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        return started_tracing
+
+    def stop_tracing(self, started_tracing: bool):
+        if self.track_memory:
+            self.peak_memory = max(self.peak_memory or 0, tracemalloc.get_traced_memory()[1])
+            if started_tracing:
+                tracemalloc.stop()
+
+    # Called by the searches with the current size of their frontier
+    def record_frontier(self, size: int):
+        if size > self.max_frontier:
+            self.max_frontier = size
+
+    def record_solution(self, solution):
+        self.solution_found = solution is not None
+        if solution is not None:
+            self.solution_depth = len(solution)
+            self.effective_branching_factor = effective_branching_factor(self.generated, self.solution_depth)
+
+    # Wrap the heuristic to count and time its calls
+    # The heuristic still receives the original problem (and not the instrumented view)
+    def timed_heuristic(self, heuristic):
+        def timed(problem, state):
+            if isinstance(problem, InstrumentedProblem):
+                problem = problem.problem
+            start = time.perf_counter()
+            value = heuristic(problem, state)
+            self.heuristic_time += time.perf_counter() - start
+            self.heuristic_calls += 1
+            return value
+        # The batched version is timed as a whole and counts one call per state
+        batch = heuristic_batch(heuristic)
+        def timed_batch(problem, states):
+            if isinstance(problem, InstrumentedProblem):
+                problem = problem.problem
+            start = time.perf_counter()
+            values = batch(problem, states)
+            self.heuristic_time += time.perf_counter() - start
+            self.heuristic_calls += len(states)
+            return values
+        timed.batch = timed_batch
+        return timed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    # Save the statistics as a JSON file
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            f.write(self.to_json(indent=4))
+
+# This is a view of a problem that forwards every call to it while collecting statistics
+# Any other attribute (such as the layout or the goal) is read from the original problem
+class InstrumentedProblem(Problem):
+    def __init__(self, problem: Problem, stats: SearchStats) -> None:
+        self.problem = problem
+        self.stats = stats
+
+    def __getattr__(self, name: str):
+        return getattr(self.problem, name)
+
+    def cache(self) -> Dict[Any, Any]:
+        return self.problem.cache()
+
+    def get_initial_state(self):
+        return self.problem.get_initial_state()
+
+    def is_goal(self, state) -> bool:
+        return self.problem.is_goal(state)
+
+    def get_actions(self, state):
+        stats = self.stats
+        start = time.perf_counter()
+        actions = self.problem.get_actions(state)
+        stats.actions_time += time.perf_counter() - start
+        stats.expanded += 1
+        return actions
+
+    def get_successor(self, state, action):
+        stats = self.stats
+        start = time.perf_counter()
+        successor = self.problem.get_successor(state, action)
+        stats.successor_time += time.perf_counter() - start
+        stats.generated += 1
+        return successor
+
+    def get_cost(self, state, action) -> float:
+        return self.problem.get_cost(state, action)
+
+    # The reversed problem (used by the bidirectional searches) is instrumented too
+    def reverse(self, *args):
+        return InstrumentedProblem(self.problem.reverse(*args), self.stats)
+
+# Compute the effective branching factor b* of a search that generated 'generated' nodes to find a solution at 'depth':
+# the branching factor of a uniform tree of this depth with the same number of nodes (N + 1 = 1 + b* + b*^2 + ... + b*^d)
+def effective_branching_factor(generated: int, depth: int) -> Optional[float]:
+    if depth == 0:
+        return None
+    def tree_size(b: float) -> float:
+        return sum(b ** level for level in range(depth + 1))
+    low, high = 0.0, max(1.0, float(generated))
+    for _ in range(100):
+        middle = (low + high) / 2
+        if tree_size(middle) < generated + 1:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
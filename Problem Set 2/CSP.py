@@ -1,4 +1,5 @@
-from typing import Callable, Dict, List, Any, Tuple
+from itertools import combinations
+from typing import Callable, Dict, List, Any, Sequence, Tuple
 from helpers.utils import track_call_count
 
 # This is the type definition for an Assignment
@@ -57,6 +58,34 @@ class BinaryConstraint(Constraint):
         variable1, variable2 = self.variables
         return variable2 if variable == variable1 else variable1
 
+# This is a class for the all-different constraint (an n-ary constraint requiring all its variables to take different values).
+# It replaces the binary "!=" constraints between every pair of its variables, so a puzzle needs one constraint per group
+# instead of n*(n-1)/2 constraints, and the solver can use a stronger propagation on the whole group (see "all_different" in CSP_solver.py).
+class AllDifferentConstraint(Constraint):
+    variables: Tuple[str, ...]  # The names of the variables that are in the constraint.
+
+    def __init__(self, variables: Sequence[str]) -> None:
+        super().__init__()
+        self.variables = tuple(variables)
+        self._binary_constraints = None
+
+    # This function checks if all the variables of the constraint are assigned different values.
+    # If any of the variables are unassigned, the assignment does not satisfy the condition.
+    # Important: If the value of a variable in the assignment is None, then it is assumed as if it is unassigned.
+    def is_satisfied(self, assignment: Assignment) -> bool:
+        values = [assignment.get(variable) for variable in self.variables]
+        if any(value is None for value in values): return False
+        return len(set(values)) == len(values)
+
+    # Returns the binary "!=" constraints between every pair of the variables (they are created once).
+    # They are used by the parts of the solver that only work on binary constraints (such as forward checking),
+    # where the all-different constraint has the same effect as these binary constraints.
+    def binary_constraints(self) -> List[BinaryConstraint]:
+        if self._binary_constraints is None:
+            not_equal_condition = lambda a, b: a != b
+            self._binary_constraints = [BinaryConstraint(pair, not_equal_condition) for pair in combinations(self.variables, 2)]
+        return self._binary_constraints
+
 # This defines a generic CSP problem
 class Problem:
     variables: List[str]            # A list of the variable names in the problem
@@ -72,3 +101,26 @@ class Problem:
     # Return True if the assignment satisfies all the constraints.
     def satisfies_constraints(self, assignment: Assignment) -> bool:
         return all(constraint.is_satisfied(assignment) for constraint in self.constraints)
+
+    # Returns the binary constraints that involve the given variable, each paired with the other variable in the constraint.
+    # An all-different constraint is listed as its binary "!=" constraints (see "AllDifferentConstraint.binary_constraints").
+    # They are read from an index (variable -> list of (constraint, other variable)) that is built once for the constraint list,
+    # so finding the neighbors of a variable costs its degree instead of a scan over all the constraints.
+    # The constraints are listed in the same order as in "constraints".
+    # The index is built again if the constraint list is replaced (for example, by 1-Consistency) or if its length changes.
+    def neighbors(self, variable: str) -> List[Tuple[BinaryConstraint, str]]:
+        index = getattr(self, "_neighbors", None)
+        if index is None or index[0] is not self.constraints or index[1] != len(self.constraints):
+            neighbors: Dict[str, List[Tuple[BinaryConstraint, str]]] = {}
+            for constraint in self.constraints:
+                if isinstance(constraint, BinaryConstraint):
+                    binary_constraints = [constraint]
+                elif isinstance(constraint, AllDifferentConstraint):
+                    binary_constraints = constraint.binary_constraints()
+                else:
+                    continue
+                for binary_constraint in binary_constraints:
+                    for other in set(binary_constraint.variables):
+                        neighbors.setdefault(other, []).append((binary_constraint, binary_constraint.get_other(other)))
+            index = self._neighbors = (self.constraints, len(self.constraints), neighbors)
+        return index[2].get(variable, [])
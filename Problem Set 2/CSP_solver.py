@@ -1,5 +1,6 @@
-from typing import Any, Dict, List, Optional
-from CSP import Assignment, BinaryConstraint, Problem, UnaryConstraint
+from typing import Any, Dict, List, Optional, Tuple, Union
+from collections import deque
+from CSP import AllDifferentConstraint, Assignment, BinaryConstraint, Problem, UnaryConstraint
 from helpers.utils import NotImplemented
 
 # This function applies 1-Consistency to the problem.
@@ -27,8 +28,8 @@ def one_consistency(problem: Problem) -> bool:
 # NOTE: If multiple variables have the same priority given the MRV heuristic, 
 #       we order them in the same order in which they appear in "problem.variables".
 def minimum_remaining_values(problem: Problem, domains: Dict[str, set]) -> str:
-    _, _, variable = min((len(domains[variable]), index, variable) for index, variable in enumerate(problem.variables) if variable in domains)
-    return variable
+    # The set domains are converted to the bitsets of the backtracking search so both share the same implementation
+    return TrailDomains(problem, domains).minimum_remaining_values()
 
 # This function should implement forward checking
 # The function is given the problem, the variable that has been assigned and its assigned value and the domains of the unassigned values
@@ -42,32 +43,17 @@ def minimum_remaining_values(problem: Problem, domains: Dict[str, set]) -> str:
 # IMPORTANT: Don't use the domains inside the problem, use and modify the ones given by the "domains" argument 
 #            since they contain the current domains of unassigned variables only.
 def forward_checking(problem: Problem, assigned_variable: str, assigned_value: Any, domains: Dict[str, set]) -> bool:
-    # Pre-filter constraints involving the target variable
-    relevant_constraints = [
-        constraint for constraint in problem.constraints
-        if isinstance(constraint, BinaryConstraint) and assigned_variable in constraint.variables
-    ]
-    
-    # Loop on all relevant constraints
-    for constraint in relevant_constraints:
-        # Get the other variable in the constraint
-        other_variable = constraint.get_other(assigned_variable)
-        
-        # Check if the other variable is not assigned
-        if other_variable not in domains:
-            continue
-        
-        # Update the other variable's domain to only include the values that satisfy the binary constraint with the assigned variable
-        new_domain = {value for value in domains[other_variable] if constraint.is_satisfied({assigned_variable: assigned_value, other_variable: value})}
-        
-        # If any variable's domain becomes empty, return False
-        if not new_domain:
-            return False
-        
-        # Update the domain in place
-        domains[other_variable] = new_domain
-    
+    # The assigned variable is added with its value so the value has an index in the bitsets, then it is removed again
+    trail = TrailDomains(problem, {**domains, assigned_variable: {assigned_value}})
+    trail.assign(assigned_variable)
+    if not trail.forward_checking(assigned_variable, trail.indices[assigned_value]):
+        return False
+    # Update the narrowed domains in place
+    for variable, bits in trail.domains.items():
+        if variable in domains and bits != trail.initial[variable]:
+            domains[variable] = {trail.values[index] for index in trail.bit_indices(bits)}
     return True
+
 # This function should return the domain of the given variable order based on the "least restraining value" heuristic.
 # IMPORTANT: This function should not modify any of the given arguments.
 # Generally, this function is very similar to the forward checking function, but it differs as follows:
@@ -79,40 +65,8 @@ def forward_checking(problem: Problem, assigned_variable: str, assigned_value: A
 # IMPORTANT: Don't use the domains inside the problem, use and modify the ones given by the "domains" argument 
 #            since they contain the current domains of unassigned variables only.
 def least_restraining_values(problem: Problem, variable_to_assign: str, domains: Dict[str, set]) -> List[Any]:
-    value_impact = []
-    # Pre-filter constraints involving the target variable
-    relevant_constraints = [
-        constraint for constraint in problem.constraints
-        if isinstance(constraint, BinaryConstraint) and variable_to_assign in constraint.variables
-    ]
-
-    # Loop on variable domain
-    for assigned_value in domains[variable_to_assign]:
-        total_remaining_values = 0
-
-        for constraint in relevant_constraints:
-            # Get the other variable in the constraint
-            other_variable = constraint.get_other(variable_to_assign)
-
-            # Check if the other variable is not assigned
-            if other_variable not in domains:
-                continue
-
-            # Compute the reduced domain for the other variable
-            new_domain_size = sum(
-                1 for value in domains[other_variable]
-                if constraint.is_satisfied({variable_to_assign: assigned_value, other_variable: value})
-            )
-            total_remaining_values += new_domain_size
-
-        # Track the assigned value and its impact
-        value_impact.append((assigned_value, total_remaining_values))
-
-    # Sort values by the least impact (higher remaining values first) and by natural order for ties
-    value_impact.sort(key=lambda x: (-x[1], x[0]))
-
-    # Return only the values, sorted by least restraining impact
-    return [value for value, _ in value_impact]
+    trail = TrailDomains(problem, domains)
+    return [trail.values[index] for index in trail.least_restraining_values(variable_to_assign)]
 
 # This function should solve CSP problems using backtracking search with forward checking.
 # The variable ordering should be decided by the MRV heuristic.
@@ -124,38 +78,348 @@ def least_restraining_values(problem: Problem, variable_to_assign: str, domains:
 #            for every assignment including the initial empty assignment, EXCEPT for the assignments pruned by the forward checking.
 #            Also, if 1-Consistency deems the whole problem unsolvable, you shouldn't call "problem.is_complete" at all.
 
-def solve(problem: Problem) -> Optional[Assignment]:
+# Optionally, the solver can also use arc consistency:
+#   - "arc_consistency" applies arc consistency to the domains after 1-Consistency (before the search starts).
+#     It is one of: None (disabled), "ac3" or "ac2001" (AC-3 where every value remembers its last found support
+#     so the support is only searched again when that value is removed).
+#   - "mac" (Maintaining Arc Consistency) applies arc consistency after every assignment instead of forward checking only.
+#     It uses the residual supports if "arc_consistency" is "ac2001".
+# In both cases, the all-different constraints are also propagated on their whole group of variables (see "all_different").
+# Without them, an all-different constraint acts as its binary "!=" constraints (which gives the same search as before).
+# If arc consistency empties a domain before the search, the problem is unsolvable and "problem.is_complete" is not called.
+def solve(problem: Problem, arc_consistency: Optional[str] = None, mac: bool = False) -> Optional[Assignment]:
     # Apply 1-Consistency to the problem
     if not one_consistency(problem):
         return None
+    if arc_consistency not in (None, "ac3", "ac2001"):
+        raise ValueError(f"Unknown arc consistency algorithm: {arc_consistency}")
+    domains = TrailDomains(problem, problem.domains, residues=arc_consistency == "ac2001", mac=mac)
+    # Apply arc consistency to all the arcs before the search
+    if arc_consistency is not None and not domains.arc_consistency(domains.all_arcs(), domains.all_different_constraints):
+        return None
     # Start the backtracking search
-    return backtracking(problem, {}, problem.domains.copy())
+    return backtracking(problem, {}, domains)
+
+# The domains used by the backtracking search
+# Every domain is a bitset: bit i is set if values[i] is in the domain (where values is the sorted list of all the values)
+# The domains are narrowed in place and every change is recorded on a trail (an undo log) with the previous bitset,
+# so backtracking restores them in O(changes) instead of copying all the domains at every branch.
+# Only the domains of the unassigned variables are kept (as in the "domains" argument of the functions above).
+# If "mac" is True, every assignment is followed by arc consistency (instead of forward checking only)
+# and if "residues" is True, arc consistency uses the residual supports of AC-2001.
+# Arc consistency also propagates the all-different constraints using Regin's matching algorithm.
+class TrailDomains:
+    def __init__(self, problem: Problem, domains: Dict[str, set], residues: bool = False, mac: bool = False) -> None:
+        self.problem = problem
+        self.mac = mac
+        # (constraint, variable, value index) -> the index of the last value of the other variable found to support it
+        # The residues are not restored on backtracking since a residue is only a hint that is checked before being used
+        self.residues: Optional[Dict[Tuple[BinaryConstraint, str, int], int]] = {} if residues else None
+        self.values = sorted({value for domain in domains.values() for value in domain})
+        self.indices = {value: index for index, value in enumerate(self.values)}
+        self.domains: Dict[str, int] = {variable: self.to_bits(domain) for variable, domain in domains.items()}
+        self.initial = dict(self.domains)
+        # The position of every variable in "problem.variables" (used to break the MRV ties)
+        self.positions = {variable: index for index, variable in enumerate(problem.variables)}
+        self.trail: List[Tuple[str, int]] = []
+        # (constraint, variable, value index) -> the bitset of the other variable's values that satisfy the constraint with this value
+        self.supports: Dict[Tuple[BinaryConstraint, str, int], int] = {}
+        # The all-different constraints and the ones that involve every variable
+        self.all_different_constraints = [constraint for constraint in problem.constraints if isinstance(constraint, AllDifferentConstraint)]
+        self.all_different_of: Dict[str, List[AllDifferentConstraint]] = {}
+        for constraint in self.all_different_constraints:
+            for variable in constraint.variables:
+                self.all_different_of.setdefault(variable, []).append(constraint)
+        # all-different constraint -> the last maximum matching found for it (variable -> value index)
+        # As the residues, the matchings are not restored on backtracking since they are checked before being reused
+        self.matchings: Dict[AllDifferentConstraint, Dict[str, int]] = {}
+
+    def to_bits(self, domain: set) -> int:
+        bits = 0
+        for value in domain:
+            bits |= 1 << self.indices[value]
+        return bits
+
+    # Returns the indices of the values in a bitset (in ascending order)
+    @staticmethod
+    def bit_indices(bits: int) -> List[int]:
+        indices = []
+        while bits:
+            lowest = bits & -bits
+            indices.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return indices
+
+    # Returns the current position of the trail (to undo all the changes after it later)
+    def mark(self) -> int:
+        return len(self.trail)
+
+    # Restore the domains as they were at the given mark
+    def undo(self, mark: int):
+        trail, domains = self.trail, self.domains
+        while len(trail) > mark:
+            variable, bits = trail.pop()
+            domains[variable] = bits
+
+    # Replace the domain of a variable by a smaller one
+    def narrow(self, variable: str, bits: int):
+        self.trail.append((variable, self.domains[variable]))
+        self.domains[variable] = bits
+
+    # Remove the domain of a variable since it is assigned
+    def assign(self, variable: str):
+        self.trail.append((variable, self.domains.pop(variable)))
+
+    # Returns the bitset of the values of 'other' that satisfy the constraint when 'variable' takes the value at 'index'
+    # It is computed once (over the initial domain of 'other') and then reused
+    def support(self, constraint: BinaryConstraint, variable: str, index: int, other: str) -> int:
+        key = (constraint, variable, index)
+        bits = self.supports.get(key)
+        if bits is None:
+            value, bits = self.values[index], 0
+            for other_index in self.bit_indices(self.initial[other]):
+                if constraint.is_satisfied({variable: value, other: self.values[other_index]}):
+                    bits |= 1 << other_index
+            self.supports[key] = bits
+        return bits
+
+    # The same as "minimum_remaining_values" on the bitsets
+    def minimum_remaining_values(self) -> str:
+        domains, positions = self.domains, self.positions
+        return min(domains, key=lambda variable: (domains[variable].bit_count(), positions[variable]))
+
+    # The same as "least_restraining_values" on the bitsets (it returns the value indices)
+    def least_restraining_values(self, variable: str) -> List[int]:
+        domains = self.domains
+        neighbors = [(constraint, other) for constraint, other in self.problem.neighbors(variable) if other in domains]
+        value_impact = []
+        for index in self.bit_indices(domains[variable]):
+            total_remaining_values = sum(
+                (domains[other] & self.support(constraint, variable, index, other)).bit_count()
+                for constraint, other in neighbors
+            )
+            value_impact.append((-total_remaining_values, index))
+        value_impact.sort()
+        return [index for _, index in value_impact]
+
+    # The same as "forward_checking" on the bitsets (the assigned variable must already be removed from the domains)
+    # The domains that it narrows are recorded on the trail, so they are restored by "undo" even if it returns False
+    # In the MAC mode, arc consistency is then applied to the arcs pointing to the narrowed variables
+    def forward_checking(self, assigned_variable: str, assigned_index: int) -> bool:
+        domains = self.domains
+        narrowed = []
+        for constraint, other_variable in self.problem.neighbors(assigned_variable):
+            bits = domains.get(other_variable)
+            if bits is None:
+                continue
+            new_bits = bits & self.support(constraint, assigned_variable, assigned_index, other_variable)
+            if not new_bits:
+                return False
+            if new_bits != bits:
+                self.narrow(other_variable, new_bits)
+                narrowed.append(other_variable)
+        if self.mac:
+            arcs = [arc for variable in narrowed for arc in self.arcs_to(variable)]
+            constraints = [constraint for variable in [assigned_variable, *narrowed] for constraint in self.all_different_of.get(variable, [])]
+            return self.arc_consistency(arcs, constraints)
+        return True
+
+    # An arc (variable, constraint, other) means that every value of "variable" needs a supporting value of "other"
+    # This returns all the arcs between the unassigned variables
+    def all_arcs(self) -> List[Tuple[str, BinaryConstraint, str]]:
+        domains = self.domains
+        return [
+            (variable, constraint, other)
+            for variable in domains
+            for constraint, other in self.problem.neighbors(variable)
+            if other in domains and other != variable
+        ]
+
+    # Returns the arcs from the unassigned neighbors of a variable to it
+    # (they must be checked again when the domain of the variable shrinks)
+    def arcs_to(self, variable: str) -> List[Tuple[str, BinaryConstraint, str]]:
+        domains = self.domains
+        return [(other, constraint, variable) for constraint, other in self.problem.neighbors(variable) if other in domains and other != variable]
+
+    # Remove the values of "variable" that have no support in the domain of "other"
+    # It returns the new domain of "variable" (0 if it became empty)
+    def revise(self, variable: str, constraint: BinaryConstraint, other: str) -> int:
+        domains, residues = self.domains, self.residues
+        bits, other_bits = domains[variable], domains[other]
+        new_bits = bits
+        for index in self.bit_indices(bits):
+            if residues is not None:
+                # AC-2001: if the last support found for this value is still in the domain, there is nothing to search
+                key = (constraint, variable, index)
+                residue = residues.get(key)
+                if residue is not None and other_bits >> residue & 1:
+                    continue
+                supported = other_bits & self.support(constraint, variable, index, other)
+                if supported:
+                    residues[key] = (supported & -supported).bit_length() - 1
+                    continue
+            elif other_bits & self.support(constraint, variable, index, other):
+                continue
+            new_bits &= ~(1 << index)
+        if new_bits != bits:
+            self.narrow(variable, new_bits)
+        return new_bits
+
+    # Remove the values that can not be part of any solution of an all-different constraint (Regin's algorithm)
+    # Only the unassigned variables of the constraint are considered (forward checking already removed the assigned values).
+    # A value is kept only if some maximum matching between the variables and the values assigns it to its variable.
+    # Given one maximum matching, this is the case if the value is matched to the variable, or if it can be reached
+    # by an alternating path from a free value (a value matched to no variable), or if it is in the same strongly connected
+    # component as the matched value of the variable in the graph where every value u points to the values matched to
+    # the variables having u in their domains.
+    # It returns the variables whose domains were narrowed or None if the variables can not all get different values.
+    def all_different(self, constraint: AllDifferentConstraint) -> Optional[List[str]]:
+        domains, bit_indices = self.domains, self.bit_indices
+        variables = [variable for variable in constraint.variables if variable in domains]
+        # Find a maximum matching using augmenting paths, starting from the previous matching of this constraint
+        matched: Dict[str, int] = {}    # variable -> value index
+        owners: Dict[int, str] = {}     # value index -> variable
+        for variable, index in self.matchings.get(constraint, {}).items():
+            if variable in domains and domains[variable] >> index & 1 and index not in owners:
+                matched[variable], owners[index] = index, variable
+        def augment(variable: str, visited: List[int]) -> bool:
+            for index in bit_indices(domains[variable] & ~visited[0]):
+                visited[0] |= 1 << index
+                owner = owners.get(index)
+                if owner is None or augment(owner, visited):
+                    matched[variable], owners[index] = index, variable
+                    return True
+            return False
+        for variable in variables:
+            if variable not in matched and not augment(variable, [0]):
+                return None
+        self.matchings[constraint] = matched
+        # Build the graph between the values and find the values reachable from the free values
+        successors: Dict[int, int] = {}
+        union = 0
+        for variable in variables:
+            bits, index = domains[variable], matched[variable]
+            union |= bits
+            for other_index in bit_indices(bits & ~(1 << index)):
+                successors[other_index] = successors.get(other_index, 0) | (1 << index)
+        reached = frontier = union & ~sum(1 << index for index in owners)
+        while frontier:
+            next_frontier = 0
+            for index in bit_indices(frontier):
+                next_frontier |= successors.get(index, 0)
+            frontier = next_frontier & ~reached
+            reached |= frontier
+        # A cycle that passes through a reached value only contains reached values, so the components are only needed for the others
+        components = self.strongly_connected_components(successors, union & ~reached)
+        narrowed = []
+        for variable in variables:
+            bits, index = domains[variable], matched[variable]
+            new_bits = bits
+            for other_index in bit_indices(bits & ~reached & ~(1 << index)):
+                if components[other_index] != components.get(index):
+                    new_bits &= ~(1 << other_index)
+            if new_bits != bits:
+                self.narrow(variable, new_bits)
+                narrowed.append(variable)
+        return narrowed
+
+    # Returns the strongly connected component of every node (node -> the root node of its component) using Tarjan's algorithm
+    # The graph is given as node -> the bitset of its successors and only the nodes in the "nodes" bitset are considered
+    @staticmethod
+    def strongly_connected_components(successors: Dict[int, int], nodes: int) -> Dict[int, int]:
+        order: Dict[int, int] = {}
+        lowest: Dict[int, int] = {}
+        stack: List[int] = []
+        on_stack = set()
+        components: Dict[int, int] = {}
+        def connect(node: int):
+            order[node] = lowest[node] = len(order)
+            stack.append(node)
+            on_stack.add(node)
+            for successor in TrailDomains.bit_indices(successors.get(node, 0) & nodes):
+                if successor not in order:
+                    connect(successor)
+                    lowest[node] = min(lowest[node], lowest[successor])
+                elif successor in on_stack:
+                    lowest[node] = min(lowest[node], order[successor])
+            if lowest[node] == order[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    components[member] = node
+                    if member == node:
+                        break
+        for node in TrailDomains.bit_indices(nodes):
+            if node not in order:
+                connect(node)
+        return components
+
+    # AC-3: revise the arcs in the queue until no domain changes
+    # When the domain of a variable shrinks, the arcs pointing to it are added to the queue again
+    # and its all-different constraints are propagated again (starting from the given ones)
+    # It returns False if a domain becomes empty. All the changes are recorded on the trail.
+    def arc_consistency(self, arcs: List[Tuple[str, BinaryConstraint, str]], constraints: List[AllDifferentConstraint] = ()) -> bool:
+        queue = deque(arcs)
+        queued = set(arcs)
+        pending = deque(dict.fromkeys(constraints))
+        def shrunk(variable: str, constraint):
+            for next_arc in self.arcs_to(variable):
+                if next_arc[1] is not constraint and next_arc not in queued:
+                    queue.append(next_arc)
+                    queued.add(next_arc)
+            for next_constraint in self.all_different_of.get(variable, []):
+                if next_constraint is not constraint and next_constraint not in pending:
+                    pending.append(next_constraint)
+        while queue or pending:
+            if not queue:
+                constraint = pending.popleft()
+                narrowed = self.all_different(constraint)
+                if narrowed is None:
+                    return False
+                for variable in narrowed:
+                    shrunk(variable, constraint)
+                continue
+            arc = queue.popleft()
+            queued.discard(arc)
+            variable, constraint, other = arc
+            bits = self.domains[variable]
+            new_bits = self.revise(variable, constraint, other)
+            if not new_bits:
+                return False
+            if new_bits != bits:
+                shrunk(variable, constraint)
+        return True
 
-def backtracking(problem: Problem, assignment: Dict[str, Any], domains: Dict[str, set]) -> Optional[Assignment]:
+# "domains" are the domains of the unassigned variables, either as sets (which are converted to a TrailDomains) or as a TrailDomains
+def backtracking(problem: Problem, assignment: Dict[str, Any], domains: Union[Dict[str, set], TrailDomains]) -> Optional[Assignment]:
+    if not isinstance(domains, TrailDomains):
+        domains = TrailDomains(problem, domains)
     # Check if the assignment is complete
     if problem.is_complete(assignment):
         return assignment
 
     # Get the variable with the minimum remaining values
-    variable = minimum_remaining_values(problem, domains)
+    variable = domains.minimum_remaining_values()
     # Get the least restraining values for the variable
-    values = least_restraining_values(problem, variable, domains)
+    values = domains.least_restraining_values(variable)
 
     for value in values:
-        # Create a new domain without the variable
-        new_domains = domains.copy()
-        del new_domains[variable]
+        # Remove the variable from the domains (all the changes after the mark are undone after trying this value)
+        mark = domains.mark()
+        domains.assign(variable)
         # Check if value is valid
-        if forward_checking(problem, variable, value, new_domains):
+        if domains.forward_checking(variable, value):
             # Add the variable to the assignment
-            assignment[variable] = value
+            assignment[variable] = domains.values[value]
             # Recursively solve the problem
-            result = backtracking(problem, assignment, new_domains)
+            result = backtracking(problem, assignment, domains)
             # Check if the result is not None
             if result is not None:
                 return result
             # Remove the variable from the assignment
             del assignment[variable]
+        # Restore the domains
+        domains.undo(mark)
 
     # Return None if no solution was found
     return None
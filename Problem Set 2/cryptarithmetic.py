@@ -1,7 +1,6 @@
-from itertools import combinations
 from typing import Tuple
 import re
-from CSP import Assignment, Problem, UnaryConstraint, BinaryConstraint
+from CSP import AllDifferentConstraint, Assignment, Problem, UnaryConstraint, BinaryConstraint
 
 #TODO (Optional): Import any builtin library or define any helper function you want to use
 
@@ -67,10 +66,8 @@ class CryptArithmeticProblem(Problem):
         #set for carry + 3 different digits
         large_sum_set = set(range(200))-{x * 11 for x in range(10)}-set(range(111, 200, 11))
         
-        # Add "all-different" constraints
-        problem.constraints.extend(
-            [BinaryConstraint((var1, var2), lambda a, b: a != b) for var1, var2 in combinations(problem.variables, 2)]
-        )
+        # Add the "all-different" constraint on the letters
+        problem.constraints.append(AllDifferentConstraint(problem.variables))
     
         # Assign domains to variables            
         for variable in problem.variables:
@@ -6,7 +6,7 @@ import re
 ##                  PART 2: CSP                     ##
 ########################################################
 
-from CSP import UnaryConstraint, Assignment
+from CSP import AllDifferentConstraint, Assignment, Problem, UnaryConstraint
 from sudoku import SudokuProblem
 
 # A Utility function to verify the type of domains in a Sudoku Problem
@@ -225,14 +225,18 @@ def compare_minimum_remaining_values(
 ###############################################
 ## Backtracking CSP Solve Runner and Comparator
 
+# The keyword arguments (such as "arc_consistency" and "mac") are passed to the solver
+# NOTE: Arc consistency does not always reduce the explored nodes. It changes the domains that MRV and LCV see,
+#       so the search can take a worse order (the hard 9x9 puzzle explores 309 nodes by default but 465 with AC-3).
 def run_csp_solve(
     function_path: str,
-    problem: SudokuProblem) -> Tuple[int, Optional[Assignment]]:
+    problem: SudokuProblem,
+    **options) -> Tuple[int, Optional[Assignment]]:
     
     fetch_tracked_call_count(SudokuProblem.is_complete) # Clear the recorded calls
 
     solve = load_function(function_path)
-    solution = solve(problem)
+    solution = solve(problem, **options)
 
     # get the count of nodes that have been explored by the search function
     explored = fetch_tracked_call_count(SudokuProblem.is_complete)
@@ -334,6 +338,71 @@ def compare_cryptarithmetic_solution(
 
     return Result(True, 1, f"Your solution for the puzzle '{problem}' is {terms[0]} + {terms[1]} = {terms[2]}")
 
+###################################################################
+## All-Different Propagation Runners and Comparators
+
+# Solve the puzzle file twice: once with the default solver and once with the given options ("arc_consistency" and "mac")
+# where the all-different constraints of the puzzle are propagated on their whole group of variables
+def run_csp_solve_with_options(
+    problem_cls_path: str,
+    problem_file: str,
+    **options) -> Tuple[Optional[Assignment], Optional[Assignment], bool, str]:
+
+    cls = load_function(problem_cls_path)
+    solve = load_function("CSP_solver.solve")
+    default_solution = solve(cls.from_file(problem_file))
+    solution = solve(cls.from_file(problem_file), **options)
+
+    # The solution is checked on a new problem since 1-Consistency removes the unary constraints from the solved one
+    valid = solution is not None and cls.from_file(problem_file).satisfies_constraints(solution)
+    return solution, default_solution, valid, problem_file
+
+def compare_csp_solution_with_default(
+    output: Tuple[Optional[Assignment], Optional[Assignment], bool, str]) -> Result:
+
+    solution, default_solution, valid, problem_file = output
+    with open(problem_file, 'r') as f:
+        puzzle = f.read()
+    nl = '\n'
+    postfix = f"{nl}Puzzle:{nl}{puzzle}"
+    if solution != default_solution:
+        return Result(False, 0, f"Expected the same solution as the default solver: {default_solution}{nl}Got: {solution}" + postfix)
+    if solution is not None and not valid:
+        return Result(False, 0, f"The solution does not satisfy the constraints: {solution}" + postfix)
+    return Result(True, 1, "")
+
+# Creates a problem where "size" variables must all be different but can only take "size - 1" values
+# Arc consistency on the binary "!=" constraints can not detect that it is unsolvable (every value has a support),
+# but the matching-based propagation of the all-different constraint finds it before the search starts
+def create_pigeonhole_problem(size: int) -> Problem:
+    problem = Problem()
+    problem.variables = [f"X{index}" for index in range(size)]
+    problem.domains = {variable: set(range(1, size)) for variable in problem.variables}
+    problem.constraints = [AllDifferentConstraint(problem.variables)]
+    return problem
+
+def run_csp_solve_pigeonhole(
+    size: int,
+    **options) -> Tuple[int, Optional[Assignment]]:
+
+    fetch_tracked_call_count(Problem.is_complete) # Clear the recorded calls
+    solve = load_function("CSP_solver.solve")
+    solution = solve(create_pigeonhole_problem(size), **options)
+    return fetch_tracked_call_count(Problem.is_complete), solution
+
+def compare_csp_solve_pigeonhole(
+    output: Tuple[int, Optional[Assignment]],
+    size: int,
+    expected_explored: int) -> Result:
+
+    explored, solution = output
+    puzzle = f"{size} all-different variables with the domain {set(range(1, size))}"
+    if solution is not None:
+        return Result(False, 0, f"Expected no solution for {puzzle}, got {solution}")
+    if explored != expected_explored:
+        return Result(False, 0, f"Expected to explore {expected_explored} nodes for {puzzle}, got {explored}")
+    return Result(True, 1, f"Explored {explored} nodes")
+
 ########################################################
 ##                  PART 2: Games                     ##
 ########################################################
@@ -51,7 +51,7 @@ def main(args: argparse.Namespace):
     if agent_name == "human":
         solve_fn = solve_via_human
     elif agent_name == "backtrack":
-        solve_fn = solve
+        solve_fn = lambda problem: solve(problem, args.arc_consistency, args.mac)
     else:
         print(f"Unknown Agent: {agent_name}. Please select a valid agent.")
         return
@@ -81,6 +81,11 @@ if __name__ == "__main__":
     parser.add_argument("--agent", "-a", default="human",
                         choices=['human', 'backtrack'],
                         help="the agent that will play the game")
+    parser.add_argument("--arc-consistency", "-c", default=None,
+                        choices=['ac3', 'ac2001'],
+                        help="apply arc consistency before the search (for the backtrack agent)")
+    parser.add_argument("--mac", "-m", action="store_true",
+                        help="maintain arc consistency after every assignment (for the backtrack agent)")
     
     args = parser.parse_args()
     try:
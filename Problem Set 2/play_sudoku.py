@@ -1,5 +1,6 @@
 from sudoku import SudokuProblem
 from CSP_solver import solve
+from sudoku_engine import solve_sudoku
 import argparse, time
 
 # This function requests a solution from the user
@@ -51,7 +52,9 @@ def main(args: argparse.Namespace):
     if agent_name == "human":
         solve_fn = solve_via_human
     elif agent_name == "backtrack":
-        solve_fn = solve
+        solve_fn = lambda problem: solve(problem, args.arc_consistency, args.mac)
+    elif agent_name == "bitset":
+        solve_fn = solve_sudoku
     else:
         print(f"Unknown Agent: {agent_name}. Please select a valid agent.")
         return
@@ -79,8 +82,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Sudoku as Human or AI")
     parser.add_argument("puzzle", help="path to the puzzle to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'backtrack'],
+                        choices=['human', 'backtrack', 'bitset'],
                         help="the agent that will play the game")
+    parser.add_argument("--arc-consistency", "-c", default=None,
+                        choices=['ac3', 'ac2001'],
+                        help="apply arc consistency before the search (for the backtrack agent)")
+    parser.add_argument("--mac", "-m", action="store_true",
+                        help="maintain arc consistency after every assignment (for the backtrack agent)")
     
     args = parser.parse_args()
     try:
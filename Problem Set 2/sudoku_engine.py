@@ -0,0 +1,274 @@
+from typing import List, Optional
+import argparse, time
+
+from CSP import Assignment
+from sudoku import SudokuProblem
+
+# This file contains a specialized sudoku solver that does not go through the generic CSP solver
+# Instead of checking the constraint objects of SudokuProblem, it keeps the digits used by every row, column and box as an int bitmask
+# (bit d-1 is set if the digit d is used), so the candidates of a cell are the digits missing from its three masks.
+# The search applies naked singles (a cell with one candidate) and hidden singles (a digit with one possible cell in a unit)
+# until nothing changes, then branches on the cell with the fewest candidates (MRV using the popcount of the candidates).
+# It reads the same puzzle files as SudokuProblem and its solutions can be printed with "SudokuProblem.format_assignment".
+
+class SudokuEngine:
+    size: int                   # The size of the sudoku puzzle (9 for a 9x9 puzzle)
+    grid: List[int]             # cell -> digit (0 if the cell is empty), where the cell of row r and column c is r * size + c
+    clues: List[int]            # The grid of the clues (the cells that are not part of the solution)
+    nodes: int                  # The number of search nodes expanded by the last call to "solve"
+
+    def __init__(self, size: int, grid: List[int]) -> None:
+        self.size = size
+        self.grid = list(grid)
+        self.clues = list(grid)
+        self.nodes = 0
+        self.full = (1 << size) - 1
+        box = int(size ** 0.5)
+        cells = range(size * size)
+        self.row_of = [cell // size for cell in cells]
+        self.col_of = [cell % size for cell in cells]
+        self.box_of = [(cell // size // box) * box + (cell % size // box) for cell in cells]
+        # The cells of every row, column and box
+        self.units = [[cell for cell in cells if self.row_of[cell] == index] for index in range(size)]
+        self.units += [[cell for cell in cells if self.col_of[cell] == index] for index in range(size)]
+        self.units += [[cell for cell in cells if self.box_of[cell] == index] for index in range(size)]
+        # The cells that share a unit with every cell
+        self.peers = [sorted({peer for unit in self.units if cell in unit for peer in unit} - {cell}) for cell in cells]
+        # The intersections of every box with its rows and columns, each given as
+        # (the cells of the intersection, the other cells of the box, the other cells of the line)
+        self.segments = []
+        for line in self.units[:2 * size]:
+            for box_index in {self.box_of[cell] for cell in line}:
+                segment = [cell for cell in line if self.box_of[cell] == box_index]
+                box_rest = [cell for cell in self.units[2 * size + box_index] if cell not in segment]
+                line_rest = [cell for cell in line if cell not in segment]
+                self.segments.append((segment, box_rest, line_rest))
+
+    # Read a sudoku puzzle from a string (in the same format as "SudokuProblem.from_text")
+    @staticmethod
+    def from_text(text: str) -> 'SudokuEngine':
+        lines = [line.strip() for line in text.splitlines()]
+        lines = [line.replace('| ', '').split() for line in lines if len(line) != 0 and not line.startswith('-')]
+        return SudokuEngine(len(lines), [0 if cell == '.' else int(cell) for line in lines for cell in line])
+
+    # Read a sudoku puzzle from a file
+    @staticmethod
+    def from_file(path: str) -> 'SudokuEngine':
+        with open(path, 'r') as f:
+            return SudokuEngine.from_text(f.read())
+
+    # Create the engine of a sudoku problem (only its size and clues are used)
+    # The clues are named "(r, c)" by SudokuProblem, so their cells are found by building the same names
+    # Raises a ValueError if a clue is not named after a cell of the grid
+    @staticmethod
+    def from_problem(problem: SudokuProblem) -> 'SudokuEngine':
+        size = problem.size
+        cells = {str((r, c)): r * size + c for r in range(size) for c in range(size)}
+        grid = [0] * (size * size)
+        for variable, value in problem.clues.items():
+            cell = cells.get(variable)
+            if cell is None:
+                raise ValueError(f"{variable!r} is not a cell of a {size}x{size} sudoku")
+            grid[cell] = value
+        return SudokuEngine(size, grid)
+
+    # Returns the assignment of the cells that are not clues (the same assignment that "solve" in CSP_solver.py returns)
+    # or None if the grid is not complete
+    def to_assignment(self, grid: List[int]) -> Optional[Assignment]:
+        if grid is None or 0 in grid:
+            return None
+        size = self.size
+        return {str((cell // size, cell % size)): value for cell, (value, clue) in enumerate(zip(grid, self.clues)) if not clue}
+
+    # Solve the puzzle and return the solved grid (or None if the puzzle has no solution)
+    def solve(self) -> Optional[List[int]]:
+        self.nodes = 0
+        grid = list(self.clues)
+        rows, cols, boxes = [0] * self.size, [0] * self.size, [0] * self.size
+        for cell, digit in enumerate(grid):
+            if digit:
+                bit = 1 << (digit - 1)
+                r, c, b = self.row_of[cell], self.col_of[cell], self.box_of[cell]
+                # A clue that is repeated in a unit makes the puzzle unsolvable
+                if (rows[r] | cols[c] | boxes[b]) & bit:
+                    return None
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[b] |= bit
+        full = self.full
+        candidates = [
+            0 if digit else full & ~(rows[self.row_of[cell]] | cols[self.col_of[cell]] | boxes[self.box_of[cell]])
+            for cell, digit in enumerate(grid)
+        ]
+        if not self._propagate(grid, candidates, [cell for cell, digit in enumerate(grid) if not digit]):
+            return None
+        result = self._search(grid, candidates)
+        self.grid = result if result is not None else self.grid
+        return result
+
+    # Put the digit of "bit" in a cell and remove it from the candidates of the cell's peers
+    # The peers that are left with one candidate are added to "singles"
+    # Returns False if a peer is left without candidates
+    def _place(self, grid: List[int], candidates: List[int], cell: int, bit: int, singles: List[int]) -> bool:
+        grid[cell] = bit.bit_length()
+        candidates[cell] = 0
+        for peer in self.peers[cell]:
+            peer_candidates = candidates[peer]
+            if peer_candidates & bit:
+                peer_candidates ^= bit
+                candidates[peer] = peer_candidates
+                if not peer_candidates:
+                    return False
+                if peer_candidates & (peer_candidates - 1) == 0:
+                    singles.append(peer)
+        return True
+
+    # Remove the digits of "bits" from the candidates of the given cells
+    # The cells that are left with one candidate are added to "singles"
+    # Returns False if a cell is left without candidates
+    @staticmethod
+    def _eliminate(candidates: List[int], cells: List[int], bits: int, singles: List[int]) -> bool:
+        for cell in cells:
+            cell_candidates = candidates[cell]
+            if cell_candidates & bits:
+                cell_candidates &= ~bits
+                candidates[cell] = cell_candidates
+                if not cell_candidates:
+                    return False
+                if cell_candidates & (cell_candidates - 1) == 0:
+                    singles.append(cell)
+        return True
+
+    # Apply naked singles (starting from the cells in "singles") and hidden singles in place until nothing changes
+    # When both are stuck, the locked candidates are removed: if the candidates of a digit in a box are all in one line,
+    # the digit can not be anywhere else in that line (pointing) and if they are all in one box in a line,
+    # it can not be anywhere else in that box (claiming)
+    # Returns False if a cell has no candidates or a digit can not be placed anywhere in a unit
+    def _propagate(self, grid: List[int], candidates: List[int], singles: List[int]) -> bool:
+        full, eliminate = self.full, self._eliminate
+        while True:
+            # Naked singles
+            while singles:
+                cell = singles.pop()
+                bit = candidates[cell]
+                if grid[cell]:
+                    continue
+                if not bit:
+                    return False
+                if bit & (bit - 1) == 0 and not self._place(grid, candidates, cell, bit, singles):
+                    return False
+            # Hidden singles: the digits that are candidates of exactly one cell of a unit
+            for unit in self.units:
+                once = twice = placed = 0
+                for cell in unit:
+                    cell_candidates = candidates[cell]
+                    if cell_candidates:
+                        twice |= once & cell_candidates
+                        once |= cell_candidates
+                    else:
+                        placed |= 1 << (grid[cell] - 1)
+                if (once | placed) != full:
+                    return False
+                hidden = once & ~twice
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for cell in unit:
+                        if candidates[cell] & bit:
+                            if not self._place(grid, candidates, cell, bit, singles):
+                                return False
+                            break
+                    else:
+                        # The only cell of this digit was filled with another digit of this unit
+                        return False
+            if singles:
+                continue
+            # Locked candidates
+            for segment, box_rest, line_rest in self.segments:
+                inside = 0
+                for cell in segment:
+                    inside |= candidates[cell]
+                if not inside:
+                    continue
+                box_others = line_others = 0
+                for cell in box_rest:
+                    box_others |= candidates[cell]
+                for cell in line_rest:
+                    line_others |= candidates[cell]
+                pointing = inside & ~box_others & line_others
+                if pointing and not eliminate(candidates, line_rest, pointing, singles):
+                    return False
+                claiming = inside & ~line_others & box_others
+                if claiming and not eliminate(candidates, box_rest, claiming, singles):
+                    return False
+                if pointing or claiming:
+                    break
+            else:
+                return True
+
+    def _search(self, grid: List[int], candidates: List[int]) -> Optional[List[int]]:
+        self.nodes += 1
+        # Pick the empty cell with the minimum remaining candidates
+        # The ties are broken by the number of empty peers (the cell whose value constrains the most cells)
+        best_cells, best_count = [], self.size + 1
+        for cell, cell_candidates in enumerate(candidates):
+            if cell_candidates:
+                count = cell_candidates.bit_count()
+                if count < best_count:
+                    best_cells, best_count = [cell], count
+                elif count == best_count:
+                    best_cells.append(cell)
+        if not best_cells:
+            return grid
+        peers = self.peers
+        best_cell = max(best_cells, key=lambda cell: sum(1 for peer in peers[cell] if candidates[peer]))
+        best_candidates = candidates[best_cell]
+        while best_candidates:
+            bit = best_candidates & -best_candidates
+            best_candidates ^= bit
+            # Every branch works on copies of the grid and the candidates, so nothing has to be undone
+            new_grid, new_candidates, singles = grid[:], candidates[:], []
+            if not self._place(new_grid, new_candidates, best_cell, bit, singles):
+                continue
+            if not self._propagate(new_grid, new_candidates, singles):
+                continue
+            result = self._search(new_grid, new_candidates)
+            if result is not None:
+                return result
+        return None
+
+# Solve a sudoku problem with the engine and return the same assignment as "solve" in CSP_solver.py
+def solve_sudoku(problem: SudokuProblem) -> Optional[Assignment]:
+    engine = SudokuEngine.from_problem(problem)
+    return engine.to_assignment(engine.solve())
+
+def main(args: argparse.Namespace):
+    total_time, solved = 0, 0
+    for path in args.puzzles:
+        engine = SudokuEngine.from_file(path)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            grid = engine.solve()
+        total_time += time.perf_counter() - start
+        print(f"{path}: {'solved' if grid is not None else 'no solution'} ({engine.nodes} nodes)")
+        if grid is not None:
+            solved += 1
+            if args.show:
+                print(SudokuProblem.from_file(path).format_assignment(engine.to_assignment(grid)))
+    count = len(args.puzzles) * args.repeat
+    print(f"Solved {solved}/{len(args.puzzles)} puzzles. {count} solves in {total_time} seconds ({count / max(total_time, 1e-9)} puzzles per second)")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Solve Sudoku puzzles with the bitset engine")
+    parser.add_argument("puzzles", nargs="+", help="the paths of the puzzles to solve")
+    parser.add_argument("--repeat", "-r", type=int, default=1,
+                        help="the number of times every puzzle is solved (to measure the speed)")
+    parser.add_argument("--show", "-s", action="store_true",
+                        help="print the solutions")
+
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")